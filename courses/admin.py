@@ -138,8 +138,15 @@ class CourseAdmin(TranslatableAdmin):
         "format_prices",
         "format_teachers",
         "get_teachers_welcomed",
+        "get_free_places",
+    )
+    list_filter = (
+        "offering",
+        "subscription_type",
+        "display",
+        "active",
+        CourseFreePlacesListFilter,
     )
-    list_filter = ("offering", "subscription_type", "display", "active")
     search_fields = [
         "name",
         "type__translations__title",
@@ -215,6 +222,14 @@ class CourseAdmin(TranslatableAdmin):
     def is_cancelled(course: Course) -> bool:
         return course.cancelled
 
+    @staticmethod
+    @admin.display(description="Free", ordering="capacity_free_places")
+    def get_free_places(course: Course) -> Optional[int]:
+        return course.capacity_free_places
+
+    def get_queryset(self, request) -> QuerySet:
+        return super().get_queryset(request).with_capacity()
+
 
 @admin.register(CourseSuccession)
 class CourseSuccession(admin.ModelAdmin):
@@ -344,6 +359,7 @@ class SubscribeAdmin(VersionAdmin):
 
     actions = [
         match_partners,
+        match_partners_optimal,
         unmatch_partners,
         breakup_couple,
         confirm_subscriptions,
@@ -455,6 +471,61 @@ class RejectionAdmin(admin.ModelAdmin):
     raw_id_fields = ("subscription", "mail")
 
 
+@admin.register(SubscriptionJob)
+class SubscriptionJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "action", "state", "processed", "total", "created_by")
+    list_filter = ("action", "state", "created_at")
+    fields = (
+        "action",
+        "state",
+        "total",
+        "processed",
+        "result",
+        "error",
+        "options",
+        "created_by",
+        "created_at",
+        "finished_at",
+    )
+    readonly_fields = fields
+    change_form_template = "courses/auth/subscription_job_change_form.html"
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def has_change_permission(
+        self, request: HttpRequest, obj: Optional[SubscriptionJob] = None
+    ) -> bool:
+        return False
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "export", "state", "created_by", "created_at")
+    list_filter = ("export", "state", "created_at")
+    fields = (
+        "export",
+        "arguments",
+        "state",
+        "file",
+        "finance_file",
+        "error",
+        "fingerprint",
+        "created_by",
+        "created_at",
+        "finished_at",
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def has_change_permission(
+        self, request: HttpRequest, obj: Optional[ExportJob] = None
+    ) -> bool:
+        return False
+
+
 @admin.register(TeacherWelcome)
 class TeacherWelcomeAdmin(admin.ModelAdmin):
     list_display = ("teach", "date")
@@ -19,11 +19,15 @@ from .forms import SendVoucherForm
 @admin.action(description="Set displayed")
 def display(modeladmin, request, queryset):
     queryset.update(display=True)
+    services.invalidate_course_list()
+    services.invalidate_course_detail(queryset.values_list("id", flat=True))
 
 
 @admin.action(description="Set undisplayed")
 def undisplay(modeladmin, request, queryset):
     queryset.update(display=False)
+    services.invalidate_course_list()
+    services.invalidate_course_detail(queryset.values_list("id", flat=True))
 
 
 @admin.action(description="Activate")
@@ -98,18 +102,34 @@ def copy_courses(modeladmin, request, queryset):
     )
 
 
+def _start_subscription_job(
+    request, action: str, queryset, **options
+) -> HttpResponseRedirect:
+    """queues the action for a celery worker and shows the progress page of the job"""
+    job = services.start_subscription_job(action, queryset, request.user, **options)
+    messages.add_message(
+        request,
+        messages.INFO,
+        "{} of {} subscriptions started".format(job.get_action_display(), job.total),
+    )
+    return HttpResponseRedirect(
+        reverse("admin:courses_subscriptionjob_change", args=[job.id])
+    )
+
+
 @admin.action(description="Confirm selected subscriptions")
 def confirm_subscriptions(modeladmin, request, queryset):
-    # manually send confirmation mails
-    services.subscriptions.confirm_subscriptions(queryset, request)
+    # confirmation mails are sent by a celery worker
+    return _start_subscription_job(request, SubscriptionJobAction.CONFIRM, queryset)
 
 
 @admin.action(
     description="Confirm selected subscriptions (allow singles in couple courses)"
 )
 def confirm_subscriptions_allow_singles(modeladmin, request, queryset):
-    # manually send confirmation mails
-    services.subscriptions.confirm_subscriptions(queryset, request, True)
+    return _start_subscription_job(
+        request, SubscriptionJobAction.CONFIRM_ALLOW_SINGLES, queryset
+    )
 
 
 @admin.action(description="Unconfirm subscriptions (be sure to reconfirm them later!)")
@@ -126,14 +146,14 @@ def reject_subscriptions(self, request, queryset):
         form = RejectForm(request.POST)
 
         if form.is_valid():
-            reason = form.cleaned_data["reason"]
-
-            services.subscriptions.reject_subscriptions(
-                queryset, reason, form.cleaned_data["send_email"]
+            return _start_subscription_job(
+                request,
+                SubscriptionJobAction.REJECT,
+                queryset,
+                reason=form.cleaned_data["reason"],
+                send_email=form.cleaned_data["send_email"],
             )
 
-            return HttpResponseRedirect(request.get_full_path())
-
     if not form:
         selected_action = map(str, queryset.values_list("id", flat=True))
         form = RejectForm(
@@ -158,7 +178,29 @@ def unreject_subscriptions(modeladmin, request, queryset):
 
 @admin.action(description="Match partners (chronologically, body height optimal)")
 def match_partners(modeladmin, request, queryset):
-    services.match_partners(queryset, request)
+    return _start_subscription_job(request, SubscriptionJobAction.MATCH, queryset)
+
+
+@admin.action(
+    description="Match partners (minimal cost of body height difference and subscription date, with preview)"
+)
+def match_partners_optimal(modeladmin, request, queryset):
+    if "match" in request.POST:
+        return _start_subscription_job(
+            request, SubscriptionJobAction.MATCH_OPTIMAL, queryset
+        )
+
+    report = services.match_subscriptions(
+        queryset, services.DEFAULT_MATCHING_COST, dry_run=True
+    )
+    return render(
+        request,
+        "courses/auth/action_preview_matching.html",
+        {
+            "report": report,
+            "selected_ids": queryset.values_list("id", flat=True),
+        },
+    )
 
 
 @admin.action(
@@ -194,47 +236,62 @@ def welcome_teachers_reset_flag(modeladmin, request, queryset):
 
 @admin.action(description="Export confirmed subscriptions of selected courses as CSV")
 def export_confirmed_subscriptions_csv(modeladmin, request, queryset):
-    ids = []
-    for c in queryset:
-        ids.append(c.id)
-    return services.export_subscriptions(ids, "csv")
+    return services.start_export(
+        request,
+        "subscriptions",
+        course_ids=list(queryset.values_list("id", flat=True)),
+        export_format="csv",
+    )
 
 
 @admin.action(
     description="Export confirmed subscriptions of selected courses as Google Contacts readable CSV"
 )
 def export_confirmed_subscriptions_csv_google(modeladmin, request, queryset):
-    ids = []
-    for c in queryset:
-        ids.append(c.id)
-    return services.export_subscriptions(ids, "csv_google")
+    return services.start_export(
+        request,
+        "subscriptions",
+        course_ids=list(queryset.values_list("id", flat=True)),
+        export_format="csv_google",
+    )
 
 
 @admin.action(description="Export confirmed subscriptions of selected courses as vCard")
 def export_confirmed_subscriptions_vcard(modeladmin, request, queryset):
-    ids = []
-    for c in queryset:
-        ids.append(c.id)
-    return services.export_subscriptions(ids, "vcard")
+    return services.start_export(
+        request,
+        "subscriptions",
+        course_ids=list(queryset.values_list("id", flat=True)),
+        export_format="vcard",
+    )
 
 
 @admin.action(description="Export confirmed subscriptions of selected courses as XLSX")
 def export_confirmed_subscriptions_xlsx(modeladmin, request, queryset):
-    ids = []
-    for c in queryset:
-        ids.append(c.id)
-    return services.export_subscriptions(ids, "xlsx")
+    return services.start_export(
+        request,
+        "subscriptions",
+        course_ids=list(queryset.values_list("id", flat=True)),
+        export_format="xlsx",
+    )
 
 
 @admin.action(description="Export teacher payment information as CSV")
 def export_teacher_payment_information_csv(modeladmin, request, queryset):
-    return services.export_teacher_payment_information(offerings=queryset.all())
+    return services.start_export(
+        request,
+        "teacher_payment_information",
+        offering_ids=list(queryset.values_list("id", flat=True)),
+    )
 
 
 @admin.action(description="Export teacher payment information as Excel")
 def export_teacher_payment_information_excel(modeladmin, request, queryset):
-    return services.export_teacher_payment_information(
-        offerings=queryset.all(), export_format="excel"
+    return services.start_export(
+        request,
+        "teacher_payment_information",
+        offering_ids=list(queryset.values_list("id", flat=True)),
+        export_format="excel",
     )
 
 
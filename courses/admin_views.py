@@ -1,7 +1,7 @@
 import reversion
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import HttpResponseRedirect, HttpResponse, HttpRequest
-from django.shortcuts import render
+from django.http import HttpResponseRedirect, HttpResponse, HttpRequest, JsonResponse
+from django.shortcuts import render, get_object_or_404
 from django.urls import reverse
 
 from courses.forms import VoucherGenerationForm
@@ -46,3 +46,10 @@ def voucher_generation_view(request: HttpRequest) -> HttpResponse:
     return render(
         request, "courses/auth/action_voucher_generation.html", {"form": form}
     )
+
+
+@staff_member_required
+def subscription_job_progress_view(request: HttpRequest, job_id: int) -> JsonResponse:
+    """progress of a subscription job, polled by its admin page"""
+    job = get_object_or_404(SubscriptionJob, pk=job_id)
+    return JsonResponse(job.get_progress())
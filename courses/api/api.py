@@ -1,3 +1,4 @@
+from django.db.models import Prefetch
 from django.http import Http404
 from rest_framework import generics
 from rest_framework import status
@@ -11,14 +12,18 @@ from .serializers import *
 class OfferingList(generics.ListAPIView):
     model = Offering
     serializer_class = OfferingSerializer
-    queryset = Offering.objects.all()
+    queryset = Offering.objects.prefetch_related(
+        Prefetch("course_set", queryset=Course.objects.with_capacity())
+    )
     permission_classes = [permissions.IsAuthenticated]
 
 
 class OfferingDetail(generics.RetrieveAPIView):
     model = Offering
     serializer_class = OfferingSerializer
-    queryset = Offering.objects.all()
+    queryset = Offering.objects.prefetch_related(
+        Prefetch("course_set", queryset=Course.objects.with_capacity())
+    )
     permission_classes = [permissions.IsAuthenticated]
 
 
@@ -5,15 +5,39 @@ from django.contrib import auth
 from courses.models import *
 
 
+class CourseCapacitySerializer(serializers.ModelSerializer):
+    # the capacity fields are annotated by Course.objects.with_capacity()
+    active = serializers.IntegerField(source="capacity_active")
+    free_places = serializers.IntegerField(source="capacity_free_places")
+    free_places_for_leaders = serializers.BooleanField(
+        source="capacity_free_for_leaders"
+    )
+    free_places_for_followers = serializers.BooleanField(
+        source="capacity_free_for_followers"
+    )
+
+    class Meta:
+        model = Course
+        fields = (
+            "id",
+            "name",
+            "active",
+            "free_places",
+            "free_places_for_leaders",
+            "free_places_for_followers",
+        )
+
+
 class OfferingSerializer(serializers.HyperlinkedModelSerializer):
     course_set = serializers.HyperlinkedRelatedField(
         many=True, read_only=True, view_name="courses:api:course-payment-detail"
     )
+    capacities = CourseCapacitySerializer(source="course_set", many=True)
     period = serializers.StringRelatedField()
 
     class Meta:
         model = Offering
-        fields = ("id", "name", "period", "course_set")
+        fields = ("id", "name", "period", "course_set", "capacities")
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class CoursesConfig(AppConfig):
     name = "courses"
     verbose_name = "Course Administration"
+
+    def ready(self):
+        from courses.models.course import connect_lesson_schedule_updates
+        from courses.models.course_subscription_counts import (
+            connect_subscription_counts,
+        )
+        from courses.signals import (
+            connect_course_list_invalidation,
+            connect_course_detail_invalidation,
+        )
+
+        connect_subscription_counts()
+        connect_lesson_schedule_updates()
+        connect_course_list_invalidation()
+        connect_course_detail_invalidation()
@@ -9,7 +9,7 @@ from post_office.models import Email
 
 import courses.models
 from courses.models import Subscribe, Teach, Course
-from email_system.services import send_email
+from email_system.services import send_email, send_emails
 from tq_website import settings as my_settings
 
 log = logging.getLogger("tq")
@@ -44,7 +44,9 @@ def send_subscription_confirmation(subscription: Subscribe) -> Optional[Email]:
     )
 
 
-def _build_subscription_context(subscription: Subscribe) -> dict:
+def _build_subscription_context(
+    subscription: Subscribe, course_info: Optional[str] = None
+) -> dict:
     from payment import payment_processor
 
     conf = my_settings.PAYMENT_ACCOUNT["default"]
@@ -56,7 +58,7 @@ def _build_subscription_context(subscription: Subscribe) -> dict:
         "first_name": subscription.user.first_name,
         "last_name": subscription.user.last_name,
         "course": subscription.course.type.title,
-        "course_info": create_course_info(subscription.course),
+        "course_info": course_info or create_course_info(subscription.course),
         "usi": payment_processor.USI_PREFIX + subscription.usi,
         "account_IBAN": conf["IBAN"],
         "account_SWIFT": conf["SWIFT"],
@@ -66,8 +68,10 @@ def _build_subscription_context(subscription: Subscribe) -> dict:
     }
 
 
-def send_participation_confirmation(subscription: Subscribe) -> Optional[Email]:
-    context = _build_subscription_context(subscription)
+def _participation_confirmation(
+    subscription: Subscribe, course_info: Optional[str] = None
+) -> dict:
+    context = _build_subscription_context(subscription, course_info)
 
     if subscription.partner is not None:
         template = "participation_confirmation_with_partner"
@@ -83,7 +87,7 @@ def send_participation_confirmation(subscription: Subscribe) -> Optional[Email]:
     else:
         template = "participation_confirmation_without_partner_nocouple"
 
-    return send_email(
+    return dict(
         to=subscription.user.email,
         reply_to=settings.EMAIL_ADDRESS_COURSE_SUBSCRIPTIONS,
         template=template,
@@ -91,6 +95,27 @@ def send_participation_confirmation(subscription: Subscribe) -> Optional[Email]:
     )
 
 
+def send_participation_confirmation(subscription: Subscribe) -> Optional[Email]:
+    return send_email(**_participation_confirmation(subscription))
+
+
+def send_participation_confirmations(
+    subscriptions: list[Subscribe],
+) -> list[Optional[Email]]:
+    """queues the confirmation mails of many subscriptions at once, in the same order"""
+    course_infos = {}
+    for subscription in subscriptions:
+        if subscription.course_id not in course_infos:
+            course_infos[subscription.course_id] = create_course_info(
+                subscription.course
+            )
+
+    return send_emails(
+        _participation_confirmation(subscription, course_infos[subscription.course_id])
+        for subscription in subscriptions
+    )
+
+
 def send_online_payment_successful(subscription: Subscribe) -> Optional[Email]:
     context = {
         "first_name": subscription.user.first_name,
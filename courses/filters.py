@@ -133,6 +133,24 @@ class ConfirmationCourseListFilter(SubscribeCourseListFilter):
         return queryset.filter(subscription__course__id=course_id)
 
 
+class CourseFreePlacesListFilter(SimpleListFilter):
+    title = "Free places"
+    parameter_name = "free_places"
+
+    def lookups(self, request, model_admin):
+        return [
+            (LeadFollow.NO_PREFERENCE, "Any"),
+            (LeadFollow.LEAD, "For leaders"),
+            (LeadFollow.FOLLOW, "For followers"),
+        ]
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+
+        return queryset.with_free_places_for(self.value())
+
+
 class CourseTypeStyleFilter(SimpleListFilter):
     title = _("Style")
 
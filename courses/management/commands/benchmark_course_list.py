@@ -0,0 +1,107 @@
+import logging
+import time
+from datetime import date, time as day_time, timedelta
+
+from cms.toolbar.toolbar import CMSToolbar
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import translation
+
+from courses.models import *
+from courses.views import course_list
+
+log = logging.getLogger("tq")
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures query count and wall time of the public course list with generated "
+        "courses. All generated data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=500)
+        parser.add_argument("--subscriptions", type=int, default=20)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        log.info("run management command: {}".format(__file__))
+
+        with transaction.atomic():
+            self._generate_offering(options["courses"], options["subscriptions"])
+            self._benchmark(options["repeat"])
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _generate_offering(courses_count: int, subscriptions_count: int) -> None:
+        today = date.today()
+        period = Period.objects.create(
+            name="Benchmark", date_from=today, date_to=today + timedelta(days=90)
+        )
+        offering = Offering.objects.create(
+            name="Benchmark offering", period=period, display=True, active=True
+        )
+        course_type = CourseType.objects.create(title="Benchmark course")
+        courses = [
+            Course.objects.create(
+                name=f"Benchmark {i}",
+                offering=offering,
+                type=course_type,
+                max_subscribers=2 * subscriptions_count,
+                min_subscribers=subscriptions_count,
+            )
+            for i in range(courses_count)
+        ]
+        RegularLesson.objects.bulk_create(
+            RegularLesson(
+                course=course,
+                weekday=Weekday.NUMBER_2_SLUG[i % 7],
+                time_from=day_time(18),
+                time_to=day_time(19, 30),
+            )
+            for i, course in enumerate(courses)
+        )
+        Course.objects.filter(offering=offering).update_lesson_schedules()
+
+        users = User.objects.bulk_create(
+            User(username=f"benchmark-{i}", email=f"benchmark-{i}@example.com")
+            for i in range(subscriptions_count)
+        )
+        UserProfile.objects.bulk_create(UserProfile(user=user) for user in users)
+        lead_follow = [LeadFollow.LEAD, LeadFollow.FOLLOW, LeadFollow.NO_PREFERENCE]
+        Subscribe.objects.bulk_create(
+            Subscribe(
+                user=user,
+                course=course,
+                lead_follow=lead_follow[i % 3],
+                matching_state=MatchingState.TO_MATCH,
+                usi=f"B{j * subscriptions_count + i:05X}",
+                price_to_pay=course.price_with_legi,
+            )
+            for j, course in enumerate(courses)
+            for i, user in enumerate(users)
+        )
+        CourseSubscriptionCounts.objects.rebuild([course.id for course in courses])
+
+    def _benchmark(self, repeat: int) -> None:
+        request = RequestFactory().get("/en/courses/")
+        request.user = AnonymousUser()
+        request.session = {}
+        request.current_page = None
+        request.toolbar = CMSToolbar(request)
+
+        with translation.override("en"):
+            for run in range(repeat):
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = course_list(request)
+                    duration = time.perf_counter() - start
+
+                self.stdout.write(
+                    "run {}: status {}, {} queries, {:.3f}s".format(
+                        run + 1, response.status_code, len(queries), duration
+                    )
+                )
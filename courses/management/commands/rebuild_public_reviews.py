@@ -0,0 +1,17 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from survey.models import PublicReview
+
+log = logging.getLogger("tq")
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the index of public course reviews from the survey answers"
+
+    def handle(self, *args, **options):
+        log.info("run management command: {}".format(__file__))
+
+        count = PublicReview.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS("Indexed {} public reviews".format(count)))
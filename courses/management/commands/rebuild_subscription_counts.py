@@ -0,0 +1,53 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from courses.models import CourseSubscriptionCounts
+
+log = logging.getLogger("tq")
+
+
+class Command(BaseCommand):
+    help = (
+        "Checks the denormalized subscription counters of all courses and rebuilds them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            dest="check",
+            default=False,
+            help="Only report courses with wrong counters, do not rebuild them",
+        )
+
+    def handle(self, *args, **options):
+        log.info("run management command: {}".format(__file__))
+
+        drift = CourseSubscriptionCounts.objects.drift()
+        for course_id, (stored, actual) in drift.items():
+            self.stdout.write(
+                "course {}: stored {}, actual {}".format(course_id, stored, actual)
+            )
+
+        if options["check"]:
+            if drift:
+                self.stdout.write(
+                    self.style.ERROR(
+                        "{} courses have wrong subscription counts".format(len(drift))
+                    )
+                )
+            else:
+                self.stdout.write(
+                    self.style.SUCCESS("All subscription counts are correct")
+                )
+            return
+
+        count = CourseSubscriptionCounts.objects.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Rebuilt subscription counts of {} courses ({} were wrong)".format(
+                    count, len(drift)
+                )
+            )
+        )
@@ -1,10 +1,40 @@
+from collections import defaultdict
 from datetime import date
+from decimal import Decimal
+from itertools import groupby
 
-from django.db import models
-from django.db.models import QuerySet
-from parler.managers import TranslatableManager
+from typing import Iterable, Optional
 
-from courses.models import SubscribeState, LeadFollow, MatchingState
+from django.db import models
+from django.db.models import (
+    QuerySet,
+    F,
+    Q,
+    Count,
+    Sum,
+    Case,
+    When,
+    Value,
+    OuterRef,
+    Subquery,
+    BooleanField,
+    DecimalField,
+    IntegerField,
+)
+from django.db.models.functions import Coalesce, Greatest
+from parler.managers import TranslatableManager, TranslatableQuerySet
+
+from courses.models import SubscribeState, LeadFollow, MatchingState, StudentStatus
+
+MONEY = DecimalField(max_digits=8, decimal_places=2)
+
+FINANCIAL_TOTALS = {
+    "to_pay": "financial_price_to_pay",
+    "reductions": "financial_reductions",
+    "to_pay_after_reductions": "financial_price_after_reductions",
+    "paid": "financial_payments",
+    "open_amount": "financial_open_amount",
+}
 
 
 class UserProfileManager(models.Manager):
@@ -14,54 +44,197 @@ class UserProfileManager(models.Manager):
         )
 
 
-class CourseManager(TranslatableManager):
+class CourseQuerySet(TranslatableQuerySet):
+    def with_capacity(self) -> QuerySet:
+        """
+        annotates the capacity figures of CourseCapacitySnapshot, computed by the database
+        from the subscription counters, so courses can be filtered and sorted by them
+        """
+        if "capacity_active" in self.query.annotations:
+            return self
+
+        unlimited = Q(max_subscribers__isnull=True)
+
+        def counter(name: str) -> Coalesce:
+            return Coalesce(F(f"subscription_counts__{name}"), 0)
+
+        def free_for(single_count: str) -> Case:
+            # same as (max - matched) / 2 - singles >= 1 in CourseCapacitySnapshot
+            return Case(
+                When(unlimited, then=Value(True)),
+                When(capacity_free_places__lte=0, then=Value(False)),
+                When(
+                    max_subscribers__gte=F("capacity_matched")
+                    + 2 * F(single_count)
+                    + 2,
+                    then=Value(True),
+                ),
+                default=Value(False),
+                output_field=BooleanField(),
+            )
+
+        return (
+            self.select_related("subscription_counts")
+            .annotate(
+                capacity_active=counter("active"),
+                capacity_matched=counter("matched"),
+                capacity_leads=counter("single_leaders"),
+                capacity_follows=counter("single_followers"),
+                capacity_no_preference=counter("single_no_preference"),
+                capacity_accepted=counter("accepted"),
+            )
+            .annotate(
+                capacity_free_places=Case(
+                    When(unlimited, then=Value(None)),
+                    default=Greatest(F("max_subscribers") - F("capacity_active"), 0),
+                    output_field=IntegerField(),
+                ),
+            )
+            .annotate(
+                capacity_has_free_places=Case(
+                    When(unlimited, then=Value(True)),
+                    When(capacity_free_places__gt=0, then=Value(True)),
+                    default=Value(False),
+                    output_field=BooleanField(),
+                ),
+                capacity_free_for_leaders=free_for("capacity_leads"),
+                capacity_free_for_followers=free_for("capacity_follows"),
+            )
+        )
+
+    def update_lesson_schedules(self) -> int:
+        """recomputes the persisted lesson schedule fields of all courses in this queryset"""
+        courses = list(
+            self.select_related("period", "offering__period").prefetch_related(
+                "regular_lessons", "irregular_lessons"
+            )
+        )
+        for course in courses:
+            for field, value in course.compute_lesson_schedule().items():
+                setattr(course, field, value)
+        return self.model.objects.bulk_update(
+            courses, ["first_lesson_date", "last_lesson_date", "effective_weekday"]
+        )
+
+    def in_schedule_order(self) -> QuerySet:
+        return self.order_by(F("first_lesson_date").asc(nulls_last=True), "name")
+
+    def with_free_places_for(self, lead_or_follow: str) -> QuerySet:
+        if lead_or_follow == LeadFollow.LEAD:
+            return self.with_capacity().filter(capacity_free_for_leaders=True)
+        if lead_or_follow == LeadFollow.FOLLOW:
+            return self.with_capacity().filter(capacity_free_for_followers=True)
+        return self.with_capacity().filter(capacity_has_free_places=True)
+
+
+class CourseManager(TranslatableManager.from_queryset(CourseQuerySet)):
     def weekday(self, weekday):
-        result_list = []
-        for c in self.all():
-            t = c.get_first_regular_lesson()
-            common_irr_weekday = c.get_common_irregular_weekday()
-
-            weekday_to_add = None
-            if t is not None:
-                weekday_to_add = t.weekday
-            else:
-                if common_irr_weekday is not None:
-                    weekday_to_add = common_irr_weekday
-
-            if weekday_to_add == weekday:
-                result_list.append(c)
-        return result_list
+        return list(self.filter(effective_weekday=weekday))
 
     def by_month(self):
-        result = []
-        courses = self.all()
-        sorted_courses = sorted(
-            courses,
-            key=lambda c: c.get_first_lesson_date()
-            if c.get_first_lesson_date()
-            else date(day=1, month=1, year=9999),
-        )
-        current_date = date(year=1, month=1, day=1)
-        month_list = []
-        for c in sorted_courses:
-            first_date = c.get_first_lesson_date() or c.get_period().date_from
+        return group_by_month(self.in_schedule_order())
+
+
+def group_by_month(courses: Iterable) -> list[tuple[date, list]]:
+    """groups courses ordered by their first lesson date into consecutive months"""
 
-            if (
-                current_date.year != first_date.year
-                or current_date.month != first_date.month
-            ):
-                if month_list:
-                    result.append((current_date, month_list))
-                # go to next month
-                current_date = first_date
-                month_list = []
-            # just append to current month list
-            month_list.append(c)
+    def month_of(course) -> date:
+        first_date = course.first_lesson_date or course.get_period().date_from
+        return first_date.replace(day=1)
 
-        if month_list:
-            result.append((current_date, month_list))
+    return [
+        (month, list(courses_in_month))
+        for month, courses_in_month in groupby(courses, key=month_of)
+    ]
 
-        return result
+
+class CourseSubscriptionCountsManager(models.Manager):
+    def apply_delta(self, course_id: int, delta: dict[str, int]) -> None:
+        """updates the counters of a course in place (creates them if missing)"""
+        if not delta:
+            return
+
+        updated = self.filter(course_id=course_id).update(
+            **{counter: F(counter) + change for counter, change in delta.items()}
+        )
+        if not updated:
+            self.rebuild([course_id])
+
+    def compute(self, course_ids: Optional[Iterable[int]] = None) -> dict[int, dict]:
+        """counts the subscriptions of the given courses (all if None) in the database"""
+        from courses.models import Course, Subscribe
+
+        courses = Course.objects.all()
+        subscriptions = Subscribe.objects.all()
+        if course_ids is not None:
+            course_ids = list(course_ids)
+            courses = courses.filter(id__in=course_ids)
+            subscriptions = subscriptions.filter(course_id__in=course_ids)
+
+        active = ~Q(state__in=SubscribeState.REJECTED_STATES)
+        single = active & Q(matching_state__in=MatchingState.TO_MATCH_STATES)
+        rows = (
+            subscriptions.order_by()
+            .values("course_id")
+            .annotate(
+                active=Count("id", filter=active),
+                matched=Count(
+                    "id",
+                    filter=active & Q(matching_state__in=MatchingState.MATCHED_STATES),
+                ),
+                single_leaders=Count(
+                    "id", filter=single & Q(lead_follow=LeadFollow.LEAD)
+                ),
+                single_followers=Count(
+                    "id", filter=single & Q(lead_follow=LeadFollow.FOLLOW)
+                ),
+                single_no_preference=Count(
+                    "id", filter=single & Q(lead_follow=LeadFollow.NO_PREFERENCE)
+                ),
+                accepted=Count(
+                    "id", filter=Q(state__in=SubscribeState.ACCEPTED_STATES)
+                ),
+                paid=Count("id", filter=Q(state__in=SubscribeState.PAID_STATES)),
+            )
+        )
+        counts = {
+            course_id: dict.fromkeys(self.model.COUNTERS, 0)
+            for course_id in courses.order_by().values_list("id", flat=True)
+        }
+        for row in rows:
+            course_id = row.pop("course_id")
+            if course_id in counts:
+                counts[course_id].update(row)
+        return counts
+
+    def rebuild(self, course_ids: Optional[Iterable[int]] = None) -> int:
+        """recomputes the counters of the given courses (all if None), returns the number of courses"""
+        counts = self.compute(course_ids)
+        self.bulk_create(
+            [
+                self.model(course_id=course_id, **values)
+                for course_id, values in counts.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["course"],
+            update_fields=self.model.COUNTERS,
+        )
+        return len(counts)
+
+    def drift(
+        self, course_ids: Optional[Iterable[int]] = None
+    ) -> dict[int, tuple[Optional[dict], dict]]:
+        """returns the courses whose stored counters differ from the database, as (stored, actual)"""
+        actual = self.compute(course_ids)
+        stored = {
+            counts.course_id: counts.as_dict()
+            for counts in self.filter(course_id__in=list(actual))
+        }
+        return {
+            course_id: (stored.get(course_id), values)
+            for course_id, values in actual.items()
+            if stored.get(course_id) != values
+        }
 
 
 class AddressManager(models.Manager):
@@ -139,3 +312,91 @@ class SubscribeQuerySet(models.QuerySet):
 
     def new(self) -> QuerySet:
         return self.filter(state=SubscribeState.NEW)
+
+    def with_financials(self) -> QuerySet:
+        """
+        annotates price to pay, reductions, payments and open amount like the methods of
+        Subscribe, computed by the database and without saving missing prices
+        """
+        if "financial_price_to_pay" in self.query.annotations:
+            return self
+
+        from courses.models import PriceReduction
+        from payment.models import SubscriptionPayment
+
+        def amount_sum(model) -> Coalesce:
+            amounts = (
+                model.objects.filter(subscription=OuterRef("pk"))
+                .order_by()
+                .values("subscription")
+                .annotate(total=Sum("amount"))
+                .values("total")
+            )
+            return Coalesce(Subquery(amounts), Value(0), output_field=MONEY)
+
+        is_student = Q(
+            user__profile__student_status__in=StudentStatus.STUDENTS,
+            user__profile__legi__isnull=False,
+        ) & ~Q(user__profile__legi="")
+
+        return (
+            self.annotate(
+                financial_price_to_pay=Coalesce(
+                    F("price_to_pay"),
+                    Case(
+                        When(is_student, then=F("course__price_with_legi")),
+                        default=F("course__price_without_legi"),
+                    ),
+                    Value(0),
+                    output_field=MONEY,
+                ),
+                financial_reductions=amount_sum(PriceReduction),
+                financial_payments=amount_sum(SubscriptionPayment),
+            )
+            .annotate(
+                financial_price_after_reductions=F("financial_price_to_pay")
+                - F("financial_reductions"),
+            )
+            .annotate(
+                financial_open_amount=Case(
+                    When(state__in=SubscribeState.PAID_STATES, then=Value(0)),
+                    default=Greatest(
+                        F("financial_price_after_reductions") - F("financial_payments"),
+                        Value(0),
+                    ),
+                    output_field=MONEY,
+                ),
+            )
+        )
+
+    def financial_totals(self) -> dict[str, Decimal]:
+        """sums of the financial annotations of all subscriptions, in one query"""
+        annotated = self.with_financials()
+        totals = annotated.aggregate(
+            **{
+                total: Coalesce(Sum(annotation), Value(0), output_field=MONEY)
+                for total, annotation in FINANCIAL_TOTALS.items()
+            }
+        )
+        return _with_difference(totals)
+
+    def financial_totals_by_course(self) -> dict[int, dict[str, Decimal]]:
+        """financial_totals per course, in one query"""
+        rows = (
+            self.with_financials()
+            .order_by()
+            .values("course_id")
+            .annotate(
+                **{
+                    total: Sum(annotation)
+                    for total, annotation in FINANCIAL_TOTALS.items()
+                }
+            )
+        )
+        return {row.pop("course_id"): _with_difference(row) for row in rows}
+
+
+def _with_difference(totals: dict) -> dict[str, Decimal]:
+    totals = defaultdict(Decimal, {k: v or Decimal(0) for k, v in totals.items()})
+    totals["difference"] = totals["to_pay_after_reductions"] - totals["paid"]
+    return totals
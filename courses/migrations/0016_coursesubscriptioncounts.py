@@ -0,0 +1,82 @@
+# Generated by Django 4.2.8 on 2026-10-18 10:09
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+REJECTED_STATES = ["rejected", "to_reimburse"]
+ACCEPTED_STATES = ["confirmed", "payed", "completed"]
+PAID_STATES = ["payed", "to_reimburse", "completed"]
+MATCHED_STATES = ["couple", "matched"]
+TO_MATCH_STATES = ["to_match", "to_rematch"]
+
+
+def populate_counts(apps, schema_editor):
+    Course = apps.get_model("courses", "Course")
+    Subscribe = apps.get_model("courses", "Subscribe")
+    CourseSubscriptionCounts = apps.get_model("courses", "CourseSubscriptionCounts")
+
+    active = ~models.Q(state__in=REJECTED_STATES)
+    single = active & models.Q(matching_state__in=TO_MATCH_STATES)
+    counts = {
+        row.pop("course_id"): row
+        for row in Subscribe.objects.order_by()
+        .values("course_id")
+        .annotate(
+            active=models.Count("id", filter=active),
+            matched=models.Count(
+                "id", filter=active & models.Q(matching_state__in=MATCHED_STATES)
+            ),
+            single_leaders=models.Count(
+                "id", filter=single & models.Q(lead_follow="l")
+            ),
+            single_followers=models.Count(
+                "id", filter=single & models.Q(lead_follow="f")
+            ),
+            single_no_preference=models.Count(
+                "id", filter=single & models.Q(lead_follow="n")
+            ),
+            accepted=models.Count("id", filter=models.Q(state__in=ACCEPTED_STATES)),
+            paid=models.Count("id", filter=models.Q(state__in=PAID_STATES)),
+        )
+    }
+    CourseSubscriptionCounts.objects.bulk_create(
+        [
+            CourseSubscriptionCounts(course_id=course_id, **counts.get(course_id, {}))
+            for course_id in Course.objects.values_list("id", flat=True)
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("courses", "0015_alter_rejection_reason"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CourseSubscriptionCounts",
+            fields=[
+                (
+                    "course",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="subscription_counts",
+                        serialize=False,
+                        to="courses.course",
+                    ),
+                ),
+                ("active", models.IntegerField(default=0)),
+                ("matched", models.IntegerField(default=0)),
+                ("single_leaders", models.IntegerField(default=0)),
+                ("single_followers", models.IntegerField(default=0)),
+                ("single_no_preference", models.IntegerField(default=0)),
+                ("accepted", models.IntegerField(default=0)),
+                ("paid", models.IntegerField(default=0)),
+            ],
+            options={
+                "verbose_name_plural": "Course subscription counts",
+            },
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 4.2.8 on 2026-10-18 10:22
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+WEEKDAY_NUMBERS = {"mon": 0, "tue": 1, "wed": 2, "thu": 3, "fri": 4, "sat": 5, "sun": 6}
+NUMBER_2_WEEKDAY = {number: slug for slug, number in WEEKDAY_NUMBERS.items()}
+
+
+def lesson_schedule(course):
+    period = course.period or course.offering.period
+    regular_weekdays = [
+        WEEKDAY_NUMBERS[lesson.weekday] for lesson in course.regular_lessons.all()
+    ]
+    irregular_dates = sorted(lesson.date for lesson in course.irregular_lessons.all())
+
+    first_dates = list(irregular_dates[:1])
+    last_dates = list(irregular_dates[-1:])
+    if regular_weekdays:
+        first_dates.append(
+            period.date_from
+            + timedelta((regular_weekdays[0] - period.date_from.weekday()) % 7)
+        )
+        last_dates += [
+            period.date_to - timedelta(days=delta)
+            for delta in range(7)
+            if (period.date_to - timedelta(days=delta)).weekday() in regular_weekdays
+        ][:1]
+
+    irregular_weekdays = {d.weekday() for d in irregular_dates}
+    if regular_weekdays:
+        weekday = NUMBER_2_WEEKDAY[regular_weekdays[0]]
+    elif len(irregular_weekdays) == 1:
+        weekday = NUMBER_2_WEEKDAY[irregular_weekdays.pop()]
+    else:
+        weekday = None
+
+    return dict(
+        first_lesson_date=min(first_dates, default=None),
+        last_lesson_date=max(last_dates, default=None),
+        effective_weekday=weekday,
+    )
+
+
+def populate_lesson_schedules(apps, schema_editor):
+    Course = apps.get_model("courses", "Course")
+
+    courses = list(
+        Course.objects.select_related("period", "offering__period").prefetch_related(
+            "regular_lessons", "irregular_lessons"
+        )
+    )
+    for course in courses:
+        for field, value in lesson_schedule(course).items():
+            setattr(course, field, value)
+    Course.objects.bulk_update(
+        courses, ["first_lesson_date", "last_lesson_date", "effective_weekday"]
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("courses", "0016_coursesubscriptioncounts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="effective_weekday",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("mon", "Monday"),
+                    ("tue", "Tuesday"),
+                    ("wed", "Wednesday"),
+                    ("thu", "Thursday"),
+                    ("fri", "Friday"),
+                    ("sat", "Saturday"),
+                    ("sun", "Sunday"),
+                ],
+                db_index=True,
+                editable=False,
+                max_length=3,
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="first_lesson_date",
+            field=models.DateField(
+                blank=True, db_index=True, editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="course",
+            name="last_lesson_date",
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_lesson_schedules, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.8 on 2026-10-18 11:07
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("courses", "0018_subscriptionjob"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="subscribe",
+            index=models.Index(
+                django.db.models.functions.text.Upper("usi"),
+                name="courses_subscribe_usi_upper",
+            ),
+        ),
+    ]
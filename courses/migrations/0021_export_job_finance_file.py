@@ -0,0 +1,22 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:38
+
+from django.db import migrations, models
+import tq_website.storages
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("courses", "0020_export_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="exportjob",
+            name="finance_file",
+            field=models.FileField(
+                blank=True,
+                storage=tq_website.storages.FinanceStorage(),
+                upload_to="exports/%Y/%m/",
+            ),
+        ),
+    ]
@@ -14,6 +14,8 @@ from .regular_lesson_exception import RegularLessonException
 from .irregular_lesson import IrregularLesson
 from .course_type import CourseType
 from .course import Course
+from .course_subscription_counts import CourseSubscriptionCounts
+from .course_capacity_snapshot import CourseCapacitySnapshot
 from .period_cancellation import PeriodCancellation
 from .course_succession import CourseSuccession
 from .confirmation import Confirmation
@@ -23,3 +25,5 @@ from .voucher import Voucher
 from .voucher_purpose import VoucherPurpose
 from .song import Song
 from .user_profile import UserProfile
+from .subscription_job import SubscriptionJob
+from .export_job import ExportJob
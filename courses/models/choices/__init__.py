@@ -9,3 +9,5 @@ from .offering_type import OfferingType
 from .course_subscription_type import CourseSubscriptionType
 from .leadfollow import LeadFollow
 from .single_couple import SingleCouple
+from .subscription_job_action import SubscriptionJobAction
+from .job_state import JobState
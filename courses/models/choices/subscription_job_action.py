@@ -0,0 +1,16 @@
+class SubscriptionJobAction:
+    MATCH = "match"
+    MATCH_OPTIMAL = "match_optimal"
+    CONFIRM = "confirm"
+    CONFIRM_ALLOW_SINGLES = "confirm_allow_singles"
+    REJECT = "reject"
+
+    CHOICES = (
+        (MATCH, "Match partners"),
+        (MATCH_OPTIMAL, "Match partners (minimal cost)"),
+        (CONFIRM, "Confirm"),
+        (CONFIRM_ALLOW_SINGLES, "Confirm (allow singles in couple courses)"),
+        (REJECT, "Reject"),
+    )
+
+    MATCH_ACTIONS = [MATCH, MATCH_OPTIMAL]
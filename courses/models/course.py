@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-from collections import defaultdict
 from datetime import date, timedelta
 from decimal import Decimal
 from numbers import Number
@@ -9,8 +8,10 @@ from typing import Optional, Union, Iterable
 from django.conf import settings
 from django.contrib import auth, admin
 from django.contrib.auth.models import User
+from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
-from django.db.models import QuerySet
+from django.db.models import QuerySet, Q
+from django.db.models.signals import post_save, post_delete
 from django.utils.translation import gettext_lazy as _
 from djangocms_text_ckeditor.fields import HTMLField
 from parler.models import TranslatableModel, TranslatedFields
@@ -19,7 +20,6 @@ from courses import managers
 from courses.models import (
     Weekday,
     CourseSubscriptionType,
-    LeadFollow,
     Subscribe,
     Period,
     RegularLesson,
@@ -120,6 +120,20 @@ class Course(TranslatableModel):
     price_special = models.CharField(max_length=255, blank=True, null=True)
     price_special.help_text = "Set this only if you want a different price schema."
 
+    # Lesson schedule, derived from the lessons and the period (see update_lesson_schedule)
+    first_lesson_date = models.DateField(
+        blank=True, null=True, editable=False, db_index=True
+    )
+    last_lesson_date = models.DateField(blank=True, null=True, editable=False)
+    effective_weekday = models.CharField(
+        max_length=3,
+        choices=Weekday.CHOICES,
+        blank=True,
+        null=True,
+        editable=False,
+        db_index=True,
+    )
+
     # Relations
     subscribers = models.ManyToManyField(
         settings.AUTH_USER_MODEL,
@@ -153,21 +167,11 @@ class Course(TranslatableModel):
         }
 
     def payment_totals(self) -> dict[str, Number]:
-        """calculate different statistics in one method (performance optimization)"""
-        totals = defaultdict(Decimal)
-        accepted = self.subscriptions.accepted().prefetch_related(
-            "price_reductions", "subscription_payments"
-        )
-
-        for subscription in accepted.all():
-            totals["to_pay"] += subscription.get_price_to_pay()
-            totals["paid"] += subscription.sum_of_payments()
-            totals["reductions"] += subscription.sum_of_reductions()
-            totals["to_pay_after_reductions"] += subscription.price_after_reductions()
-            totals["open_amount"] += subscription.open_amount()
-
-        totals["difference"] = totals["to_pay_after_reductions"] - totals["paid"]
-
+        """payment statistics of the accepted subscriptions, memoized on the instance"""
+        totals = getattr(self, "_payment_totals", None)
+        if totals is None:
+            totals = self.subscriptions.accepted().financial_totals()
+            self._payment_totals = totals
         return totals
 
     def format_teachers(self) -> str:
@@ -206,114 +210,94 @@ class Course(TranslatableModel):
     def show_free_places_count(self) -> bool:
         return self.max_subscribers is not None
 
+    def get_capacity(self) -> CourseCapacitySnapshot:
+        """
+        returns the capacity snapshot of this course, computed once per instance until the
+        subscriptions change, see forget_capacity
+        """
+        from courses.models import CourseCapacitySnapshot
+
+        capacity = getattr(self, "_capacity", None)
+        if capacity is None:
+            capacity = CourseCapacitySnapshot(
+                counts=self.get_subscription_counts(),
+                max_subscribers=self.max_subscribers,
+                min_subscribers=self.min_subscribers,
+                couple_course=self.type.couple_course,
+            )
+            self._capacity = capacity
+        return capacity
+
+    def forget_capacity(self) -> None:
+        """drops the memoized snapshot and counters, they are read again when needed"""
+        self.__dict__.pop("_capacity", None)
+        if Course.subscription_counts.is_cached(self):
+            Course.subscription_counts.related.delete_cached_value(self)
+
+    def refresh_from_db(self, *args, **kwargs) -> None:
+        self.forget_capacity()
+        super().refresh_from_db(*args, **kwargs)
+
     def has_free_places(self) -> bool:
-        return self.max_subscribers is None or self.get_free_places_count() > 0
+        return self.get_capacity().has_free_places()
 
     def has_free_places_for_leaders(self) -> bool:
-        return self.has_free_places_for(LeadFollow.LEAD)
+        return self.get_capacity().free_places_for_leaders
 
     def has_free_places_for_followers(self) -> bool:
-        return self.has_free_places_for(LeadFollow.FOLLOW)
+        return self.get_capacity().free_places_for_followers
 
     def has_free_places_for(self, lead_or_follow) -> bool:
-        if self.max_subscribers is None:
-            return True
+        return self.get_capacity().has_free_places_for(lead_or_follow)
 
-        free_places = self.get_free_places_count()
-        if free_places == 0:
-            return False
+    def get_subscription_counts(self) -> CourseSubscriptionCounts:
+        """returns the denormalized subscription counters, creating them if missing"""
+        from courses.models import CourseSubscriptionCounts
 
-        matched_count = self.matched_subscriptions_count()
-        total_for_preference = (self.max_subscribers - matched_count) / 2
-        current_count_for_preference = self.single_subscriptions_with_preference_count(
-            lead_or_follow
-        )
-        free_for_preference = total_for_preference - current_count_for_preference
+        if self.pk is None:
+            return CourseSubscriptionCounts()
 
-        return free_for_preference >= 1
+        try:
+            return self.subscription_counts
+        except ObjectDoesNotExist:
+            CourseSubscriptionCounts.objects.rebuild([self.pk])
+            self.subscription_counts = CourseSubscriptionCounts.objects.get(
+                course_id=self.pk
+            )
+            return self.subscription_counts
 
     def active_subscriptions_count(self) -> int:
-        return len(
-            {
-                subscription
-                for subscription in self.subscriptions.all()
-                if subscription.is_active()
-            }
-        )
+        return self.get_capacity().active_count
 
     def matched_subscriptions_count(self) -> int:
-        return len(
-            {
-                subscription
-                for subscription in self.subscriptions.all()
-                if subscription.is_matched()
-            }
-        )
+        return self.get_capacity().matched_count
 
     def single_subscriptions_with_preference_count(self, lead_or_follow) -> int:
-        return len(
-            {
-                s
-                for s in self.subscriptions.all()
-                if s.is_single_with_preference(lead_or_follow)
-            }
-        )
+        return self.get_capacity().single_with_preference_count(lead_or_follow)
 
     def get_free_places_count(self) -> Optional[int]:
-        # No maximum => free places is not defined
-        if self.max_subscribers is None:
-            return None
-
-        total_count = self.max_subscribers - self.active_subscriptions_count()
-        total_count = int(max(total_count, 0))
-
-        return total_count
+        return self.get_capacity().free_places_count
 
     def get_confirmed_count(self) -> int:
-        return self.subscriptions.accepted().count()
+        return self.get_capacity().accepted_count
 
     def get_matched_and_individual_counts(self) -> tuple[int, int, int, int]:
-        matched_count = self.matched_subscriptions_count()
-        leads_count = self.single_subscriptions_with_preference_count(LeadFollow.LEAD)
-        follows_count = self.single_subscriptions_with_preference_count(
-            LeadFollow.FOLLOW
-        )
-        no_preference_count = self.single_subscriptions_with_preference_count(
-            LeadFollow.NO_PREFERENCE
+        capacity = self.get_capacity()
+        return (
+            capacity.matched_count,
+            capacity.leads_count,
+            capacity.follows_count,
+            capacity.no_preference_count,
         )
 
-        return matched_count, leads_count, follows_count, no_preference_count
-
     def number_of_possible_couples(self) -> int:
-        (
-            matched_count,
-            leads_count,
-            follows_count,
-            no_preference_count,
-        ) = self.get_matched_and_individual_counts()
-
-        smaller_set_size = min(leads_count, follows_count)
-        larger_set_size = max(leads_count, follows_count)
-
-        diff = larger_set_size - smaller_set_size
-
-        if no_preference_count <= diff:
-            return matched_count // 2 + smaller_set_size + no_preference_count
-
-        remaining = no_preference_count - diff
-        return matched_count // 2 + larger_set_size + remaining // 2
+        return self.get_capacity().possible_couples_count
 
     def min_number_of_couples(self) -> int:
-        return (self.min_subscribers + 1) // 2  # round up
+        return self.get_capacity().min_number_of_couples()
 
     def has_enough_participants(self) -> bool:
-        if self.min_subscribers is None:
-            return True  # If there is no minimum number of subscribers, we always have enough participants
-
-        if self.type.couple_course:
-            return self.number_of_possible_couples() >= self.min_number_of_couples()
-
-        return self.active_subscriptions_count() >= self.min_subscribers
+        return self.get_capacity().enough_participants
 
     def participants_info_title(self) -> str:
         if self.active_subscriptions_count() == 0:
@@ -602,6 +586,27 @@ class Course(TranslatableModel):
         else:
             return None
 
+    def get_effective_weekday(self) -> Optional[str]:
+        """returns the weekday of the first regular lesson or the common weekday of the irregular lessons"""
+        first_regular_lesson = self.get_first_regular_lesson()
+        if first_regular_lesson is not None:
+            return first_regular_lesson.weekday
+        return self.get_common_irregular_weekday()
+
+    def compute_lesson_schedule(self) -> dict[str, Optional[Union[date, str]]]:
+        return dict(
+            first_lesson_date=self.get_first_lesson_date(),
+            last_lesson_date=self.get_last_lesson_date(),
+            effective_weekday=self.get_effective_weekday(),
+        )
+
+    def update_lesson_schedule(self) -> None:
+        """recomputes the persisted lesson schedule fields without triggering save signals"""
+        schedule = self.compute_lesson_schedule()
+        for field, value in schedule.items():
+            setattr(self, field, value)
+        Course.objects.filter(pk=self.pk).update(**schedule)
+
     def get_teachers_welcomed(self) -> bool:
         return self.teaching.filter(welcomed=True).count() > 0
 
@@ -652,3 +657,53 @@ class Course(TranslatableModel):
 
     def __str__(self) -> str:
         return f"{self.name} ({self.offering})"
+
+
+# The lesson schedule only depends on the lessons and the period of a course.
+# Lesson exceptions and period cancellations do not move the first or last lesson date.
+
+
+def update_lesson_schedule_of_course(
+    instance: Course, created: bool, update_fields=None, raw=False, **kwargs
+) -> None:
+    if raw or created:
+        return
+    if update_fields is not None and not {"period", "offering"} & set(update_fields):
+        return
+    instance.update_lesson_schedule()
+
+
+def update_lesson_schedule_of_lesson_course(instance, raw=False, **kwargs) -> None:
+    if not raw:
+        Course.objects.filter(pk=instance.course_id).update_lesson_schedules()
+
+
+def update_lesson_schedule_of_period_courses(
+    instance: Period, raw=False, **kwargs
+) -> None:
+    if not raw:
+        Course.objects.filter(
+            Q(period=instance) | Q(period__isnull=True, offering__period=instance)
+        ).update_lesson_schedules()
+
+
+def update_lesson_schedule_of_offering_courses(
+    instance, created: bool, raw=False, **kwargs
+) -> None:
+    if not raw and not created:
+        Course.objects.filter(
+            offering=instance, period__isnull=True
+        ).update_lesson_schedules()
+
+
+def connect_lesson_schedule_updates() -> None:
+    post_save.connect(update_lesson_schedule_of_course, sender=Course)
+    for lesson_model in (RegularLesson, IrregularLesson):
+        post_save.connect(update_lesson_schedule_of_lesson_course, sender=lesson_model)
+        post_delete.connect(
+            update_lesson_schedule_of_lesson_course, sender=lesson_model
+        )
+    post_save.connect(update_lesson_schedule_of_period_courses, sender=Period)
+    post_save.connect(
+        update_lesson_schedule_of_offering_courses, sender="courses.Offering"
+    )
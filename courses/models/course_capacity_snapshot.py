@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from . import LeadFollow, CourseSubscriptionCounts
+
+
+class CourseCapacitySnapshot:
+    """
+    Capacity figures of a course, computed once from its subscription counters.
+    All capacity methods of Course delegate to a snapshot memoized on the course instance.
+    """
+
+    def __init__(
+        self,
+        counts: CourseSubscriptionCounts,
+        max_subscribers: Optional[int],
+        min_subscribers: Optional[int],
+        couple_course: bool,
+    ) -> None:
+        self.active_count = counts.active
+        self.matched_count = counts.matched
+        self.leads_count = counts.single_leaders
+        self.follows_count = counts.single_followers
+        self.no_preference_count = counts.single_no_preference
+        self.accepted_count = counts.accepted
+        self.paid_count = counts.paid
+
+        self.max_subscribers = max_subscribers
+        self.min_subscribers = min_subscribers
+        self.couple_course = couple_course
+
+        self.free_places_count = self._compute_free_places_count()
+        self.free_places_for_leaders = self._has_free_places_for(LeadFollow.LEAD)
+        self.free_places_for_followers = self._has_free_places_for(LeadFollow.FOLLOW)
+        self.possible_couples_count = self._compute_possible_couples_count()
+        self.enough_participants = self._has_enough_participants()
+
+    def single_with_preference_count(self, lead_or_follow: str) -> int:
+        return {
+            LeadFollow.LEAD: self.leads_count,
+            LeadFollow.FOLLOW: self.follows_count,
+            LeadFollow.NO_PREFERENCE: self.no_preference_count,
+        }[lead_or_follow]
+
+    def has_free_places(self) -> bool:
+        return self.max_subscribers is None or self.free_places_count > 0
+
+    def has_free_places_for(self, lead_or_follow: str) -> bool:
+        if lead_or_follow == LeadFollow.LEAD:
+            return self.free_places_for_leaders
+        if lead_or_follow == LeadFollow.FOLLOW:
+            return self.free_places_for_followers
+        return self._has_free_places_for(lead_or_follow)
+
+    def min_number_of_couples(self) -> int:
+        return (self.min_subscribers + 1) // 2  # round up
+
+    def _compute_free_places_count(self) -> Optional[int]:
+        # No maximum => free places is not defined
+        if self.max_subscribers is None:
+            return None
+
+        return int(max(self.max_subscribers - self.active_count, 0))
+
+    def _has_free_places_for(self, lead_or_follow: str) -> bool:
+        if self.max_subscribers is None:
+            return True
+
+        if self.free_places_count == 0:
+            return False
+
+        total_for_preference = (self.max_subscribers - self.matched_count) / 2
+        current_count_for_preference = self.single_with_preference_count(lead_or_follow)
+        free_for_preference = total_for_preference - current_count_for_preference
+
+        return free_for_preference >= 1
+
+    def _compute_possible_couples_count(self) -> int:
+        smaller_set_size = min(self.leads_count, self.follows_count)
+        larger_set_size = max(self.leads_count, self.follows_count)
+
+        diff = larger_set_size - smaller_set_size
+
+        if self.no_preference_count <= diff:
+            return self.matched_count // 2 + smaller_set_size + self.no_preference_count
+
+        remaining = self.no_preference_count - diff
+        return self.matched_count // 2 + larger_set_size + remaining // 2
+
+    def _has_enough_participants(self) -> bool:
+        if self.min_subscribers is None:
+            return True  # If there is no minimum number of subscribers, we always have enough participants
+
+        if self.couple_course:
+            return self.possible_couples_count >= self.min_number_of_couples()
+
+        return self.active_count >= self.min_subscribers
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from collections import Counter
+
+from django.db import models
+from django.db.models import CASCADE
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from courses import managers
+from . import Subscribe, SubscribeState, MatchingState, LeadFollow
+
+SINGLE_PREFERENCE_COUNTERS = {
+    LeadFollow.LEAD: "single_leaders",
+    LeadFollow.FOLLOW: "single_followers",
+    LeadFollow.NO_PREFERENCE: "single_no_preference",
+}
+
+
+class CourseSubscriptionCounts(models.Model):
+    """Denormalized subscription counters of a course, kept in sync by the Subscribe signals below"""
+
+    course = models.OneToOneField(
+        "Course",
+        primary_key=True,
+        related_name="subscription_counts",
+        on_delete=CASCADE,
+    )
+    active = models.IntegerField(default=0)
+    matched = models.IntegerField(default=0)
+    single_leaders = models.IntegerField(default=0)
+    single_followers = models.IntegerField(default=0)
+    single_no_preference = models.IntegerField(default=0)
+    accepted = models.IntegerField(default=0)
+    paid = models.IntegerField(default=0)
+
+    COUNTERS = [
+        "active",
+        "matched",
+        "single_leaders",
+        "single_followers",
+        "single_no_preference",
+        "accepted",
+        "paid",
+    ]
+
+    objects = managers.CourseSubscriptionCountsManager()
+
+    @staticmethod
+    def counters_of(state: str, matching_state: str, lead_follow: str) -> Counter:
+        """returns the counters a subscription with the given values contributes to"""
+        counters = Counter()
+        if state not in SubscribeState.REJECTED_STATES:
+            counters["active"] += 1
+            if matching_state in MatchingState.MATCHED_STATES:
+                counters["matched"] += 1
+            if (
+                matching_state in MatchingState.TO_MATCH_STATES
+                and lead_follow in SINGLE_PREFERENCE_COUNTERS
+            ):
+                counters[SINGLE_PREFERENCE_COUNTERS[lead_follow]] += 1
+        if state in SubscribeState.ACCEPTED_STATES:
+            counters["accepted"] += 1
+        if state in SubscribeState.PAID_STATES:
+            counters["paid"] += 1
+        return counters
+
+    def single_with_preference(self, lead_or_follow: str) -> int:
+        return getattr(self, SINGLE_PREFERENCE_COUNTERS[lead_or_follow])
+
+    def as_dict(self) -> dict[str, int]:
+        return {counter: getattr(self, counter) for counter in self.COUNTERS}
+
+    class Meta:
+        verbose_name_plural = "Course subscription counts"
+
+    def __str__(self) -> str:
+        return f"Subscription counts of {self.course}"
+
+
+def forget_course_capacities(subscriptions) -> None:
+    """the courses of the given subscriptions read their changed counters again when needed"""
+    for subscription in subscriptions:
+        if Subscribe.course.is_cached(subscription):
+            subscription.course.forget_capacity()
+
+
+def _subscription_counters(subscription: Subscribe) -> Counter:
+    return CourseSubscriptionCounts.counters_of(
+        subscription.state, subscription.matching_state, subscription.lead_follow
+    )
+
+
+def remember_counted_subscription(instance: Subscribe, **kwargs) -> None:
+    """remembers what the stored version of the subscription was counted as"""
+    instance._counted_course_id = None
+    instance._counted_as = Counter()
+    if instance.pk is None:
+        return
+
+    stored = (
+        Subscribe.objects.filter(pk=instance.pk)
+        .values("course_id", "state", "matching_state", "lead_follow")
+        .first()
+    )
+    if stored is not None:
+        instance._counted_course_id = stored["course_id"]
+        instance._counted_as = CourseSubscriptionCounts.counters_of(
+            stored["state"], stored["matching_state"], stored["lead_follow"]
+        )
+
+
+def update_counts_on_save(instance: Subscribe, **kwargs) -> None:
+    counted_course_id = getattr(instance, "_counted_course_id", None)
+    counted_as = getattr(instance, "_counted_as", Counter())
+    counters = _subscription_counters(instance)
+
+    if counted_course_id is not None and counted_course_id != instance.course_id:
+        CourseSubscriptionCounts.objects.apply_delta(
+            counted_course_id, {k: -v for k, v in counted_as.items()}
+        )
+        counted_as = Counter()
+
+    delta = {
+        counter: counters[counter] - counted_as[counter]
+        for counter in CourseSubscriptionCounts.COUNTERS
+        if counters[counter] != counted_as[counter]
+    }
+    CourseSubscriptionCounts.objects.apply_delta(instance.course_id, delta)
+    forget_course_capacities([instance])
+
+
+def update_counts_on_delete(instance: Subscribe, **kwargs) -> None:
+    counters = _subscription_counters(instance)
+    CourseSubscriptionCounts.objects.apply_delta(
+        instance.course_id, {k: -v for k, v in counters.items()}
+    )
+    forget_course_capacities([instance])
+
+
+def create_counts_for_new_course(instance, created: bool, **kwargs) -> None:
+    if created:
+        CourseSubscriptionCounts.objects.get_or_create(course_id=instance.pk)
+
+
+def connect_subscription_counts() -> None:
+    pre_save.connect(remember_counted_subscription, sender=Subscribe)
+    post_save.connect(update_counts_on_save, sender=Subscribe)
+    post_delete.connect(update_counts_on_delete, sender=Subscribe)
+    post_save.connect(create_counts_for_new_course, sender="courses.Course")
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from django.contrib.auth.models import User
+from django.db import models
+
+from tq_website.storages import FinanceStorage, MediaStorage
+from . import JobState
+
+
+class ExportJob(models.Model):
+    """An export written to the media or finance storage by a celery worker"""
+
+    # exports with payment information or revenues are written to the finance storage
+    FINANCE_EXPORTS = {"teacher_payment_information", "offering_revenue"}
+
+    export = models.CharField(max_length=50)
+    arguments = models.JSONField(default=dict, blank=True)
+    fingerprint = models.CharField(max_length=64, db_index=True)
+    fingerprint.help_text = (
+        "Hash of the export and its arguments, identical exports are reused."
+    )
+    state = models.CharField(
+        max_length=30, choices=JobState.CHOICES, default=JobState.PENDING
+    )
+    file = models.FileField(
+        storage=MediaStorage(), upload_to="exports/%Y/%m/", blank=True
+    )
+    finance_file = models.FileField(
+        storage=FinanceStorage(), upload_to="exports/%Y/%m/", blank=True
+    )
+    error = models.TextField(blank=True, default="")
+    created_by = models.ForeignKey(
+        User, blank=True, null=True, on_delete=models.SET_NULL
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def is_finished(self) -> bool:
+        return self.state in JobState.FINISHED_STATES
+
+    def is_accessible_by(self, user: User) -> bool:
+        return user.is_staff or self.created_by_id == user.id
+
+    @property
+    def stored_file(self) -> models.fields.files.FieldFile:
+        """the file of the export in the storage it belongs to"""
+        return self.finance_file if self.export in self.FINANCE_EXPORTS else self.file
+
+    def filename(self) -> str:
+        return self.stored_file.name.rsplit("/", 1)[-1] if self.stored_file else ""
+
+    def as_progress(self) -> dict:
+        return dict(
+            state=self.state,
+            error=self.error,
+            url=(
+                self.stored_file.url
+                if self.state == JobState.DONE and self.stored_file
+                else None
+            ),
+        )
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return "Export {} ({})".format(self.export, self.get_state_display())
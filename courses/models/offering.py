@@ -3,6 +3,7 @@ from datetime import date
 from decimal import Decimal
 
 from django.db import models
+from django.db.models import QuerySet
 
 from . import OfferingType
 
@@ -75,12 +76,28 @@ class Offering(models.Model):
         }
 
     def payment_totals(self) -> dict[str, Decimal]:
-        totals = defaultdict(Decimal)
-        for course in self.course_set.all():
-            for key, value in course.payment_totals().items():
-                totals[key] += value
+        """payment statistics of the accepted subscriptions of all courses, memoized"""
+        totals = getattr(self, "_payment_totals", None)
+        if totals is None:
+            totals = self._accepted_subscriptions().financial_totals()
+            self._payment_totals = totals
         return totals
 
+    def courses_with_payment_totals(self) -> list["Course"]:
+        """the courses of the offering with their payment totals, computed in one query"""
+        totals_by_course = self._accepted_subscriptions().financial_totals_by_course()
+        courses = list(self.course_set.all())
+        for course in courses:
+            course._payment_totals = totals_by_course.get(
+                course.id, defaultdict(Decimal)
+            )
+        return courses
+
+    def _accepted_subscriptions(self) -> QuerySet:
+        from courses.models import Subscribe
+
+        return Subscribe.objects.filter(course__offering=self).accepted()
+
     def __str__(self) -> str:
         return "{}".format(self.name)
 
@@ -15,7 +15,9 @@ from django.db.models import (
     CharField,
     DateTimeField,
     DecimalField,
+    Index,
 )
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 from reversion import revisions as reversion
 
@@ -350,5 +352,11 @@ class Subscribe(Model):
         else:
             super(Subscribe, self).delete(*args, **kwargs)
 
+    class Meta:
+        indexes = [
+            # the payment processor resolves USIs typed by users case insensitively
+            Index(Upper("usi"), name="courses_subscribe_usi_upper"),
+        ]
+
     def __str__(self) -> str:
         return "{} subscribes to {}".format(self.user.get_full_name(), self.course)
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import models
+
+from . import SubscriptionJobAction, JobState
+
+PROGRESS_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+class SubscriptionJob(models.Model):
+    """A matching, confirmation or rejection of many subscriptions, run by a celery worker"""
+
+    action = models.CharField(max_length=30, choices=SubscriptionJobAction.CHOICES)
+    state = models.CharField(
+        max_length=30, choices=JobState.CHOICES, default=JobState.PENDING
+    )
+    subscription_ids = models.JSONField(default=list)
+    options = models.JSONField(default=dict, blank=True)
+    options.help_text = "Arguments of the action, e.g. the rejection reason."
+    total = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    result = models.JSONField(default=dict, blank=True)
+    result.help_text = (
+        "Summary of the finished job, e.g. the number of confirmed subscriptions."
+    )
+    error = models.TextField(blank=True, default="")
+    created_by = models.ForeignKey(
+        User, blank=True, null=True, on_delete=models.SET_NULL
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    @property
+    def progress_cache_key(self) -> str:
+        return "courses:subscription_job:{}:progress".format(self.pk)
+
+    def is_finished(self) -> bool:
+        return self.state in JobState.FINISHED_STATES
+
+    def as_progress(self) -> dict:
+        return dict(
+            state=self.state,
+            total=self.total,
+            processed=self.processed,
+            result=self.result,
+            error=self.error,
+        )
+
+    def save_progress(self, *fields: str) -> None:
+        """stores the progress in the database and in the cache polled by the admin page"""
+        self.save(update_fields=["state", "processed", *fields])
+        cache.set(self.progress_cache_key, self.as_progress(), PROGRESS_CACHE_TIMEOUT)
+
+    def get_progress(self) -> dict:
+        return cache.get(self.progress_cache_key) or self.as_progress()
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self) -> str:
+        return "{} of {} subscriptions ({})".format(
+            self.get_action_display(), self.total, self.get_state_display()
+        )
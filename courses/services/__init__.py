@@ -6,3 +6,6 @@ from .users import *
 from .courses import *
 from .export import *
 from .matching import *
+from .page_cache import *
+from .subscription_jobs import *
+from .export_jobs import *
@@ -9,7 +9,7 @@ from courses import models as models
 from courses.models import Voucher, Course
 from courses.services import get_subsequent_offering
 from courses.services.general import log
-from email_system.services import send_all_emails
+from email_system.services import send_emails
 from payment.utils.generate_voucher_pdf import generate_voucher_pdfs
 from survey.models import SurveyInstance, Survey
 from tq_website import settings
@@ -92,7 +92,7 @@ def send_course_email(data: dict[str, Any], courses: Iterable[Course]) -> None:
             )
 
     log.info("Sending {} emails".format(len(emails)))
-    send_all_emails(emails)
+    send_emails(emails)
 
 
 def send_vouchers(data, recipients, user):
@@ -134,4 +134,4 @@ def send_vouchers(data, recipients, user):
         )
 
     log.info("Sending {} emails".format(len(emails)))
-    send_all_emails(emails)
+    send_emails(emails)
@@ -1,76 +1,78 @@
-from typing import Iterable, Optional
+from typing import Iterable, Iterator, Optional
 
-from django.http import HttpResponse
+from django.db.models import QuerySet
+from django.http.response import HttpResponseBase
 
 from courses import models as models
 from utils import export
 
 
+def _subscription_rows(
+    course: models.Course, subscriptions: QuerySet, export_format: str
+) -> Iterator[list]:
+    if export_format == "csv_google":
+        yield [
+            "Given Name",
+            "Family Name",
+            "Gender",
+            "E-mail 1 - Type",
+            "E-mail 1 - Value",
+            "Phone 1 - Type",
+            "Phone 1 - Value",
+        ]
+        for s in subscriptions.iterator():
+            yield [
+                s.user.first_name,
+                s.user.last_name,
+                s.user.profile.gender,
+                "* Private",
+                s.user.email,
+                "* Private",
+                s.user.profile.phone_number,
+            ]
+
+    yield (
+        ["First name", "Last name", "E-Mail", "Mobile"]
+        + (["Lead/Follow", "Partner"] if course.type.couple_course else [])
+        + ["Student status", "Course fees"]
+    )
+
+    for s in subscriptions.iterator():
+        yield [
+            s.user.first_name,
+            s.user.last_name,
+            s.user.email,
+            s.user.profile.phone_number,
+        ] + (
+            [s.get_assigned_role_str(), s.get_partner_name()]
+            if course.type.couple_course
+            else []
+        ) + [
+            "student" if s.user.profile.is_student() else "not a student",
+            s.price_to_pay,
+        ]
+
+
 def export_subscriptions(
     course_ids: Iterable[int], export_format: str
-) -> Optional[HttpResponse]:
+) -> Optional[HttpResponseBase]:
+    """the rows are generated while the export is written, one course at a time"""
     export_data = []
+    course_ids = list(course_ids)
+    courses = models.Course.objects.select_related("type").in_bulk(course_ids)
     for course_id in course_ids:
-        course = models.Course.objects.get(id=course_id)
+        course = courses[course_id]
         subscriptions = (
             models.Subscribe.objects.accepted()
-            .filter(course_id=course_id)
+            .filter(course=course)
+            .select_related("user__profile", "partner")
             .order_by("user__first_name")
         )
 
-        data = []
-        if export_format == "csv_google":
-            data.append(
-                [
-                    "Given Name",
-                    "Family Name",
-                    "Gender",
-                    "E-mail 1 - Type",
-                    "E-mail 1 - Value",
-                    "Phone 1 - Type",
-                    "Phone 1 - Value",
-                ]
-            )
-            for s in subscriptions:
-                data.append(
-                    [
-                        s.user.first_name,
-                        s.user.last_name,
-                        s.user.profile.gender,
-                        "* Private",
-                        s.user.email,
-                        "* Private",
-                        s.user.profile.phone_number,
-                    ]
-                )
-
         if export_format == "vcard":
-            data = [subscription.user for subscription in subscriptions]
+            data = (subscription.user for subscription in subscriptions.iterator())
         else:
-            data.append(
-                ["First name", "Last name", "E-Mail", "Mobile"]
-                + (["Lead/Follow", "Partner"] if course.type.couple_course else [])
-                + ["Student status", "Course fees"]
-            )
-
-            for s in subscriptions:
-                data.append(
-                    [
-                        s.user.first_name,
-                        s.user.last_name,
-                        s.user.email,
-                        s.user.profile.phone_number,
-                    ]
-                    + (
-                        [s.get_assigned_role_str(), s.get_partner_name()]
-                        if course.type.couple_course
-                        else []
-                    )
-                    + [
-                        "student" if s.user.profile.is_student() else "not a student",
-                        s.price_to_pay,
-                    ]
-                )
+            data = _subscription_rows(course, subscriptions, export_format)
 
         export_data.append({"name": course.name, "data": data})
 
@@ -139,3 +141,22 @@ def export_teacher_payment_information(
             dict(data=personal_data, name="Personal Data"),
         ],
     )
+
+
+def _offerings(offering_ids: Optional[list[int]]) -> QuerySet[models.Offering]:
+    offerings = models.Offering.objects.all()
+    return offerings if offering_ids is None else offerings.filter(pk__in=offering_ids)
+
+
+def export_summary_of_offerings(
+    export_format: str = "csv", offering_ids: Optional[list[int]] = None
+) -> HttpResponseBase:
+    """the summary of the offerings with the given ids, or of all offerings if None"""
+    return export_summary(export_format, _offerings(offering_ids))
+
+
+def export_teacher_payment_information_of_offerings(
+    export_format: str = "csv", offering_ids: Optional[list[int]] = None
+) -> HttpResponseBase:
+    """the teacher payment information of the offerings with the given ids, or of all if None"""
+    return export_teacher_payment_information(export_format, _offerings(offering_ids))
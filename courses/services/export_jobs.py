@@ -0,0 +1,143 @@
+import hashlib
+import json
+import re
+from datetime import timedelta
+from functools import partial
+from tempfile import TemporaryFile
+from typing import Optional
+
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.db import transaction
+from django.http import HttpRequest, HttpResponseRedirect
+from django.http.response import HttpResponseBase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from courses.models import ExportJob, JobState
+from courses.services.general import log
+
+# the exports which can run as a job, the arguments passed to them must be JSON serializable
+EXPORTS = {
+    "subscriptions": "courses.services.export_subscriptions",
+    "summary": "courses.services.export_summary_of_offerings",
+    "teacher_payment_information": "courses.services.export_teacher_payment_information_of_offerings",
+    "surveys": "survey.services.export_surveys_by_ids",
+    "offering_revenue": "payment.services.export_offering_revenue_report",
+}
+
+# an identical export requested within this time is served from the existing file
+EXPORT_REUSE_TTL = timedelta(minutes=15)
+EXPORT_RETENTION = timedelta(days=7)
+
+RE_FILENAME = re.compile(r'filename="?([^";]+)"?')
+
+
+def export_fingerprint(export: str, arguments: dict) -> str:
+    key = json.dumps([export, arguments], sort_keys=True, default=str)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def start_export_job(export: str, user: User = None, **arguments) -> ExportJob:
+    """
+    Reuses a pending, running or recently finished job of the same export with the same arguments
+    visible to the user, otherwise stores a new job and hands it to a celery worker once the
+    current transaction is committed.
+    """
+    if export not in EXPORTS:
+        raise ValueError("unknown export {}".format(export))
+
+    user = user if user and user.is_authenticated else None
+    fingerprint = export_fingerprint(export, arguments)
+    candidates = ExportJob.objects.filter(
+        fingerprint=fingerprint,
+        created_at__gte=timezone.now() - EXPORT_REUSE_TTL,
+    ).exclude(state=JobState.FAILED)
+    if not (user and user.is_staff):
+        candidates = candidates.filter(created_by=user)
+    job = candidates.order_by("-created_at").first()
+    if job is not None:
+        log.info("reusing export job {}: {}".format(job.id, job))
+        return job
+
+    job = ExportJob.objects.create(
+        export=export, arguments=arguments, fingerprint=fingerprint, created_by=user
+    )
+    log.info("queued export job {}: {}".format(job.id, job))
+    transaction.on_commit(partial(_enqueue_export_job, job.id))
+    return job
+
+
+def start_export(
+    request: HttpRequest, export: str, **arguments
+) -> HttpResponseRedirect:
+    """starts the export as a job and redirects to the page offering its download"""
+    job = start_export_job(export, request.user, **arguments)
+    return HttpResponseRedirect(reverse("courses:export_job", args=[job.id]))
+
+
+def _enqueue_export_job(job_id: int) -> None:
+    from tq_website.tasks import task_run_export_job
+
+    task_run_export_job.delay(job_id)
+
+
+def _attachment_filename(response: HttpResponseBase, export: str) -> str:
+    match = RE_FILENAME.search(response.get("Content-Disposition", ""))
+    return match.group(1) if match else export
+
+
+def _response_chunks(response: HttpResponseBase):
+    if response.streaming:
+        yield from response.streaming_content
+    else:
+        yield response.content
+
+
+def run_export_job(job_id: int) -> ExportJob:
+    """runs the export and writes the file it responds with to the storage of the job"""
+    job = ExportJob.objects.get(pk=job_id)
+    if job.state != JobState.PENDING:
+        log.warning("export job {} was already started".format(job.id))
+        return job
+
+    job.state = JobState.RUNNING
+    job.save(update_fields=["state"])
+
+    try:
+        response: Optional[HttpResponseBase] = import_string(EXPORTS[job.export])(
+            **job.arguments
+        )
+        if response is None:
+            raise ValueError("nothing to export")
+        with TemporaryFile() as file:
+            for chunk in _response_chunks(response):
+                file.write(chunk)
+            file.seek(0)
+            job.stored_file.save(
+                _attachment_filename(response, job.export), File(file), save=False
+            )
+    except Exception as e:
+        log.exception("export job {} failed".format(job.id))
+        job.state = JobState.FAILED
+        job.error = str(e)
+    else:
+        job.state = JobState.DONE
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=["state", "file", "finance_file", "error", "finished_at"])
+    log.info("export job {} finished: {}".format(job.id, job.stored_file.name))
+    return job
+
+
+def delete_expired_export_jobs() -> int:
+    """deletes the jobs older than the retention period and their files"""
+    jobs = ExportJob.objects.filter(created_at__lt=timezone.now() - EXPORT_RETENTION)
+    count = 0
+    for job in jobs:
+        if job.stored_file:
+            job.stored_file.delete(save=False)
+        job.delete()
+        count += 1
+    return count
@@ -1,2 +1,3 @@
 from .change_matching import *
 from .do_matching import *
+from .optimal_matching import *
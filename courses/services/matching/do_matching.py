@@ -1,4 +1,7 @@
 import logging
+from itertools import groupby
+from operator import attrgetter
+from typing import Optional
 
 from django.contrib import messages
 from django.db import transaction
@@ -7,7 +10,9 @@ from django.utils.translation import gettext as _
 
 from courses import models as models
 from courses.managers import SubscribeQuerySet
-from courses.models import LeadFollow, Subscribe
+from courses.models import LeadFollow, Subscribe, CourseSubscriptionCounts
+from courses.models.course_subscription_counts import forget_course_capacities
+from .optimal_matching import MatchingCost, optimal_pairs, pairs_cost
 
 log = logging.getLogger("matching")
 
@@ -93,57 +98,175 @@ def _partition_subscribes(
     return a, b
 
 
-@transaction.atomic
-def _match_for_course(subscriptions: SubscribeQuerySet, course_id: int) -> int:
+class MatchingReport:
     """
-    Partitions the single subscribes into two lists.
-    Afterwards, the lists are merged based on height
+    Result of a matching run: the matched pairs, the singles left over and counts per course.
+    With a cost function, also the cost of the pairs compared to the pairs of the height zip.
     """
-    to_match = list(
-        subscriptions.to_match().filter(course__id=course_id).order_by("date")
-    )
 
-    a, b = _partition_subscribes(to_match)
-    assert len(a) == len(b)
+    def __init__(self, cost: Optional[MatchingCost] = None) -> None:
+        self.cost = cost
+        self.pairs: list[tuple[Subscribe, Subscribe]] = []
+        self.dropped: list[Subscribe] = []
+        self.course_counts: dict[int, dict[str, int]] = {}
+        self.course_pairs: dict[int, list[tuple[Subscribe, Subscribe]]] = {}
+        self.course_costs: dict[int, dict[str, float]] = {}
+
+    @property
+    def match_count(self) -> int:
+        return len(self.pairs)
+
+    @property
+    def total_cost(self) -> float:
+        return sum(costs["cost"] for costs in self.course_costs.values())
+
+    @property
+    def greedy_cost(self) -> float:
+        return sum(costs["greedy_cost"] for costs in self.course_costs.values())
+
+    def add_course(
+        self,
+        course_id: int,
+        pairs: list[tuple[Subscribe, Subscribe]],
+        dropped: list[Subscribe],
+        greedy_pairs: Optional[list[tuple[Subscribe, Subscribe]]] = None,
+    ) -> None:
+        self.pairs += pairs
+        self.dropped += dropped
+        self.course_counts[course_id] = dict(
+            singles=2 * len(pairs) + len(dropped),
+            pairs=len(pairs),
+            dropped=len(dropped),
+        )
+        self.course_pairs[course_id] = pairs
+        if self.cost is not None:
+            self.course_costs[course_id] = dict(
+                cost=pairs_cost(pairs, self.cost),
+                greedy_cost=pairs_cost(greedy_pairs or pairs, self.cost),
+            )
+
+    def preview(self) -> list[dict]:
+        """the pairs of each course with their costs, as shown before matching"""
+        preview = []
+        for course_id, pairs in self.course_pairs.items():
+            subscribes = [s for pair in pairs for s in pair] + [
+                s for s in self.dropped if s.course_id == course_id
+            ]
+            preview.append(
+                dict(
+                    course=subscribes[0].course if subscribes else None,
+                    pairs=[
+                        (a, b, self.cost(a, b) if self.cost else None) for a, b in pairs
+                    ],
+                    dropped=self.course_counts[course_id]["dropped"],
+                    **self.course_costs.get(course_id, {}),
+                )
+            )
+        return preview
+
 
-    def sort_key(subscribe: Subscribe) -> int:
-        default_value = 250  # people of unknown height should be the last in the list
-        return subscribe.user.profile.body_height or default_value
+def _height_sort_key(subscribe: Subscribe) -> int:
+    default_value = 250  # people of unknown height should be the last in the list
+    return subscribe.user.profile.body_height or default_value
 
-    a.sort(key=sort_key)
-    b.sort(key=sort_key)
 
-    for subscribe_a, subscribe_b in zip(a, b):
+def _zip_by_height(
+    a: list[Subscribe], b: list[Subscribe]
+) -> list[tuple[Subscribe, Subscribe]]:
+    return list(zip(sorted(a, key=_height_sort_key), sorted(b, key=_height_sort_key)))
+
+
+def _pair_course(
+    to_match: list[Subscribe],
+    cost: Optional[MatchingCost] = None,
+) -> tuple[
+    list[tuple[Subscribe, Subscribe]],
+    list[Subscribe],
+    list[tuple[Subscribe, Subscribe]],
+]:
+    """
+    Partitions the single subscribes of a course into two lists.
+    Afterwards, the lists are merged based on height, or with minimal total cost if a cost
+    function is given. Also returns the pairs of the height merge for comparison.
+    """
+    a, b = _partition_subscribes(to_match)
+    assert len(a) == len(b)
+
+    greedy_pairs = _zip_by_height(a, b)
+    pairs = greedy_pairs if cost is None else optimal_pairs(a, b, cost)
+    for subscribe_a, subscribe_b in pairs:
         assert LeadFollow.is_compatible(
             subscribe_a.lead_follow, subscribe_b.lead_follow
         )
         log.info("going to match '{}' with '{}'".format(subscribe_a, subscribe_b))
 
+    paired_ids = {s.id for s in a + b}
+    dropped = [s for s in to_match if s.id not in paired_ids]
+    return pairs, dropped, greedy_pairs
+
+
+@transaction.atomic
+def match_subscriptions(
+    subscriptions: SubscribeQuerySet,
+    cost: Optional[MatchingCost] = None,
+    dry_run: bool = False,
+) -> MatchingReport:
+    """
+    Matches the singles of all courses of the given subscriptions.
+    Loads them in one query, pairs them in memory and writes all pairs with one bulk update.
+    Without a cost function, the singles are paired by body height. A dry run only
+    returns the report.
+    """
+    to_match = (
+        subscriptions.to_match()
+        .select_related("user__profile")
+        # prefetched, so subscriptions of a course's related manager keep that instance
+        .prefetch_related("course__offering")
+        .select_for_update(of=("self",))
+        .order_by("course_id", "date")
+    )
+
+    report = MatchingReport(cost)
+    for course_id, course_subscriptions in groupby(
+        to_match, key=attrgetter("course_id")
+    ):
+        log.info("matching for course id {}".format(course_id))
+        pairs, dropped, greedy_pairs = _pair_course(list(course_subscriptions), cost)
+        report.add_course(course_id, pairs, dropped, greedy_pairs)
+
+    if dry_run:
+        return report
+
+    for subscribe_a, subscribe_b in report.pairs:
         subscribe_a.partner = subscribe_b.user
         subscribe_a.matching_state = models.MatchingState.MATCHED
-        subscribe_a.save()
-
         subscribe_b.partner = subscribe_a.user
         subscribe_b.matching_state = models.MatchingState.MATCHED
-        subscribe_b.save()
 
-    match_count = len(a)
-    log.info("match count = {}".format(match_count))
-    return match_count
+    Subscribe.objects.bulk_update(
+        [subscribe for pair in report.pairs for subscribe in pair],
+        ["partner", "matching_state"],
+        batch_size=500,
+    )
+    # bulk_update does not send signals, so the counters are recomputed instead
+    CourseSubscriptionCounts.objects.rebuild(list(report.course_counts))
+    forget_course_capacities(subscribe for pair in report.pairs for subscribe in pair)
+
+    log.info("match count = {}".format(report.match_count))
+    return report
 
 
 def match_partners(
-    subscriptions: SubscribeQuerySet, request: HttpRequest = None
-) -> None:
-    courses = subscriptions.values_list("course", flat=True)
-    match_count = 0
-    for course_id in set(courses):
-        log.info("matching for course id {}".format(course_id))
-        match_count += _match_for_course(subscriptions, course_id)
+    subscriptions: SubscribeQuerySet,
+    request: HttpRequest = None,
+    cost: Optional[MatchingCost] = None,
+) -> MatchingReport:
+    report = match_subscriptions(subscriptions, cost)
 
-    log.info("{} couples matched successfully".format(match_count))
+    log.info("{} couples matched successfully".format(report.match_count))
     messages.add_message(
         request,
         messages.SUCCESS,
-        _("{} couples matched successfully").format(match_count),
+        _("{} couples matched successfully").format(report.match_count),
     )
+    return report
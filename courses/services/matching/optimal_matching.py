@@ -0,0 +1,122 @@
+import logging
+from typing import Callable
+
+from courses.models import LeadFollow, Subscribe
+
+log = logging.getLogger("matching")
+
+MatchingCost = Callable[[Subscribe, Subscribe], float]
+
+# cost of a pair with an unknown body height, in cm (about the difference in a typical pair)
+UNKNOWN_HEIGHT_COST = 10.0
+
+
+def height_difference_cost(a: Subscribe, b: Subscribe) -> float:
+    """difference of the body heights in cm"""
+    height_a = a.user.profile.body_height
+    height_b = b.user.profile.body_height
+    if not height_a or not height_b:
+        return UNKNOWN_HEIGHT_COST
+    return float(abs(height_a - height_b))
+
+
+def subscription_date_cost(a: Subscribe, b: Subscribe) -> float:
+    """days between the two subscriptions, so people who subscribed together are paired"""
+    return abs((a.date - b.date).total_seconds()) / (24 * 60 * 60)
+
+
+def no_preference_cost(a: Subscribe, b: Subscribe) -> float:
+    """1 if nobody of the pair chose a role, so a couple with a leader or follower is preferred"""
+    return float(
+        a.lead_follow == LeadFollow.NO_PREFERENCE
+        and b.lead_follow == LeadFollow.NO_PREFERENCE
+    )
+
+
+def weighted_cost(*terms: tuple[MatchingCost, float]) -> MatchingCost:
+    """combines cost terms given as (cost, weight) into one cost function"""
+
+    def cost(a: Subscribe, b: Subscribe) -> float:
+        return sum(weight * term(a, b) for term, weight in terms)
+
+    return cost
+
+
+DEFAULT_MATCHING_COST = weighted_cost(
+    (height_difference_cost, 1.0),
+    (subscription_date_cost, 0.5),
+    (no_preference_cost, 5.0),
+)
+
+
+def min_cost_assignment(costs: list[list[float]]) -> list[int]:
+    """
+    Returns the column assigned to each row such that the total cost is minimal (Hungarian
+    method with shortest augmenting paths, O(n^2 m)). Requires at most as many rows as columns.
+    """
+    n = len(costs)
+    if n == 0:
+        return []
+    m = len(costs[0])
+    assert n <= m
+
+    inf = float("inf")
+    # potentials of rows (u) and columns (v), row assigned to column (p), augmenting path (way)
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+    columns = range(1, m + 1)
+
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        min_v = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            row = costs[i0 - 1]
+            u_i0 = u[i0]
+            delta = inf
+            j1 = 0
+            for j in columns:
+                if not used[j]:
+                    current = row[j - 1] - u_i0 - v[j]
+                    if current < min_v[j]:
+                        min_v[j] = current
+                        way[j] = j0
+                    if min_v[j] < delta:
+                        delta = min_v[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_v[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    assignment = [0] * n
+    for j in columns:
+        if p[j]:
+            assignment[p[j] - 1] = j - 1
+    return assignment
+
+
+def optimal_pairs(
+    a: list[Subscribe], b: list[Subscribe], cost: MatchingCost
+) -> list[tuple[Subscribe, Subscribe]]:
+    """pairs every entry of a with an entry of b such that the sum of the costs is minimal"""
+    assignment = min_cost_assignment([[cost(x, y) for y in b] for x in a])
+    return [(x, b[j]) for x, j in zip(a, assignment)]
+
+
+def pairs_cost(pairs: list[tuple[Subscribe, Subscribe]], cost: MatchingCost) -> float:
+    return sum(cost(x, y) for x, y in pairs)
@@ -2,13 +2,13 @@ from collections import defaultdict
 from datetime import date, time
 from typing import Collection
 
-from django.db.models import Q, QuerySet
+from django.db.models import Q, QuerySet, Prefetch, prefetch_related_objects
 from django.http import Http404
 from django.utils import dateformat
 from django.utils.translation import gettext as _
 
 from courses import models as models
-from courses.managers import CourseManager
+from courses.managers import group_by_month
 from courses.models import (
     Offering,
     OfferingType,
@@ -57,7 +57,7 @@ def get_offerings_by_year(
 def course_sort_key(course: Course) -> tuple:
     default_date = date(year=9999, month=1, day=1)
     default_time = time(hour=23, minute=59, second=59)
-    first_date = course.get_first_lesson_date() or default_date
+    first_date = course.first_lesson_date or default_date
     first_regular = course.get_first_regular_lesson()
     first_irregular = course.get_first_irregular_lesson()
     first_time = (
@@ -74,6 +74,14 @@ def course_sort_key(course: Course) -> tuple:
 
 def get_sections(offering, course_filter=None):
     offering_sections = []
+    if "course_set" not in getattr(offering, "_prefetched_objects_cache", {}):
+        prefetch_related_objects(
+            [offering],
+            Prefetch(
+                "course_set",
+                queryset=Course.objects.with_capacity().in_schedule_order(),
+            ),
+        )
     course_set = offering.course_set
 
     if not course_filter:
@@ -86,21 +94,21 @@ def get_sections(offering, course_filter=None):
         )
         offering_sections.append(dict(courses=courses))
     elif offering.type == OfferingType.REGULAR:
+        courses_by_weekday = defaultdict(list)
+        for c in course_set.all():
+            if course_filter(c):
+                courses_by_weekday[c.effective_weekday].append(c)
+
         for w, w_name in Weekday.CHOICES:
-            courses_on_weekday = [
-                c for c in CourseManager.weekday(course_set, w) if course_filter(c)
-            ]
-            if courses_on_weekday:
+            if courses_by_weekday[w]:
                 offering_sections.append(
                     {
                         "section_title": Weekday.WEEKDAYS_TRANSLATIONS[w],
-                        "courses": sorted(courses_on_weekday, key=course_sort_key),
+                        "courses": sorted(courses_by_weekday[w], key=course_sort_key),
                     }
                 )
 
-        courses_without_weekday = [
-            c for c in CourseManager.weekday(course_set, None) if course_filter(c)
-        ]
+        courses_without_weekday = courses_by_weekday[None]
         if courses_without_weekday:
             offering_sections.append(
                 {
@@ -110,7 +118,7 @@ def get_sections(offering, course_filter=None):
             )
 
     elif offering.type in [OfferingType.IRREGULAR, OfferingType.PARTNER]:
-        courses_by_month = CourseManager.by_month(course_set)
+        courses_by_month = group_by_month(course_set.all())
         for d, courses in courses_by_month:
             if d is None:
                 section_title = _("Unknown month")
@@ -0,0 +1,186 @@
+import hashlib
+import re
+import time
+from datetime import date
+from typing import Callable, Iterable, Optional
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe, SafeString
+from django.utils.translation import get_language
+
+from courses.models import Course, Teach
+
+COURSE_LIST_VERSION_KEY = "courses:course_list:version"
+COURSE_LIST_TIMEOUT = 24 * 60 * 60
+
+# bumped when something shown on every course detail page changes
+COURSE_DETAIL_VERSION_KEY = "courses:course_detail:version"
+COURSE_DETAIL_COURSE_VERSION_KEY = "courses:course_detail:course:{}:version"
+COURSE_DETAIL_COURSE_TYPE_VERSION_KEY = "courses:course_detail:course_type:{}:version"
+COURSE_DETAIL_TIMEOUT = 24 * 60 * 60
+
+SUBSCRIPTION_STATUS_PLACEHOLDER = "<!-- subscription-status {} {} {} -->"
+SUBSCRIPTION_STATUS_PATTERN = re.compile(
+    r"<!-- subscription-status (\d+) ([01]) ([01]) -->"
+)
+
+
+def get_cache_version(version_key: str) -> int:
+    # start at the current time, so an evicted version never reuses old fragments
+    return cache.get_or_set(version_key, time.time_ns, timeout=None)
+
+
+def bump_cache_version(version_key: str) -> None:
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.set(version_key, time.time_ns(), timeout=None)
+
+
+def invalidate_course_list() -> None:
+    bump_cache_version(COURSE_LIST_VERSION_KEY)
+
+
+def invalidate_course_detail(
+    course_ids: Optional[Iterable[int]] = None, course_type_ids: Iterable[int] = ()
+) -> None:
+    """
+    Invalidates the detail pages of the given courses and of the courses sharing a teacher
+    with them (the teacher profiles list the courses of the teacher), and the detail pages of
+    the courses of the given types (which show the reviews of their type).
+    Without arguments, all detail pages are invalidated.
+    """
+    course_type_ids = set(course_type_ids)
+    if course_ids is None and not course_type_ids:
+        bump_cache_version(COURSE_DETAIL_VERSION_KEY)
+        return
+
+    course_ids = set(course_ids or ())
+    if course_ids:
+        teacher_ids = Teach.objects.filter(course_id__in=course_ids).values(
+            "teacher_id"
+        )
+        course_ids.update(
+            Teach.objects.filter(teacher_id__in=teacher_ids).values_list(
+                "course_id", flat=True
+            )
+        )
+    for course_id in course_ids:
+        bump_cache_version(COURSE_DETAIL_COURSE_VERSION_KEY.format(course_id))
+    for course_type_id in course_type_ids:
+        bump_cache_version(COURSE_DETAIL_COURSE_TYPE_VERSION_KEY.format(course_type_id))
+
+
+def invalidate_course_detail_of_teachers(teacher_ids: Iterable[int]) -> None:
+    """invalidates the detail pages showing the profile or the reviews of the teachers"""
+    for course_id in set(
+        Teach.objects.filter(teacher_id__in=teacher_ids).values_list(
+            "course_id", flat=True
+        )
+    ):
+        bump_cache_version(COURSE_DETAIL_COURSE_VERSION_KEY.format(course_id))
+
+
+def course_list_cache_key(
+    show_preview: bool, subscription_type: str, style_name: str
+) -> str:
+    # courses disappear from the list once they are over, hence the date in the key
+    variant = "|".join(
+        [get_language() or "", str(show_preview), subscription_type, style_name]
+    )
+    return "courses:course_list:{}:{}:{}".format(
+        get_cache_version(COURSE_LIST_VERSION_KEY),
+        date.today().isoformat(),
+        hashlib.md5(variant.encode()).hexdigest(),
+    )
+
+
+def get_cached_course_list(
+    show_preview: bool,
+    subscription_type: str,
+    style_name: str,
+    render: Callable[[], str],
+) -> str:
+    """returns the rendered course list fragment, rendering it only if it is not cached yet"""
+    key = course_list_cache_key(show_preview, subscription_type, style_name)
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html, COURSE_LIST_TIMEOUT)
+    return html
+
+
+def course_detail_cache_key(course: Course) -> str:
+    version_keys = [
+        COURSE_DETAIL_VERSION_KEY,
+        COURSE_DETAIL_COURSE_VERSION_KEY.format(course.id),
+        COURSE_DETAIL_COURSE_TYPE_VERSION_KEY.format(course.type_id),
+    ]
+    versions = cache.get_many(version_keys)
+    return "courses:course_detail:{}:{}:{}:{}".format(
+        "-".join(
+            str(versions.get(key) or get_cache_version(key)) for key in version_keys
+        ),
+        date.today().isoformat(),
+        get_language() or "",
+        course.id,
+    )
+
+
+def get_cached_course_detail(course: Course, render: Callable[[], str]) -> str:
+    """returns the rendered anonymous part of the course detail page"""
+    key = course_detail_cache_key(course)
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html, COURSE_DETAIL_TIMEOUT)
+    return html
+
+
+def subscription_status_placeholder(
+    course_id: int, display_link: bool, is_detail_page: bool = False
+) -> SafeString:
+    return mark_safe(
+        SUBSCRIPTION_STATUS_PLACEHOLDER.format(
+            course_id, int(bool(display_link)), int(bool(is_detail_page))
+        )
+    )
+
+
+def render_subscription_status(html: str, user: User) -> SafeString:
+    """
+    replaces the subscription status placeholders of a cached fragment with the current
+    free places and subscription state, so subscriptions do not invalidate the fragment
+    """
+    placeholders = SUBSCRIPTION_STATUS_PATTERN.findall(html)
+    if not placeholders:
+        return mark_safe(html)
+
+    courses = (
+        Course.objects.with_capacity()
+        .select_related("offering", "type")
+        .in_bulk({int(placeholder[0]) for placeholder in placeholders})
+    )
+    rendered = {}
+
+    def render_status(match: re.Match) -> str:
+        if match.group(0) not in rendered:
+            course = courses.get(int(match.group(1)))
+            rendered[match.group(0)] = (
+                render_to_string(
+                    "courses/snippets/subscription_info.html",
+                    dict(
+                        course=course,
+                        user=user,
+                        display_link=match.group(2) == "1",
+                        is_detail_page=match.group(3) == "1",
+                    ),
+                )
+                if course
+                else ""
+            )
+        return rendered[match.group(0)]
+
+    return mark_safe(SUBSCRIPTION_STATUS_PATTERN.sub(render_status, html))
@@ -0,0 +1,122 @@
+from collections import Counter, defaultdict
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from courses.models import Subscribe, SubscriptionJob, SubscriptionJobAction, JobState
+from courses.services.general import log
+from .matching import match_subscriptions, DEFAULT_MATCHING_COST
+from .subscriptions import confirm_subscription_batch, reject_subscriptions
+
+SUBSCRIPTION_JOB_CHUNK_SIZE = 50
+
+
+def start_subscription_job(
+    action: str, subscriptions: QuerySet[Subscribe], user: User = None, **options
+) -> SubscriptionJob:
+    """stores the job and hands it to a celery worker once the current transaction is committed"""
+    subscription_ids = list(subscriptions.values_list("id", flat=True))
+    job = SubscriptionJob.objects.create(
+        action=action,
+        subscription_ids=subscription_ids,
+        total=len(subscription_ids),
+        options=options,
+        created_by=user if user and user.is_authenticated else None,
+    )
+    log.info("queued subscription job {}: {}".format(job.id, job))
+    transaction.on_commit(partial(_enqueue_subscription_job, job.id))
+    return job
+
+
+def _enqueue_subscription_job(job_id: int) -> None:
+    from tq_website.tasks import task_run_subscription_job
+
+    task_run_subscription_job.delay(job_id)
+
+
+def _job_chunks(job: SubscriptionJob) -> list[list[int]]:
+    ids = job.subscription_ids
+    if job.action not in SubscriptionJobAction.MATCH_ACTIONS:
+        return [
+            ids[i : i + SUBSCRIPTION_JOB_CHUNK_SIZE]
+            for i in range(0, len(ids), SUBSCRIPTION_JOB_CHUNK_SIZE)
+        ]
+
+    # the singles of a course are matched with each other, so chunks consist of whole courses
+    ids_by_course = defaultdict(list)
+    for subscription_id, course_id in Subscribe.objects.filter(id__in=ids).values_list(
+        "id", "course_id"
+    ):
+        ids_by_course[course_id].append(subscription_id)
+
+    chunks = [[]]
+    for course_ids in ids_by_course.values():
+        if len(chunks[-1]) >= SUBSCRIPTION_JOB_CHUNK_SIZE:
+            chunks.append([])
+        chunks[-1] += course_ids
+    return [chunk for chunk in chunks if chunk]
+
+
+def _process_chunk(job: SubscriptionJob, ids: list[int]) -> Counter:
+    subscriptions = Subscribe.objects.filter(id__in=ids)
+
+    if job.action in SubscriptionJobAction.MATCH_ACTIONS:
+        cost = (
+            DEFAULT_MATCHING_COST
+            if job.action == SubscriptionJobAction.MATCH_OPTIMAL
+            else None
+        )
+        report = match_subscriptions(subscriptions, cost)
+        return Counter(matched=report.match_count, dropped=len(report.dropped))
+
+    if job.action == SubscriptionJobAction.REJECT:
+        reject_subscriptions(
+            subscriptions.select_related("user", "course"),
+            job.options.get("reason"),
+            job.options.get("send_email", True),
+        )
+        return Counter(rejected=len(ids))
+
+    confirmed_count, no_partner_count = confirm_subscription_batch(
+        subscriptions,
+        allow_single_in_couple_course=(
+            job.action == SubscriptionJobAction.CONFIRM_ALLOW_SINGLES
+        ),
+    )
+    return Counter(confirmed=confirmed_count, no_partner=no_partner_count)
+
+
+def run_subscription_job(job_id: int) -> SubscriptionJob:
+    """processes the subscriptions of the job in chunks, each chunk in its own transaction"""
+    job = SubscriptionJob.objects.get(pk=job_id)
+    if job.state != JobState.PENDING:
+        log.warning("subscription job {} was already started".format(job.id))
+        return job
+
+    job.state = JobState.RUNNING
+    job.save_progress()
+
+    result = Counter()
+    try:
+        for ids in _job_chunks(job):
+            with transaction.atomic():
+                result.update(_process_chunk(job, ids))
+            job.processed += len(ids)
+            job.result = dict(result)
+            job.save_progress("result")
+    except Exception as e:
+        log.exception("subscription job {} failed".format(job.id))
+        job.state = JobState.FAILED
+        job.error = str(e)
+    else:
+        job.state = JobState.DONE
+        job.processed = job.total
+
+    job.result = dict(result)
+    job.finished_at = timezone.now()
+    job.save_progress("result", "error", "finished_at")
+    log.info("subscription job {} finished: {}".format(job.id, job.result))
+    return job
@@ -8,9 +8,11 @@ from django.http import HttpRequest
 from django.utils.translation import gettext as _
 
 from courses import models as models
+from courses.models.course_subscription_counts import forget_course_capacities
 from courses.emailcenter import (
     send_subscription_confirmation,
     send_participation_confirmation,
+    send_participation_confirmations,
     detect_rejection_reason,
     send_rejection,
 )
@@ -104,21 +106,92 @@ def confirm_subscription(
         return False
 
 
-def confirm_subscriptions(
+@transaction.atomic
+def confirm_subscription_batch(
     subscriptions: QuerySet[Subscribe],
     request: HttpRequest = None,
     allow_single_in_couple_course: bool = False,
-) -> None:
+) -> tuple[int, int]:
+    """
+    Same as confirm_subscription for many subscriptions: prices and states are written with
+    one bulk update, and the confirmation mails and confirmations with one insert each.
+    Returns how many were confirmed and how many have no partner.
+    """
     no_partner_count = 0
-    confirmed_count = 0
-    for subscription in subscriptions:
-        try:
-            if confirm_subscription(
-                subscription, request, allow_single_in_couple_course
-            ):
-                confirmed_count += 1
-        except NoPartnerException:
+    to_confirm = []
+    for subscription in (
+        subscriptions.select_related("user__profile", "partner__profile")
+        # prefetched, so subscriptions of a course's related manager keep that instance
+        .prefetch_related(
+            "course__type",
+            "course__offering__period",
+            "course__period",
+            "course__room",
+        ).select_for_update(of=("self",))
+    ):
+        if (
+            not allow_single_in_couple_course
+            and subscription.course.type.couple_course
+            and subscription.partner is None
+        ):
             no_partner_count += 1
+        elif subscription.state == models.SubscribeState.NEW:
+            subscription.generate_price_to_pay()
+            subscription.state = (
+                SubscribeState.COMPLETED
+                if not subscription.price_to_pay
+                else SubscribeState.CONFIRMED
+            )
+            to_confirm.append(subscription)
+
+    Subscribe.objects.bulk_update(to_confirm, ["price_to_pay", "state"], batch_size=500)
+    # bulk_update does not send signals, so the counters are recomputed instead
+    models.CourseSubscriptionCounts.objects.rebuild(
+        {subscription.course_id for subscription in to_confirm}
+    )
+    forget_course_capacities(to_confirm)
+    _invalidate_revenue_reports(to_confirm)
+    _index_usi_candidates(to_confirm)
+    _mark_payments_for_processing(to_confirm)
+
+    mails = send_participation_confirmations(to_confirm)
+    confirmations = models.Confirmation.objects.bulk_create(
+        models.Confirmation(subscription=subscription, mail=mail)
+        for subscription, mail in zip(to_confirm, mails)
+        if mail
+    )
+    return len(confirmations), no_partner_count
+
+
+def _invalidate_revenue_reports(subscriptions: list[Subscribe]) -> None:
+    from payment.services import invalidate_offering_revenue_report
+
+    for offering_id in {s.course.offering_id for s in subscriptions}:
+        invalidate_offering_revenue_report(offering_id)
+
+
+def _index_usi_candidates(subscriptions: list[Subscribe]) -> None:
+    from payment.models import UsiCandidate
+
+    UsiCandidate.objects.index(subscriptions)
+
+
+def _mark_payments_for_processing(subscriptions: list[Subscribe]) -> None:
+    from payment.models import Payment
+
+    Payment.objects.of_subscriptions(
+        [s.id for s in subscriptions]
+    ).mark_for_processing()
+
+
+def confirm_subscriptions(
+    subscriptions: QuerySet[Subscribe],
+    request: HttpRequest = None,
+    allow_single_in_couple_course: bool = False,
+) -> None:
+    confirmed_count, no_partner_count = confirm_subscription_batch(
+        subscriptions, request, allow_single_in_couple_course
+    )
 
     if no_partner_count:  # if any subscriptions not confirmed due to missing partner
         log.warning(MESSAGE_NO_PARTNER_SET.format(no_partner_count))
@@ -0,0 +1,135 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+
+from courses import services
+from courses.models import (
+    Offering,
+    Period,
+    PeriodCancellation,
+    Course,
+    CourseType,
+    Style,
+    Song,
+    Room,
+    RegularLesson,
+    IrregularLesson,
+    RegularLessonException,
+    Teach,
+    UserProfile,
+)
+from survey.models import Answer, Question, SurveyInstance
+
+# Everything the public course list displays, except for the subscription status
+# (free places, "subscription received"), which is rendered per request.
+COURSE_LIST_MODELS = [
+    Offering,
+    Period,
+    PeriodCancellation,
+    Course,
+    Course._parler_meta.root_model,
+    CourseType,
+    CourseType._parler_meta.root_model,
+    Style,
+    Style._parler_meta.root_model,
+    Room,
+    Room._parler_meta.root_model,
+    RegularLesson,
+    IrregularLesson,
+    RegularLessonException,
+]
+
+# The course detail page additionally shows songs, teachers with their courses and the public
+# reviews. Changes of these models invalidate all detail pages, the others only the affected ones.
+COURSE_DETAIL_MODELS = [
+    Offering,
+    Period,
+    PeriodCancellation,
+    CourseType,
+    CourseType._parler_meta.root_model,
+    Style,
+    Style._parler_meta.root_model,
+    Room,
+    Room._parler_meta.root_model,
+    Song,
+    Question,
+]
+
+
+def invalidate_course_list(raw=False, **kwargs) -> None:
+    if not raw:
+        services.invalidate_course_list()
+
+
+def invalidate_course_detail(raw=False, **kwargs) -> None:
+    if not raw:
+        services.invalidate_course_detail()
+
+
+def _course_id(instance) -> int:
+    if isinstance(instance, Course):
+        return instance.pk
+    if isinstance(instance, Course._parler_meta.root_model):
+        return instance.master_id
+    if isinstance(instance, RegularLessonException):
+        return instance.regular_lesson.course_id
+    return instance.course_id
+
+
+def invalidate_detail_of_course(instance, raw=False, **kwargs) -> None:
+    if not raw:
+        services.invalidate_course_detail([_course_id(instance)])
+
+
+def invalidate_detail_of_teaching(instance: Teach, raw=False, **kwargs) -> None:
+    # the teacher is no longer listed with the other teachers' courses once removed
+    if not raw:
+        services.invalidate_course_detail([instance.course_id])
+        services.invalidate_course_detail_of_teachers([instance.teacher_id])
+
+
+def invalidate_detail_of_teacher(instance: UserProfile, raw=False, **kwargs) -> None:
+    if not raw:
+        services.invalidate_course_detail_of_teachers([instance.user_id])
+
+
+def invalidate_detail_of_reviews(instance, raw=False, **kwargs) -> None:
+    """the reviews of a course are shown on the courses of its type and of its teachers"""
+    if raw:
+        return
+    survey_instance = (
+        instance if isinstance(instance, SurveyInstance) else instance.survey_instance
+    )
+    if survey_instance.course_id is None:
+        return
+    course = Course.objects.only("type_id").get(pk=survey_instance.course_id)
+    services.invalidate_course_detail(course_type_ids=[course.type_id])
+    services.invalidate_course_detail_of_teachers(course.get_teacher_ids())
+
+
+def connect_course_list_invalidation() -> None:
+    for model in COURSE_LIST_MODELS:
+        post_save.connect(invalidate_course_list, sender=model)
+        post_delete.connect(invalidate_course_list, sender=model)
+    m2m_changed.connect(invalidate_course_list, sender=CourseType.styles.through)
+
+
+def connect_course_detail_invalidation() -> None:
+    for model in COURSE_DETAIL_MODELS:
+        post_save.connect(invalidate_course_detail, sender=model)
+        post_delete.connect(invalidate_course_detail, sender=model)
+    m2m_changed.connect(invalidate_course_detail, sender=CourseType.styles.through)
+    for model in [
+        Course,
+        Course._parler_meta.root_model,
+        RegularLesson,
+        IrregularLesson,
+        RegularLessonException,
+    ]:
+        post_save.connect(invalidate_detail_of_course, sender=model)
+        post_delete.connect(invalidate_detail_of_course, sender=model)
+    post_save.connect(invalidate_detail_of_teaching, sender=Teach)
+    post_delete.connect(invalidate_detail_of_teaching, sender=Teach)
+    post_save.connect(invalidate_detail_of_teacher, sender=UserProfile)
+    post_delete.connect(invalidate_detail_of_teacher, sender=UserProfile)
+    for model in [SurveyInstance, Answer]:
+        post_save.connect(invalidate_detail_of_reviews, sender=model)
+        post_delete.connect(invalidate_detail_of_reviews, sender=model)
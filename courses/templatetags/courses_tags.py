@@ -1,10 +1,9 @@
 from django import template
-from django.db.models import QuerySet
+from django.contrib.auth.models import User
 
 from courses.models import Weekday, OfferingType, Course
-from courses.services import get_offerings_by_year
-from survey.models import Answer
-from survey.models.types import QuestionType
+from courses.services import get_offerings_by_year, subscription_status_placeholder
+from survey.models import PublicReview
 
 register = template.Library()
 
@@ -14,6 +13,27 @@ def trans_weekday(key: str) -> str:
     return Weekday.WEEKDAYS_TRANSLATIONS[key]
 
 
+@register.filter
+def has_subscribed_to(user: User, course: Course) -> bool:
+    """checks for an active subscription, loading the subscribed courses of the user only once"""
+    if not user or not user.is_authenticated:
+        return False
+
+    if not hasattr(user, "_active_subscription_course_ids"):
+        user._active_subscription_course_ids = set(
+            user.subscriptions.active().values_list("course_id", flat=True)
+        )
+    return course.id in user._active_subscription_course_ids
+
+
+@register.simple_tag(name="subscription_status_placeholder")
+def subscription_status_placeholder_tag(
+    course: Course, display_link: bool = False, is_detail_page: bool = False
+) -> str:
+    """marks where the per-request subscription status of a cached page goes"""
+    return subscription_status_placeholder(course.id, display_link, is_detail_page)
+
+
 @register.inclusion_tag(filename="courses/snippets/offerings_list.html")
 def offerings_list(detail_url: str, only_public: bool = True) -> dict:
     offering_types = [OfferingType.REGULAR, OfferingType.IRREGULAR]
@@ -25,45 +45,17 @@ def offerings_list(detail_url: str, only_public: bool = True) -> dict:
 
 
 @register.inclusion_tag(filename="courses/snippets/course_reviews.html")
-def course_reviews(course: Course) -> dict:
-    course_answers = Answer.objects.filter(
-        survey_instance__course__type=course.type,
+def course_reviews(course: Course, page: int = 1) -> dict:
+    course_reviews, more_course_reviews = PublicReview.objects.latest_for_course_type(
+        course.type_id, page=page
+    )
+    teachers_reviews, more_teachers_reviews = PublicReview.objects.latest_for_teachers(
+        course.get_teacher_ids(), exclude_course_type_id=course.type_id, page=page
     )
-
-    course_teachers = course.get_teachers()
-    teachers_answers = Answer.objects.exclude(
-        survey_instance__course__type=course.type,
-    ).filter(survey_instance__course__teaching__teacher__in=course_teachers)
     return dict(
         course=course,
-        course_reviews=course_reviews_for_queryset(course_answers),
-        teachers_reviews=course_reviews_for_queryset(teachers_answers),
+        course_reviews=course_reviews,
+        teachers_reviews=teachers_reviews,
+        previous_page=page - 1 if page > 1 else None,
+        next_page=page + 1 if more_course_reviews or more_teachers_reviews else None,
     )
-
-
-def course_reviews_for_queryset(answers: QuerySet[Answer]) -> list:
-    text_answers = (
-        answers.filter(
-            question__type=QuestionType.FREE_FORM,
-            hide_from_public_reviews=False,
-            question__public_review=True,
-        )
-        .prefetch_related(
-            "survey_instance",
-            "question",
-            "survey_instance__course__room",
-            "survey_instance__course__type",
-            "survey_instance__course__teaching__teacher",
-        )
-        .order_by("-survey_instance__last_update")
-        .distinct()
-    )
-
-    return [
-        dict(
-            text=answer.value,
-            date=answer.survey_instance.last_update,
-            course=answer.survey_instance.course,
-        )
-        for answer in text_answers
-    ]
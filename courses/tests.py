@@ -1,5 +1,19 @@
-from django.test import TestCase
+from datetime import date, time, timedelta
+from io import BytesIO
+from zipfile import ZipFile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.template.loader import render_to_string
+from django.utils import timezone, translation
+from openpyxl import load_workbook
+from post_office.models import Email, EmailTemplate, PRIORITY, STATUS
+from courses import services
 from courses.models import *
+from payment.models import Payment, SubscriptionPayment
 
 # Create your tests here.
 
@@ -11,3 +25,496 @@ class DataFill(TestCase):
 
     def test_something(self):
         pass
+
+
+class SubscriptionTestCase(TestCase):
+    def setUp(self):
+        cache.clear()  # post_office caches email templates
+        period = Period.objects.create(
+            date_from=date(2023, 9, 18), date_to=date(2023, 12, 22)
+        )
+        offering = Offering.objects.create(name="HS 2023", period=period)
+        course_type = CourseType.objects.create(title="Salsa 1")
+        self.course = Course.objects.create(
+            name="Salsa 1 (Mo)", offering=offering, type=course_type, max_subscribers=10
+        )
+
+    def _subscribe(self, username, lead_follow) -> Subscribe:
+        user = User.objects.create_user(username=username, email=f"{username}@tq.ch")
+        UserProfile.objects.create(user=user)
+        return Subscribe.objects.create(
+            user=user, course=self.course, lead_follow=lead_follow
+        )
+
+
+class SubscriptionCountsTest(SubscriptionTestCase):
+    def test_counts_follow_subscription_changes(self):
+        leader = self._subscribe("leader", LeadFollow.LEAD)
+        self._subscribe("follower", LeadFollow.FOLLOW)
+        self._subscribe("undecided", LeadFollow.NO_PREFERENCE)
+
+        counts = CourseSubscriptionCounts.objects.get(course=self.course)
+        self.assertEqual(counts.active, 3)
+        self.assertEqual(counts.single_leaders, 1)
+        self.assertEqual(counts.single_followers, 1)
+        self.assertEqual(counts.single_no_preference, 1)
+
+        leader.state = SubscribeState.REJECTED
+        leader.save()
+        counts.refresh_from_db()
+        self.assertEqual(counts.active, 2)
+        self.assertEqual(counts.single_leaders, 0)
+        self.assertEqual(self.course.get_free_places_count(), 8)
+
+        self.assertEqual(CourseSubscriptionCounts.objects.drift(), {})
+
+
+class CourseCapacityTest(SubscriptionTestCase):
+    def test_capacity_annotations_match_snapshot(self):
+        self.course.max_subscribers = 4
+        self.course.save()
+        self._subscribe("leader", LeadFollow.LEAD)
+        self._subscribe("other-leader", LeadFollow.LEAD)
+        self._subscribe("follower", LeadFollow.FOLLOW)
+
+        course = Course.objects.with_capacity().get(pk=self.course.pk)
+        capacity = course.get_capacity()
+        self.assertEqual(course.capacity_free_places, capacity.free_places_count)
+        self.assertEqual(
+            course.capacity_free_for_leaders, capacity.free_places_for_leaders
+        )
+        self.assertEqual(
+            course.capacity_free_for_followers, capacity.free_places_for_followers
+        )
+        self.assertFalse(Course.objects.with_free_places_for(LeadFollow.LEAD).exists())
+        self.assertTrue(Course.objects.with_free_places_for(LeadFollow.FOLLOW).exists())
+
+    def test_capacity_is_read_with_the_courses(self):
+        def read_capacities():
+            courses = Course.objects.with_capacity().select_related("type")
+            with self.assertNumQueries(1):
+                return [
+                    (
+                        course.has_free_places(),
+                        course.has_free_places_for_leaders(),
+                        course.has_free_places_for_followers(),
+                        course.active_subscriptions_count(),
+                        course.number_of_possible_couples(),
+                    )
+                    for course in courses
+                ]
+
+        self._subscribe("leader", LeadFollow.LEAD)
+        self.assertEqual(len(read_capacities()), 1)
+        for i in range(5):
+            Course.objects.create(
+                name=f"Salsa 1 ({i})",
+                offering=self.course.offering,
+                type=self.course.type,
+                max_subscribers=10,
+            )
+        self.assertEqual(len(read_capacities()), 6)
+
+    def test_capacity_follows_subscription_changes(self):
+        self.assertEqual(self.course.get_free_places_count(), 10)
+        leader = self._subscribe("leader", LeadFollow.LEAD)
+        follower = self._subscribe("follower", LeadFollow.FOLLOW)
+        self.assertEqual(self.course.get_free_places_count(), 8)
+        self.assertEqual(
+            self.course.single_subscriptions_with_preference_count(LeadFollow.LEAD), 1
+        )
+
+        services.match_subscriptions(self.course.subscriptions.all())
+        self.assertEqual(self.course.matched_subscriptions_count(), 2)
+
+        leader.state = SubscribeState.REJECTED
+        leader.save()
+        self.assertEqual(self.course.active_subscriptions_count(), 1)
+
+        # changes through other instances are seen after a refresh
+        Subscribe.objects.get(pk=follower.pk).delete()
+        self.assertEqual(self.course.active_subscriptions_count(), 1)
+        self.course.refresh_from_db()
+        self.assertEqual(self.course.active_subscriptions_count(), 0)
+
+
+class CourseCacheTest(SubscriptionTestCase):
+    def test_course_list_cache_ignores_subscriptions(self):
+        key = services.course_list_cache_key(False, "all", "all")
+        self._subscribe("leader", LeadFollow.LEAD)
+        self.assertEqual(services.course_list_cache_key(False, "all", "all"), key)
+
+        self.course.name = "Salsa 1 (Tu)"
+        self.course.save()
+        self.assertNotEqual(services.course_list_cache_key(False, "all", "all"), key)
+
+    @translation.override("en")
+    def test_course_detail_overlays_subscription_status(self):
+        self.course.offering.active = True
+        self.course.offering.save()
+
+        def render_detail() -> str:
+            return render_to_string(
+                "courses/snippets/detail.html",
+                {"course": self.course, "defer_subscription_status": True},
+            )
+
+        html = services.get_cached_course_detail(self.course, render_detail)
+        self.assertIn("10 free", services.render_subscription_status(html, None))
+
+        self._subscribe("leader", LeadFollow.LEAD)
+        cached = services.get_cached_course_detail(self.course, render_detail)
+        self.assertEqual(cached, html)
+        self.assertIn("9 free", services.render_subscription_status(cached, None))
+
+    def test_course_detail_is_invalidated_per_course(self):
+        from survey.models import Question, Survey, SurveyInstance
+
+        teacher = User.objects.create_user(username="teacher", email="teacher@tq.ch")
+        UserProfile.objects.create(user=teacher)
+        shared, other = (
+            Course.objects.create(
+                name=name,
+                offering=self.course.offering,
+                type=CourseType.objects.create(title=name),
+            )
+            for name in ["Bachata 1", "Tango 1"]
+        )
+        for course in [self.course, shared]:
+            Teach.objects.create(course=course, teacher=teacher)
+        courses = [self.course, shared, other]
+
+        def assert_invalidated(change, expected):
+            keys = [services.course_detail_cache_key(c) for c in courses]
+            change()
+            self.assertEqual(
+                [
+                    k != services.course_detail_cache_key(c)
+                    for k, c in zip(keys, courses)
+                ],
+                expected,
+            )
+
+        # the teacher profile and courses are shown on the pages of all their courses
+        assert_invalidated(teacher.profile.save, [True, True, False])
+        assert_invalidated(
+            lambda: RegularLesson.objects.create(
+                course=shared,
+                weekday=Weekday.MONDAY,
+                time_from=time(18),
+                time_to=time(19),
+            ),
+            [True, True, False],
+        )
+        assert_invalidated(
+            lambda: IrregularLesson.objects.create(
+                course=other,
+                date=date(2023, 10, 1),
+                time_from=time(18),
+                time_to=time(19),
+            ),
+            [False, False, True],
+        )
+        # reviews are shown on the courses of the same type and of the same teachers
+        assert_invalidated(
+            lambda: SurveyInstance.objects.create(
+                survey=Survey.objects.create(name="Survey"), course=other, user=teacher
+            ),
+            [False, False, True],
+        )
+        assert_invalidated(
+            lambda: Question.objects.create(name="Comment"), [True, True, True]
+        )
+
+
+class MatchingTest(SubscriptionTestCase):
+    def test_bulk_matching_pairs_singles_by_height(self):
+        leaders = [self._subscribe(f"leader-{i}", LeadFollow.LEAD) for i in range(3)]
+        follower = self._subscribe("follower", LeadFollow.FOLLOW)
+        undecided = self._subscribe("undecided", LeadFollow.NO_PREFERENCE)
+        UserProfile.objects.filter(user=leaders[1].user).update(body_height=160)
+        UserProfile.objects.filter(user=follower.user).update(body_height=150)
+
+        report = services.match_subscriptions(Subscribe.objects.all())
+
+        self.assertEqual(report.match_count, 2)
+        self.assertEqual(report.dropped, [leaders[2]])
+        self.assertEqual(
+            report.course_counts[self.course.id], dict(singles=5, pairs=2, dropped=1)
+        )
+        leaders[1].refresh_from_db()
+        self.assertEqual(leaders[1].partner, follower.user)
+        self.assertEqual(leaders[1].matching_state, MatchingState.MATCHED)
+        self.assertEqual(self.course.get_subscription_counts().matched, 4)
+        self.assertEqual(CourseSubscriptionCounts.objects.drift(), {})
+
+    def test_min_cost_assignment(self):
+        costs = [[1, 2, 9], [2, 10, 9], [9, 9, 3]]
+        self.assertEqual(services.min_cost_assignment(costs), [1, 0, 2])
+        self.assertEqual(services.min_cost_assignment([[4, 1, 3]]), [1])
+
+    def test_optimal_matching_dry_run(self):
+        heights = dict(leader_1=150, leader_2=190, follower_1=185, follower_2=155)
+        for username, height in heights.items():
+            lead_follow = LeadFollow.LEAD if "leader" in username else LeadFollow.FOLLOW
+            subscribe = self._subscribe(username, lead_follow)
+            UserProfile.objects.filter(user=subscribe.user).update(body_height=height)
+
+        report = services.match_subscriptions(
+            Subscribe.objects.all(), services.height_difference_cost, dry_run=True
+        )
+
+        self.assertEqual(report.match_count, 2)
+        self.assertEqual(report.total_cost, 10)
+        self.assertEqual(report.greedy_cost, 10)
+        self.assertEqual(
+            {(a.user.username, b.user.username) for a, b in report.pairs},
+            {("leader_1", "follower_2"), ("leader_2", "follower_1")},
+        )
+        self.assertEqual(report.preview()[0]["pairs"][0][2], 5)
+        self.assertFalse(Subscribe.objects.filter(partner__isnull=False).exists())
+
+
+class SubscriptionJobTest(SubscriptionTestCase):
+    def test_subscription_jobs_match_and_confirm(self):
+        self._subscribe("leader-1", LeadFollow.LEAD)
+        self._subscribe("follower", LeadFollow.FOLLOW)
+        self._subscribe("leader-2", LeadFollow.LEAD)
+
+        job = services.start_subscription_job(
+            SubscriptionJobAction.MATCH, Subscribe.objects.all()
+        )
+        self.assertEqual(job.state, JobState.PENDING)
+        job = services.run_subscription_job(job.id)
+        self.assertEqual(job.state, JobState.DONE)
+        self.assertEqual(job.result, dict(matched=1, dropped=1))
+
+        job = services.start_subscription_job(
+            SubscriptionJobAction.CONFIRM, Subscribe.objects.all()
+        )
+        services.run_subscription_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.processed, 3)
+        self.assertEqual(job.result["no_partner"], 1)
+        self.assertEqual(job.get_progress()["state"], JobState.DONE)
+        self.assertEqual(
+            Subscribe.objects.filter(state=SubscribeState.CONFIRMED).count(), 2
+        )
+
+    def test_bulk_confirmation_queues_mails(self):
+        EmailTemplate.objects.create(
+            name="participation_confirmation_with_partner",
+            subject="Confirmation {{ course }}",
+            content="{{ course_info }} {{ usi }} {{ partner_first_name }}",
+        )
+        self.course.price_with_legi = self.course.price_without_legi = 50
+        self.course.save()
+        leader = self._subscribe("leader", LeadFollow.LEAD)
+        self._subscribe("follower", LeadFollow.FOLLOW)
+        self._subscribe("single", LeadFollow.LEAD)
+        services.match_subscriptions(Subscribe.objects.exclude(user__username="single"))
+
+        confirmed, no_partner = services.confirm_subscription_batch(
+            Subscribe.objects.all()
+        )
+
+        self.assertEqual((confirmed, no_partner), (2, 1))
+        leader.refresh_from_db()
+        self.assertEqual(leader.state, SubscribeState.CONFIRMED)
+        self.assertEqual(leader.price_to_pay, 50)
+        self.assertEqual(
+            leader.confirmations.get().mail.subject, "Confirmation Salsa 1"
+        )
+        self.assertEqual(Email.objects.filter(status=STATUS.queued).count(), 2)
+        self.assertEqual(self.course.get_subscription_counts().accepted, 2)
+        self.assertEqual(CourseSubscriptionCounts.objects.drift(), {})
+
+
+class SubscriptionFinancialsTest(SubscriptionTestCase):
+    def test_financial_annotations_match_subscription_methods(self):
+        student = self._subscribe("student", LeadFollow.LEAD)
+        UserProfile.objects.filter(user=student.user).update(
+            student_status=StudentStatus.ETH, legi="12-345-678"
+        )
+        reduced = self._subscribe("reduced", LeadFollow.FOLLOW)
+        paid = self._subscribe("paid", LeadFollow.FOLLOW)
+        Subscribe.objects.update(state=SubscribeState.CONFIRMED)
+        Subscribe.objects.filter(id=student.id).update(price_to_pay=None)
+        Subscribe.objects.filter(id=paid.id).update(state=SubscribeState.PAID)
+        PriceReduction.objects.create(subscription=reduced, amount=20)
+        payment = Payment.objects.create(
+            date=timezone.now(), amount=30, currency_code="CHF", transaction_id="1"
+        )
+        SubscriptionPayment.objects.create(
+            payment=payment, subscription=reduced, amount=30
+        )
+
+        annotated = {s.id: s for s in Subscribe.objects.with_financials()}
+        self.assertEqual(annotated[student.id].financial_price_to_pay, 35)
+        self.assertEqual(annotated[reduced.id].financial_open_amount, 20)
+        totals = self.course.payment_totals()
+        self.assertEqual(totals["to_pay"], 175)
+        self.assertEqual(totals["difference"], 125)
+
+        for subscription in Subscribe.objects.all():
+            financials = annotated[subscription.id]
+            self.assertEqual(
+                financials.financial_reductions, subscription.sum_of_reductions()
+            )
+            self.assertEqual(
+                financials.financial_payments, subscription.sum_of_payments()
+            )
+            self.assertEqual(
+                financials.financial_open_amount, subscription.open_amount()
+            )
+        self.assertEqual(
+            self.course.offering.courses_with_payment_totals()[0].payment_totals(),
+            totals,
+        )
+
+
+class ExportTest(SubscriptionTestCase):
+    def test_exports_stream_generated_rows(self):
+        self._subscribe("leader", LeadFollow.LEAD)
+        self._subscribe("follower", LeadFollow.FOLLOW)
+        Subscribe.objects.update(state=SubscribeState.CONFIRMED)
+        other = Course.objects.create(
+            name="Salsa 1 (Di)", offering=self.course.offering, type=self.course.type
+        )
+
+        response = services.export_subscriptions([self.course.id], "csv")
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith("First name,Last name"))
+
+        response = services.export_subscriptions([self.course.id], "excel")
+        sheet = load_workbook(BytesIO(b"".join(response.streaming_content))).active
+        self.assertEqual(sheet.max_row, 3)
+        self.assertTrue(sheet["A1"].font.bold)
+
+        response = services.export_subscriptions([self.course.id, other.id], "csv")
+        with ZipFile(BytesIO(b"".join(response.streaming_content))) as folder:
+            self.assertEqual(
+                [len(folder.read(name).splitlines()) for name in folder.namelist()],
+                [3, 1],
+            )
+
+    def test_export_jobs_reuse_identical_exports(self):
+        staff = User.objects.create_user(
+            username="staff", email="staff@tq.ch", is_staff=True
+        )
+        teacher = User.objects.create_user(username="teacher", email="teacher@tq.ch")
+
+        job = services.start_export_job(
+            "subscriptions", staff, course_ids=[self.course.id], export_format="csv"
+        )
+        self.assertEqual(job.state, JobState.PENDING)
+        self.assertEqual(
+            services.start_export_job(
+                "subscriptions", staff, export_format="csv", course_ids=[self.course.id]
+            ),
+            job,
+        )
+        self.assertNotEqual(
+            services.start_export_job(
+                "subscriptions",
+                staff,
+                course_ids=[self.course.id],
+                export_format="xlsx",
+            ),
+            job,
+        )
+        # jobs of other users are only reused by staff
+        self.assertNotEqual(
+            services.start_export_job(
+                "subscriptions",
+                teacher,
+                course_ids=[self.course.id],
+                export_format="csv",
+            ),
+            job,
+        )
+        self.assertFalse(job.is_accessible_by(teacher))
+
+        ExportJob.objects.filter(pk=job.pk).update(
+            created_at=timezone.now() - services.EXPORT_REUSE_TTL
+        )
+        self.assertNotEqual(
+            services.start_export_job(
+                "subscriptions", staff, course_ids=[self.course.id], export_format="csv"
+            ),
+            job,
+        )
+
+        failing = services.start_export_job("offering_revenue", staff, offering_id=0)
+        failing = services.run_export_job(failing.id)
+        self.assertEqual(failing.state, JobState.FAILED)
+        self.assertFalse(failing.stored_file)
+        self.assertEqual(failing.stored_file.field.name, "finance_file")
+        self.assertEqual(job.stored_file.field.name, "file")
+
+        response = services.export_subscriptions([self.course.id], "csv")
+        self.assertEqual(
+            services.export_jobs._attachment_filename(response, "subscriptions"),
+            "Kursteilnehmer-Salsa_1_Mo.csv",
+        )
+
+
+class LessonScheduleTest(TestCase):
+    def setUp(self):
+        self.period = Period.objects.create(
+            date_from=date(2023, 9, 18), date_to=date(2023, 12, 22)
+        )
+        offering = Offering.objects.create(name="HS 2023", period=self.period)
+        course_type = CourseType.objects.create(title="Salsa 1")
+        self.course = Course.objects.create(
+            name="Salsa 1 (Tu)", offering=offering, type=course_type
+        )
+
+    def _schedule(self) -> tuple:
+        self.course.refresh_from_db()
+        return (
+            self.course.first_lesson_date,
+            self.course.last_lesson_date,
+            self.course.effective_weekday,
+        )
+
+    def test_schedule_follows_lessons_and_period(self):
+        regular_lesson = RegularLesson.objects.create(
+            course=self.course,
+            weekday=Weekday.TUESDAY,
+            time_from=time(18),
+            time_to=time(19),
+        )
+        self.assertEqual(
+            self._schedule(), (date(2023, 9, 19), date(2023, 12, 19), Weekday.TUESDAY)
+        )
+
+        IrregularLesson.objects.create(
+            course=self.course,
+            date=date(2023, 9, 10),
+            time_from=time(14),
+            time_to=time(16),
+        )
+        regular_lesson.delete()
+        self.assertEqual(
+            self._schedule(), (date(2023, 9, 10), date(2023, 9, 10), Weekday.SUNDAY)
+        )
+
+        self.period.date_from = date(2023, 9, 1)
+        self.period.save()
+        regular_lesson.pk = None
+        regular_lesson.save()
+        self.assertEqual(
+            self._schedule(), (date(2023, 9, 5), date(2023, 12, 19), Weekday.TUESDAY)
+        )
+
+        sections = services.get_sections(self.course.offering)
+        self.assertEqual(sections[0]["courses"], [self.course])
+
+        self.course.offering.type = OfferingType.IRREGULAR
+        self.course.offering.save()
+        sections = services.get_sections(
+            Offering.objects.get(pk=self.course.offering.pk)
+        )
+        self.assertEqual(sections[0]["section_title"], "September 2023")
@@ -16,6 +16,7 @@ urlpatterns = [
     path("preview/", views.course_list_preview, name="list_preview"),
     path("archive/", views.archive, name="archive"),
     path("<int:course_id>/detail/", views.course_detail, name="course_detail"),
+    path("<int:course_id>/reviews/", views.course_reviews, name="course_reviews"),
     path("<int:course_id>/subscribe/", views.subscribe_form, name="subscribe"),
     path("offering/<int:offering_id>/", views.offering_by_id, name="offering_by_id"),
     # Restricted pages
@@ -35,6 +36,12 @@ urlpatterns = [
         views.export_offering_summary_excel,
         name="export_offering_summary_excel",
     ),
+    path("auth/export/job/<int:job_id>/", views.export_job, name="export_job"),
+    path(
+        "auth/export/job/<int:job_id>/progress/",
+        views.export_job_progress,
+        name="export_job_progress",
+    ),
     path(
         "auth/offering/<int:offering_id>/",
         views.offering_overview,
@@ -45,6 +52,11 @@ urlpatterns = [
         admin_views.voucher_generation_view,
         name="voucher_generation",
     ),
+    path(
+        "admin/subscription_job/<int:job_id>/progress/",
+        admin_views.subscription_job_progress_view,
+        name="subscription_job_progress",
+    ),
     path(
         "api/", include(courses.api.urls, namespace="courses_api")
     ),  # nested namespace 'api'
@@ -10,9 +10,10 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth.models import User
 from django.core.exceptions import PermissionDenied
-from django.db.models import Prefetch
-from django.http import Http404, HttpRequest, HttpResponse
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.urls import reverse_lazy
 from django.utils.decorators import method_decorator
 from django.utils.translation import gettext_lazy as _
@@ -29,8 +30,8 @@ from utils.tables.table_view_or_export import table_view_or_export
 
 from . import figures, services
 from .forms.subscribe_form import SubscribeForm
-from .models import (Course, IrregularLesson, Offering, OfferingType,
-                     RegularLessonException, Style, Subscribe)
+from .models import (Course, ExportJob, IrregularLesson, Offering,
+                     OfferingType, RegularLessonException, Style, Subscribe)
 from .services.data.teachers_overview import get_teachers_overview_data
 from .utils import course_filter
 
@@ -52,43 +53,52 @@ def course_list(
             c, show_preview, subscription_type, style_name, filter_styles
         )
 
-    offerings = services.get_offerings_to_display(show_preview).prefetch_related(
-        "period__cancellations",
-        "course_set__type",
-        "course_set__period__cancellations",
-        "course_set__regular_lessons",
-        "course_set__room__address",
-        "course_set__room__translations",
-        Prefetch(
-            "course_set__irregular_lessons",
-            queryset=IrregularLesson.objects.order_by("date", "time_from"),
-        ),
-        Prefetch(
-            "course_set__regular_lessons__exceptions",
-            queryset=RegularLessonException.objects.order_by("date"),
-        ),
-        Prefetch(
-            "course_set__subscriptions",
-            queryset=Subscribe.objects.active(),
-            to_attr="active_subscriptions",
-        ),
-        "course_set__subscriptions",
-    )
+    def render_offerings() -> str:
+        offerings = services.get_offerings_to_display(show_preview).prefetch_related(
+            Prefetch(
+                "course_set",
+                queryset=Course.objects.with_capacity().in_schedule_order(),
+            ),
+            "period__cancellations",
+            "course_set__type",
+            "course_set__period__cancellations",
+            "course_set__regular_lessons",
+            "course_set__room__address",
+            "course_set__room__translations",
+            Prefetch(
+                "course_set__irregular_lessons",
+                queryset=IrregularLesson.objects.order_by("date", "time_from"),
+            ),
+            Prefetch(
+                "course_set__regular_lessons__exceptions",
+                queryset=RegularLessonException.objects.order_by("date"),
+            ),
+        )
+
+        c_offerings = []
+        for offering in offerings:
+            offering_sections = services.get_sections(offering, matches_filter)
 
-    c_offerings = []
-    for offering in offerings:
-        offering_sections = services.get_sections(offering, matches_filter)
+            if offering_sections:
+                c_offerings.append(
+                    {
+                        "offering": offering,
+                        "sections": offering_sections,
+                    }
+                )
 
-        if offering_sections:
-            c_offerings.append(
-                {
-                    "offering": offering,
-                    "sections": offering_sections,
-                }
-            )
+        return render_to_string(
+            "courses/snippets/course_list_offerings.html", {"offerings": c_offerings}
+        )
+
+    offerings_html = services.get_cached_course_list(
+        show_preview, subscription_type, style_name, render_offerings
+    )
 
     context = {
-        "offerings": c_offerings,
+        "offerings_html": services.render_subscription_status(
+            offerings_html, request.user
+        ),
         "filter": {
             "styles": {
                 "available": filter_styles,
@@ -126,34 +136,53 @@ def offering_by_id(request: HttpRequest, offering_id: int) -> HttpResponse:
 
 def course_detail(request: HttpRequest, course_id: int) -> HttpResponse:
     try:
-        course = (
-            Course.objects.select_related("type", "offering")
-            .prefetch_related(
-                "subscriptions",
-                "type__styles__songs",
-                "type__styles__translations",
-                "regular_lessons__exceptions",
-                "irregular_lessons",
-                "teaching__teacher__functions",
-                "teaching__teacher__profile",
-                "teaching__teacher__teaching_courses__course__irregular_lessons",
-                "teaching__teacher__teaching_courses__course__regular_lessons",
-                "teaching__teacher__teaching_courses__course__period",
-                "teaching__teacher__teaching_courses__course__offering__period",
-            )
-            .get(id=course_id)
-        )
+        course = Course.objects.select_related("type", "offering").get(id=course_id)
     except Course.DoesNotExist:
         raise Http404()
 
+    def render_detail() -> str:
+        prefetch_related_objects(
+            [course],
+            "type__styles__songs",
+            "type__styles__translations",
+            "regular_lessons__exceptions",
+            "irregular_lessons",
+            "teaching__teacher__functions",
+            "teaching__teacher__profile",
+            "teaching__teacher__teaching_courses__course__irregular_lessons",
+            "teaching__teacher__teaching_courses__course__regular_lessons",
+            "teaching__teacher__teaching_courses__course__period",
+            "teaching__teacher__teaching_courses__course__offering__period",
+        )
+        return render_to_string(
+            "courses/snippets/detail.html",
+            {"course": course, "defer_subscription_status": True},
+        )
+
+    course_detail_html = services.get_cached_course_detail(course, render_detail)
+
     context = {
         "menu": "courses",
         "course": course,
         "user": request.user,
+        "course_detail_html": services.render_subscription_status(
+            course_detail_html, request.user
+        ),
     }
     return render(request, "courses/course_detail.html", context)
 
 
+def course_reviews(request: HttpRequest, course_id: int) -> HttpResponse:
+    course = get_object_or_404(Course.objects.select_related("type"), id=course_id)
+    try:
+        page = max(int(request.GET.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+
+    context = {"menu": "courses", "course": course, "page": page}
+    return render(request, "courses/course_reviews.html", context)
+
+
 def _lesson_to_ical_event(course: Course, lesson: Union[RegularLesson, IrregularLesson]):
     event = Event()
     event['dtstart'] = vDatetime(lesson.time_from)
@@ -526,22 +555,22 @@ def change_password(request: HttpRequest) -> HttpResponse:
 def export_summary(request: HttpRequest) -> HttpResponse:
     from courses import services
 
-    return services.export_summary("csv")
+    return services.start_export(request, "summary", export_format="csv")
 
 
 @staff_member_required
 def export_summary_excel(request: HttpRequest) -> HttpResponse:
     from courses import services
 
-    return services.export_summary("xlsx")
+    return services.start_export(request, "summary", export_format="xlsx")
 
 
 @staff_member_required
 def export_offering_summary(request: HttpRequest, offering_id: int) -> HttpResponse:
     from courses import services
 
-    return services.export_summary(
-        "csv", [Offering.objects.filter(pk=offering_id).first()]
+    return services.start_export(
+        request, "summary", export_format="csv", offering_ids=[offering_id]
     )
 
 
@@ -551,6 +580,28 @@ def export_offering_summary_excel(
 ) -> HttpResponse:
     from courses import services
 
-    return services.export_summary(
-        "xlsx", [Offering.objects.filter(pk=offering_id).first()]
+    return services.start_export(
+        request, "summary", export_format="xlsx", offering_ids=[offering_id]
     )
+
+
+def _get_export_job(request: HttpRequest, job_id: int) -> ExportJob:
+    job = get_object_or_404(ExportJob, pk=job_id)
+    if not job.is_accessible_by(request.user):
+        raise PermissionDenied
+    return job
+
+
+@login_required
+def export_job(request: HttpRequest, job_id: int) -> HttpResponse:
+    """page polling the export job until its file can be downloaded"""
+    return render(
+        request,
+        "courses/auth/export_job.html",
+        {"job": _get_export_job(request, job_id)},
+    )
+
+
+@login_required
+def export_job_progress(request: HttpRequest, job_id: int) -> JsonResponse:
+    return JsonResponse(_get_export_job(request, job_id).as_progress())
@@ -12,8 +12,20 @@ def send_emails_admin_action(modeladmin, request, queryset):
                 WARNING,
                 'Skipping "{}". This email has already been sent'.format(email),
             )
+        elif email.is_sending():
+            messages.add_message(
+                request,
+                WARNING,
+                'Skipping "{}". This email is already being sent'.format(email),
+            )
         else:
             send_group_email(email)
+            messages.info(
+                request,
+                '"{}" is being sent to {} recipients'.format(
+                    email, email.get_recipients().count()
+                ),
+            )
 
 
 send_emails_admin_action.short_description = "Send selected emails"
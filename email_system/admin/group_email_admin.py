@@ -12,7 +12,7 @@ from email_system.models import GroupEmail
 class GroupEmailAdmin(TranslatableAdmin):
     model = GroupEmail
 
-    list_display = ["subject", "target_group", "sent_at"]
+    list_display = ["subject", "target_group", "sent_at", "sending_progress"]
     list_filter = ["target_group"]
     search_fields = ["target_group__name"]
     actions = [send_emails_admin_action, copy_emails_admin_action]
@@ -20,5 +20,5 @@ class GroupEmailAdmin(TranslatableAdmin):
 
     def has_change_permission(self, request, obj=None):
         if obj is not None:
-            return not obj.is_sent()
+            return not obj.is_sent() and not obj.is_sending()
         return True
@@ -5,3 +5,10 @@ from django.utils.translation import gettext_lazy as _
 class EmailSystemConfig(AppConfig):
     name = "email_system"
     verbose_name = _("Emails")
+
+    def ready(self):
+        from post_office.signals import email_queued
+
+        from email_system.services import schedule_mail_queue
+
+        email_queued.connect(schedule_mail_queue, dispatch_uid="schedule_mail_queue")
@@ -0,0 +1,206 @@
+import logging
+import smtplib
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.core.mail.backends.smtp import EmailBackend
+
+log = logging.getLogger("tq")
+
+
+def _config(name: str, default):
+    return getattr(settings, "EMAIL_SMTP_POOL", {}).get(name, default)
+
+
+@dataclass
+class PooledConnection:
+    connection: smtplib.SMTP
+    opened_at: float
+    released_at: float
+
+
+class SMTPConnectionPool:
+    """
+    Bounded pool of authenticated SMTP connections of one server, shared by the threads
+    of a worker process. Idle connections are checked with NOOP before they are reused.
+    """
+
+    def __init__(self, size: int, max_idle: float, max_age: float) -> None:
+        self.max_idle = max_idle
+        self.max_age = max_age
+        self.slots = threading.BoundedSemaphore(size)
+        self.idle: list[PooledConnection] = []
+        self.lock = threading.Lock()
+        self.stats = Counter()
+        self.in_use = 0
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[PooledConnection]:
+        """
+        reserves a slot of the pool and returns an idle connection which is still alive,
+        None if the caller has to open a new connection for the slot
+        """
+        if not self.slots.acquire(timeout=timeout):
+            raise TimeoutError("no SMTP connection of the pool became available")
+        with self.lock:
+            self.in_use += 1
+        while True:
+            with self.lock:
+                if not self.idle:
+                    return None
+                pooled = self.idle.pop()
+            if self._is_usable(pooled):
+                self.count("reused")
+                return pooled
+            self._quit(pooled.connection)
+            self.count("recycled")
+
+    def release(self, pooled: PooledConnection) -> None:
+        pooled.released_at = time.monotonic()
+        with self.lock:
+            self.idle.append(pooled)
+            self.in_use -= 1
+        self.slots.release()
+
+    def discard(self, pooled: Optional[PooledConnection]) -> None:
+        """frees the slot of a broken connection"""
+        if pooled is not None:
+            self._quit(pooled.connection)
+            self.count("recycled")
+        with self.lock:
+            self.in_use -= 1
+        self.slots.release()
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.stats[name] += 1
+
+    def close(self) -> None:
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for pooled in idle:
+            self._quit(pooled.connection)
+
+    def statistics(self) -> dict:
+        with self.lock:
+            return dict(
+                opened=self.stats["opened"],
+                reused=self.stats["reused"],
+                recycled=self.stats["recycled"],
+                idle=len(self.idle),
+                in_use=self.in_use,
+            )
+
+    def _is_usable(self, pooled: PooledConnection) -> bool:
+        now = time.monotonic()
+        if now - pooled.opened_at > self.max_age:
+            return False
+        if now - pooled.released_at <= self.max_idle:
+            return True
+        try:
+            return pooled.connection.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _quit(connection: smtplib.SMTP) -> None:
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+
+_pools: dict[tuple, SMTPConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def connection_pool(key: tuple) -> SMTPConnectionPool:
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = SMTPConnectionPool(
+                size=_config("SIZE", 4),
+                max_idle=_config("MAX_IDLE", 10),
+                max_age=_config("MAX_AGE", 5 * 60),
+            )
+        return _pools[key]
+
+
+def connection_pool_statistics() -> dict:
+    """reuse statistics of the SMTP connections of this process, summed over all servers"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    total = Counter()
+    for pool in pools:
+        total.update(pool.statistics())
+    return dict(total)
+
+
+def close_connection_pools() -> None:
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
+
+
+class PooledSMTPEmailBackend(EmailBackend):
+    """
+    SMTP backend which borrows its connection from the pool of the worker process instead
+    of opening a new TLS connection and logging in for every batch. close() returns the
+    connection to the pool, broken connections are replaced and the message is sent again.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.pooled: Optional[PooledConnection] = None
+
+    @property
+    def pool(self) -> SMTPConnectionPool:
+        return connection_pool(
+            (self.host, self.port, self.username, self.use_tls, self.use_ssl)
+        )
+
+    def open(self) -> Optional[bool]:
+        if self.connection:
+            return False
+
+        self.pooled = self.pool.acquire(timeout=_config("WAIT", 60))
+        if self.pooled is not None:
+            self.connection = self.pooled.connection
+            return True
+
+        try:
+            opened = super().open()
+        except Exception:
+            self.pool.discard(None)
+            raise
+        if not self.connection:
+            self.pool.discard(None)
+            return opened
+        self.pool.count("opened")
+        now = time.monotonic()
+        self.pooled = PooledConnection(self.connection, now, now)
+        return opened
+
+    def close(self) -> None:
+        if self.connection is None:
+            return
+        self.pool.release(self.pooled)
+        self.connection = None
+        self.pooled = None
+
+    def _recycle(self) -> None:
+        self.pool.discard(self.pooled)
+        self.connection = None
+        self.pooled = None
+
+    def _send(self, email_message) -> bool:
+        try:
+            return super()._send(email_message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            log.warning("SMTP connection broke, sending again on a new connection")
+            self._recycle()
+            self.open()
+            return super()._send(email_message)
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.8 on 2026-10-18 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("email_system", "0001_squashed"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="groupemail",
+            name="chunk_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="groupemail",
+            name="queued_chunk_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
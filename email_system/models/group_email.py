@@ -1,5 +1,11 @@
 from django.contrib.auth.models import Group
-from django.db.models import SET_NULL, ForeignKey, DateTimeField, CharField
+from django.db.models import (
+    SET_NULL,
+    ForeignKey,
+    DateTimeField,
+    CharField,
+    PositiveIntegerField,
+)
 from django.utils.translation import gettext_lazy as _
 from djangocms_text_ckeditor.fields import HTMLField
 from parler.models import TranslatedFields, TranslatableModel
@@ -25,6 +31,9 @@ class GroupEmail(TranslatableModel):
         null=True,
     )
     sent_at = DateTimeField(null=True, blank=True)
+    # the recipients are queued in chunks by parallel tasks, sent_at is set by the last one
+    chunk_count = PositiveIntegerField(default=0)
+    queued_chunk_count = PositiveIntegerField(default=0)
 
     # Translated fields
     translations = TranslatedFields(
@@ -37,6 +46,16 @@ class GroupEmail(TranslatableModel):
     def is_sent(self):
         return self.sent_at is not None
 
+    def is_sending(self):
+        return self.chunk_count > 0 and not self.is_sent()
+
+    def sending_progress(self):
+        if not self.chunk_count:
+            return ""
+        return "{}/{}".format(self.queued_chunk_count, self.chunk_count)
+
+    sending_progress.short_description = _("Queued chunks")
+
     def get_recipients(self):
         return self.target_group.user_set.all()
 
@@ -21,7 +21,7 @@ class UnsubscribeCode(Model):
     def get_unsubscribe_url(self, context):
         url = reverse(
             "email_system:unsubscribe",
-            kwargs={"context": context, "user_id": self.user.id, "code": self.code},
+            kwargs={"context": context, "user_id": self.user_id, "code": self.code},
         )
         return "https://{}{}".format(settings.DEPLOYMENT_DOMAIN, url)
 
@@ -1,5 +1,10 @@
-from .send_email import send_email
-from .send_all_emails import send_all_emails
-from .send_group_email import send_group_email
+from .send_email import send_email, send_emails
+from .send_group_email import send_group_email, send_group_email_chunk
 from .copy_group_email import copy_group_email
 from .unsubscribe import unsubscribe
+from .mail_queue import (
+    send_queued_emails,
+    mail_queue_metrics,
+    queue_depth,
+    schedule_mail_queue,
+)
@@ -6,6 +6,8 @@ def copy_group_email(group_email) -> None:
     old_id = group_email.id
     group_email.id = None
     group_email.sent_at = None
+    group_email.chunk_count = 0
+    group_email.queued_chunk_count = 0
     group_email.save()
     old = GroupEmail.objects.get(id=old_id)
 
@@ -0,0 +1,305 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from multiprocessing.dummy import Pool as ThreadPool
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from post_office.connections import connections
+from post_office.models import Email, Log, PRIORITY, STATUS
+from post_office.settings import get_log_level, get_max_retries, get_retry_timedelta
+
+from email_system.backends import connection_pool_statistics
+
+log = logging.getLogger("tq")
+
+MAIL_QUEUE_LOCK_KEY = "email_system:mail_queue:lock"
+MAIL_QUEUE_SCHEDULED_KEY = "email_system:mail_queue:scheduled"
+MAIL_QUEUE_METRICS_KEY = "email_system:mail_queue:metrics"
+MAIL_QUEUE_LOCK_TIMEOUT = 60 * 60
+
+
+@dataclass(frozen=True)
+class MailLane:
+    name: str
+    priorities: tuple[int, ...]
+
+
+# ordered by precedence: a queued transactional mail is sent before the next bulk batch
+TRANSACTIONAL_LANE = MailLane("transactional", (PRIORITY.now, PRIORITY.high))
+BULK_LANE = MailLane("bulk", (PRIORITY.medium, PRIORITY.low))
+MAIL_LANES = [TRANSACTIONAL_LANE, BULK_LANE]
+
+
+def _config(name: str, default):
+    return getattr(settings, "EMAIL_QUEUE", {}).get(name, default)
+
+
+def send_rate() -> float:
+    """mails sent per second at most"""
+    return _config("SEND_RATE", 10)
+
+
+def concurrency() -> int:
+    """mails sent at the same time, each thread holds its own SMTP connection"""
+    return _config("CONCURRENCY", 4)
+
+
+def batch_size() -> int:
+    """mails of a lane taken from the queue at once, small batches preempt bulk mails faster"""
+    return _config("BATCH_SIZE", 50)
+
+
+class RateLimiter:
+    """token bucket shared by the sending threads"""
+
+    def __init__(
+        self,
+        rate: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = 1.0
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = self.clock()
+                self.tokens = min(1.0, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+
+
+@dataclass
+class MailQueueRun:
+    started: float = field(default_factory=time.monotonic)
+    sent: int = 0
+    failed: int = 0
+    requeued: int = 0
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        duration = time.monotonic() - self.started
+        return dict(
+            sent=self.sent,
+            failed=self.failed,
+            requeued=self.requeued,
+            duration=round(duration, 3),
+            send_rate=round(self.sent / duration, 3) if duration > 0 else 0,
+            latency={
+                lane: dict(
+                    count=len(values),
+                    average=round(sum(values) / len(values), 3),
+                    max=round(max(values), 3),
+                )
+                for lane, values in self.latencies.items()
+                if values
+            },
+            finished_at=timezone.now().isoformat(),
+        )
+
+
+def _ready() -> Q:
+    now = timezone.now()
+    return (
+        Q(status__in=[STATUS.queued, STATUS.requeued])
+        & (Q(scheduled_time__lte=now) | Q(scheduled_time=None))
+        & (Q(expires_at__gt=now) | Q(expires_at=None))
+    )
+
+
+def queue_depth() -> dict[str, int]:
+    """number of mails ready to be sent in each lane"""
+    counts = dict(
+        Email.objects.filter(_ready())
+        .values_list("priority")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    return {
+        lane.name: sum(counts.get(priority, 0) for priority in lane.priorities)
+        for lane in MAIL_LANES
+    }
+
+
+def next_batch(size: int) -> tuple[Optional[MailLane], list[Email]]:
+    """the oldest ready mails of the first lane which has any"""
+    for lane in MAIL_LANES:
+        emails = list(
+            Email.objects.filter(_ready(), priority__in=lane.priorities)
+            .select_related("template")
+            .prefetch_related("attachments")
+            .order_by("-priority", "created")[:size]
+        )
+        if emails:
+            return lane, emails
+    return None, []
+
+
+def back_off(email: Email, now=None) -> None:
+    """requeues the failed mail with an exponentially growing delay or marks it as failed"""
+    retries = email.number_of_retries or 0
+    if retries < get_max_retries():
+        email.status = STATUS.requeued
+        email.scheduled_time = (now or timezone.now()) + get_retry_timedelta() * (
+            2**retries
+        )
+        email.number_of_retries = retries + 1
+    else:
+        email.status = STATUS.failed
+
+
+def _send(limiter: RateLimiter, email: Email) -> Optional[Exception]:
+    limiter.acquire()
+    try:
+        email.dispatch(commit=False, disconnect_after_delivery=False)
+    except Exception as e:
+        return e
+    return None
+
+
+def _close_connections(barrier: threading.Barrier, _) -> None:
+    # every thread of the pool waits for the others, so each closes its own connections
+    barrier.wait()
+    connections.close()
+
+
+def _send_batch(
+    pool: ThreadPool, limiter: RateLimiter, lane: MailLane, emails: list[Email]
+) -> MailQueueRun:
+    result = MailQueueRun()
+    prepared, errors = [], []
+    for email in emails:
+        try:
+            email.prepare_email_message()
+            prepared.append(email)
+        except Exception as e:
+            log.exception("Failed to prepare email #{}".format(email.id))
+            errors.append((email, e))
+
+    exceptions = pool.map(partial(_send, limiter), prepared)
+    now = timezone.now()
+    sent = [email for email, e in zip(prepared, exceptions) if e is None]
+    errors += [(email, e) for email, e in zip(prepared, exceptions) if e is not None]
+
+    Email.objects.filter(id__in=[email.id for email in sent]).update(status=STATUS.sent)
+    for email, _ in errors:
+        back_off(email, now)
+    Email.objects.bulk_update(
+        [email for email, _ in errors],
+        ["status", "scheduled_time", "number_of_retries"],
+    )
+    # the mail history of the admin, logged like post_office's send_queued
+    logs = []
+    if get_log_level() >= 1:
+        logs += [
+            Log(
+                email=email,
+                status=STATUS.failed,
+                message=str(e),
+                exception_type=type(e).__name__,
+            )
+            for email, e in errors
+        ]
+    if get_log_level() >= 2:
+        logs += [Log(email=email, status=STATUS.sent) for email in sent]
+    Log.objects.bulk_create(logs)
+
+    result.sent = len(sent)
+    result.failed = sum(1 for email, _ in errors if email.status == STATUS.failed)
+    result.requeued = len(errors) - result.failed
+    result.latencies[lane.name] = [
+        (
+            now - max(email.created, email.scheduled_time or email.created)
+        ).total_seconds()
+        for email in sent
+    ]
+    return result
+
+
+def send_queued_emails(
+    max_duration: Optional[float] = MAIL_QUEUE_LOCK_TIMEOUT / 2,
+) -> dict:
+    """
+    Sends the queued mails lane by lane until the queue is empty: after every batch the
+    transactional lane is checked first. The mails are sent by CONCURRENCY threads at no
+    more than SEND_RATE mails per second. Returns the metrics of the run.
+    """
+    if not cache.add(MAIL_QUEUE_LOCK_KEY, True, MAIL_QUEUE_LOCK_TIMEOUT):
+        log.info("the mail queue is already being sent")
+        return {}
+    cache.delete(MAIL_QUEUE_SCHEDULED_KEY)
+
+    run = MailQueueRun()
+    limiter = RateLimiter(send_rate())
+    threads = concurrency()
+    pool = ThreadPool(threads)
+    try:
+        while max_duration is None or time.monotonic() - run.started < max_duration:
+            lane, emails = next_batch(batch_size())
+            if lane is None:
+                break
+            result = _send_batch(pool, limiter, lane, emails)
+            run.sent += result.sent
+            run.failed += result.failed
+            run.requeued += result.requeued
+            run.latencies.setdefault(lane.name, []).extend(result.latencies[lane.name])
+        pool.map(
+            partial(_close_connections, threading.Barrier(threads)),
+            range(threads),
+            chunksize=1,
+        )
+    finally:
+        pool.close()
+        pool.join()
+        cache.delete(MAIL_QUEUE_LOCK_KEY)
+
+    metrics = run.as_dict()
+    metrics["smtp_connections"] = connection_pool_statistics()
+    cache.set(MAIL_QUEUE_METRICS_KEY, metrics, None)
+    log.info("sent queued emails: {}".format(metrics))
+    return metrics
+
+
+def mail_queue_metrics() -> dict:
+    """
+    the current queue depth of every lane and the metrics of the last run, which include the
+    SMTP connection reuse of the worker which sent it
+    """
+    return dict(queue_depth=queue_depth(), last_run=cache.get(MAIL_QUEUE_METRICS_KEY))
+
+
+def schedule_mail_queue(sender=None, emails=(), **kwargs) -> None:
+    """
+    Receiver of post_office's email_queued signal: queued transactional mails are sent
+    once the transaction is committed instead of waiting for the periodic task.
+    """
+    if not any(
+        email.status == STATUS.queued
+        and email.priority in TRANSACTIONAL_LANE.priorities
+        for email in emails
+    ):
+        return
+    if cache.add(MAIL_QUEUE_SCHEDULED_KEY, True, 60):
+        transaction.on_commit(_enqueue_mail_queue)
+
+
+def _enqueue_mail_queue() -> None:
+    from tq_website.tasks import send_queued_emails as task_send_queued_emails
+
+    task_send_queued_emails.delay()
@@ -1,9 +1,13 @@
 import logging
+from email.utils import make_msgid
 from typing import Iterable, Optional, Union
 
 from django.core.exceptions import ValidationError
 from post_office import mail
-from post_office.models import Email, EmailTemplate
+from post_office.models import Email, EmailTemplate, PRIORITY, STATUS
+from post_office.settings import get_message_id_enabled, get_message_id_fqdn
+from post_office.signals import email_queued
+from post_office.utils import create_attachments, get_email_template, parse_emails
 
 from tq_website import settings
 
@@ -22,7 +26,114 @@ def send_email(
     html_message: Optional[str] = None,
     attachments: Optional[dict] = None,
 ) -> Optional[Email]:
-    email = dict(
+    email = _email_arguments(
+        to, reply_to, template, context, sender, subject, headers, message, html_message
+    )
+    email["attachments"] = attachments
+
+    try:
+        return mail.send(**email)
+
+    except ValidationError as e:
+        log.warning(f"Validation failed: {e.message}. Data: {email}")
+    except EmailTemplate.DoesNotExist:
+        log.error(f"Email Template missing with name: {email['template']}")
+
+    return None
+
+
+def send_emails(
+    emails: Iterable[dict], render: bool = True, priority: int = PRIORITY.high
+) -> list[Optional[Email]]:
+    """
+    Queues many emails with a single insert, like post_office's send_many, but returns
+    the created emails (None for the invalid ones). Each entry takes the arguments of
+    send_email. The emails are sent by the queued emails task.
+    With render=False the subjects and messages were rendered by the caller and are
+    queued as they are. Bulk mails pass a low priority, see mail_queue.
+    """
+    templates = {}
+    result = []
+    attachments = {}
+    for kwargs in emails:
+        kwargs = dict(kwargs)
+        email_attachments = kwargs.pop("attachments", None)
+        email = _email_arguments(**kwargs)
+        try:
+            if render:
+                name = email["template"]
+                if name and name not in templates:
+                    templates[name] = get_email_template(name)
+                if name:
+                    email["template"] = templates[name]
+                queued = mail.send(commit=False, priority=priority, **email)
+            else:
+                queued = _rendered_email(priority=priority, **email)
+        except ValidationError as e:
+            log.warning(f"Validation failed: {e.message}. Data: {email}")
+            queued = None
+        except EmailTemplate.DoesNotExist:
+            log.error(f"Email Template missing with name: {email['template']}")
+            queued = None
+
+        if queued is not None and email_attachments:
+            attachments[len(result)] = email_attachments
+        result.append(queued)
+
+    queued = [email for email in result if email is not None]
+    if queued:
+        Email.objects.bulk_create(queued)
+        # send_many cannot add attachments, they are added to the created emails instead
+        for i, email_attachments in attachments.items():
+            result[i].attachments.add(*create_attachments(email_attachments))
+        email_queued.send(sender=Email, emails=queued)
+    return result
+
+
+def _rendered_email(
+    recipients: list[str],
+    sender: str,
+    subject: Optional[str],
+    message: Optional[str],
+    html_message: Optional[str],
+    headers: dict,
+    priority: int,
+    **kwargs,
+) -> Email:
+    """
+    an unsaved queued email, like post_office's mail.send(commit=False) without rendering:
+    mail.send compiles the subject and messages as templates, which would evaluate template
+    syntax in the already rendered content and compile every email of a bulk mail again
+    """
+    return Email(
+        from_email=sender,
+        to=parse_emails(recipients),
+        subject=subject or "",
+        message=message or "",
+        html_message=html_message or "",
+        headers=headers,
+        priority=priority,
+        status=STATUS.queued,
+        message_id=(
+            make_msgid(domain=get_message_id_fqdn())
+            if get_message_id_enabled()
+            else None
+        ),
+    )
+
+
+def _email_arguments(
+    to: Union[str, Iterable[str]],
+    reply_to: Optional[str] = None,
+    template: Optional[str] = None,
+    context: Optional[dict] = None,
+    sender: Optional[str] = None,
+    subject: Optional[str] = None,
+    headers: Optional[dict] = None,
+    message: Optional[str] = None,
+    html_message: Optional[str] = None,
+) -> dict:
+    return dict(
         recipients=to if isinstance(to, list) else [to],
         template=template,
         context=context,
@@ -34,15 +145,4 @@ def send_email(
         },
         message=message,
         html_message=html_message,
-        attachments=attachments,
     )
-
-    try:
-        return mail.send(**email)
-
-    except ValidationError as e:
-        log.warning(f"Validation failed: {e.message}. Data: {email}")
-    except EmailTemplate.DoesNotExist:
-        log.error(f"Email Template missing with name: {email['template']}")
-
-    return None
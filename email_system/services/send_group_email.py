@@ -1,12 +1,26 @@
-from datetime import datetime
+import logging
+from functools import partial
+from typing import Optional
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.template import Context, Template
+from django.utils import timezone
+from post_office.models import PRIORITY
 
 from courses.models import UserProfile
 from email_system.models import GeneratedIndividualEmail, GroupEmail
 from groups.definitions import GroupDefinitions
 from utils import TranslationUtils
-from . import send_all_emails
+from . import send_emails
 from ..models import UnsubscribeCode
 
+log = logging.getLogger("tq")
+
+# recipients handled by a single celery task
+GROUP_EMAIL_CHUNK_SIZE = 500
+
 
 def _get_language(user) -> str:
     try:
@@ -15,59 +29,149 @@ def _get_language(user) -> str:
         return "en"
 
 
-def send_group_email(group_email: GroupEmail) -> None:
-    unsubscribe_context = None
-    if group_email.target_group.name == GroupDefinitions.NEWSLETTER.name:
-        unsubscribe_context = GroupDefinitions.NEWSLETTER.name
-    elif group_email.target_group.name == GroupDefinitions.GET_INVOLVED.name:
-        unsubscribe_context = GroupDefinitions.GET_INVOLVED.name
-    elif group_email.target_group.name == GroupDefinitions.TEST.name:
-        unsubscribe_context = GroupDefinitions.TEST.name
+def _get_unsubscribe_context(group_email: GroupEmail) -> Optional[str]:
+    if group_email.target_group.name in (
+        GroupDefinitions.NEWSLETTER.name,
+        GroupDefinitions.GET_INVOLVED.name,
+        GroupDefinitions.TEST.name,
+    ):
+        return group_email.target_group.name
+    return None
 
-    emails = []
 
-    for user in group_email.target_group.user_set.all():
-        # Get context for email
-        context = {
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-        }
+@transaction.atomic
+def send_group_email(
+    group_email: GroupEmail, chunk_size: int = GROUP_EMAIL_CHUNK_SIZE
+) -> int:
+    """
+    Splits the recipients of the email into chunks which are queued by parallel celery
+    tasks once the transaction is committed, the last of them marks the email as sent.
+    Returns the number of chunks.
+    """
+    user_ids = list(
+        group_email.target_group.user_set.order_by("id").values_list("id", flat=True)
+    )
+    chunks = [user_ids[i : i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+
+    # the chunk tasks count their progress against chunk_count, so it is saved first
+    group_email.chunk_count = len(chunks)
+    group_email.queued_chunk_count = 0
+    if not chunks:
+        group_email.sent_at = timezone.now()
+    group_email.save(update_fields=["chunk_count", "queued_chunk_count", "sent_at"])
 
-        group_email.set_current_language(_get_language(user))
-        subject = TranslationUtils.get_text_with_language_fallback(
-            group_email, "subject"
+    for chunk in chunks:
+        transaction.on_commit(
+            partial(_enqueue_group_email_chunk, group_email.id, chunk)
         )
-        html_message = TranslationUtils.get_text_with_language_fallback(
-            group_email, "message"
+    log.info(
+        "sending group email {} to {} users in {} chunks".format(
+            group_email.id, len(user_ids), len(chunks)
         )
+    )
+    return len(chunks)
+
+
+def _enqueue_group_email_chunk(group_email_id: int, user_ids: list[int]) -> None:
+    from tq_website.tasks import task_send_group_email_chunk
+
+    task_send_group_email_chunk.delay(group_email_id, user_ids)
+
+
+def _unsubscribe_codes(user_ids: list[int]) -> dict[int, UnsubscribeCode]:
+    """the unsubscribe code of each user, the missing ones are created with one insert"""
+    codes = {}
+    for code in UnsubscribeCode.objects.filter(user_id__in=user_ids).order_by("-id"):
+        codes[code.user_id] = code
+    missing = [UnsubscribeCode(user_id=i) for i in user_ids if i not in codes]
+    for code in UnsubscribeCode.objects.bulk_create(missing):
+        codes[code.user_id] = code
+    return codes
+
+
+def _compile_group_email(
+    group_email: GroupEmail, language: str
+) -> tuple[Template, Template]:
+    group_email.set_current_language(language)
+    return (
+        Template(
+            TranslationUtils.get_text_with_language_fallback(group_email, "subject")
+        ),
+        Template(
+            TranslationUtils.get_text_with_language_fallback(group_email, "message")
+        ),
+    )
+
+
+def _count_queued_chunk(group_email_id: int) -> None:
+    """marks the email as sent once all of its chunks are queued"""
+    emails = GroupEmail.objects.filter(pk=group_email_id)
+    emails.update(queued_chunk_count=F("queued_chunk_count") + 1)
+    emails.filter(queued_chunk_count__gte=F("chunk_count"), sent_at=None).update(
+        sent_at=timezone.now()
+    )
+
+
+def send_group_email_chunk(group_email_id: int, user_ids: list[int]) -> int:
+    """queues the emails of the given recipients in bulk, returns the number of queued emails"""
+    group_email = GroupEmail.objects.select_related("target_group", "reply_to").get(
+        pk=group_email_id
+    )
+    unsubscribe_context = _get_unsubscribe_context(group_email)
+    users = list(
+        User.objects.filter(id__in=user_ids).select_related("profile").order_by("id")
+    )
+    codes = (
+        _unsubscribe_codes([user.id for user in users])
+        if unsubscribe_context is not None
+        else {}
+    )
+
+    # subject and message are compiled once for all recipients with the same language
+    templates = {}
+
+    emails = []
+    for user in users:
+        language = _get_language(user)
+        if language not in templates:
+            templates[language] = _compile_group_email(group_email, language)
+        context = Context({"first_name": user.first_name, "last_name": user.last_name})
+        subject, html_message = (t.render(context) for t in templates[language])
 
         headers = {}
         if group_email.reply_to is not None:
             headers["Reply-to"] = group_email.reply_to.email_address
 
         if unsubscribe_context is not None:
-            unsubscribe_code, _ = UnsubscribeCode.objects.get_or_create(user=user)
-            unsubscribe_url = unsubscribe_code.get_unsubscribe_url(unsubscribe_context)
+            unsubscribe_url = codes[user.id].get_unsubscribe_url(unsubscribe_context)
             headers["List-unsubscribe"] = "<{}>".format(unsubscribe_url)
             html_message += '<p><a href="{}">Unsubscribe here</a></p>'.format(
                 unsubscribe_url
             )
 
-        # Add email
         emails.append(
             dict(
                 to=user.email,
                 subject=subject,
                 headers=headers,
                 html_message=html_message,
-                context=context,
             )
         )
 
-    sent_emails = send_all_emails(emails)
-    for email in sent_emails:
-        # Save generated mail
-        GeneratedIndividualEmail.objects.create(email=email, source=group_email)
-
-    group_email.sent_at = datetime.now()
-    group_email.save()
+    with transaction.atomic():
+        sent_emails = [
+            email
+            for email in send_emails(emails, render=False, priority=PRIORITY.low)
+            if email is not None
+        ]
+        GeneratedIndividualEmail.objects.bulk_create(
+            [
+                GeneratedIndividualEmail(email=email, source=group_email)
+                for email in sent_emails
+            ]
+        )
+        _count_queued_chunk(group_email.id)
+    log.info(
+        "queued {} emails of group email {}".format(len(sent_emails), group_email.id)
+    )
+    return len(sent_emails)
@@ -0,0 +1,83 @@
+import smtplib
+
+from django.test import TestCase, override_settings
+
+
+class FakeSMTP:
+    instances = []
+
+    def __init__(self, host, port, **kwargs):
+        self.alive = True
+        self.sent = 0
+        FakeSMTP.instances.append(self)
+
+    def starttls(self, **kwargs):
+        pass
+
+    def login(self, username, password):
+        pass
+
+    def noop(self):
+        if not self.alive:
+            raise smtplib.SMTPServerDisconnected()
+        return 250, b"OK"
+
+    def sendmail(self, from_email, recipients, message):
+        if not self.alive:
+            raise smtplib.SMTPServerDisconnected()
+        self.sent += 1
+
+    def quit(self):
+        self.alive = False
+
+    def close(self):
+        self.alive = False
+
+
+class PooledSMTPEmailBackendTest(TestCase):
+    def _backend(self, host):
+        from email_system.backends import PooledSMTPEmailBackend
+
+        class Backend(PooledSMTPEmailBackend):
+            connection_class = FakeSMTP
+
+        return Backend(
+            host=host, port=587, username="tq", password="secret", use_tls=True
+        )
+
+    def _send(self, host, backend=None):
+        from django.core.mail import EmailMessage
+
+        message = EmailMessage("subject", "body", "tq@tq.ch", ["user@tq.ch"])
+        return (backend or self._backend(host)).send_messages([message])
+
+    @override_settings(EMAIL_SMTP_POOL={"SIZE": 2, "MAX_IDLE": 0})
+    def test_connections_are_reused_and_recycled(self):
+        from email_system.backends import connection_pool, connection_pool_statistics
+
+        FakeSMTP.instances = []
+        host = "smtp.reuse.test"
+        self.assertEqual(self._send(host), 1)
+        self.assertEqual(self._send(host), 1)
+        self.assertEqual(len(FakeSMTP.instances), 1)
+        self.assertEqual(FakeSMTP.instances[0].sent, 2)
+
+        # the idle connection was dropped by the server and fails the NOOP check
+        FakeSMTP.instances[0].alive = False
+        self.assertEqual(self._send(host), 1)
+        self.assertEqual(len(FakeSMTP.instances), 2)
+
+        # a connection borrowed while the server drops it is replaced on send
+        backend = self._backend(host)
+        backend.open()
+        FakeSMTP.instances[1].alive = False
+        self.assertEqual(self._send(host, backend), 1)
+        backend.close()
+        self.assertEqual(FakeSMTP.instances[2].sent, 1)
+
+        pool = connection_pool((host, 587, "tq", True, False))
+        self.assertEqual(
+            pool.statistics(),
+            dict(opened=3, reused=2, recycled=2, idle=1, in_use=0),
+        )
+        self.assertGreaterEqual(connection_pool_statistics()["reused"], 2)
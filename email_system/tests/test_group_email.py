@@ -0,0 +1,94 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from post_office.models import Email
+from unittest.mock import patch
+
+from courses.models import UserProfile
+
+
+class GroupEmailTest(TestCase):
+    def _user(self, username, **profile) -> User:
+        user = User.objects.create_user(username=username, email=f"{username}@tq.ch")
+        UserProfile.objects.create(user=user, **profile)
+        return user
+
+    def test_group_email_is_queued_in_chunks(self):
+        from django.contrib.auth.models import Group
+        from email_system.models import GeneratedIndividualEmail, GroupEmail
+        from email_system.models import UnsubscribeCode
+        from email_system.services import send_group_email, send_group_email_chunk
+        from groups.definitions import GroupDefinitions
+
+        group = Group.objects.create(name=GroupDefinitions.NEWSLETTER.name)
+        for i in range(4):
+            user = self._user(f"reader-{i}", language="de" if i % 2 else "en")
+            user.first_name = user.username
+            user.save()
+            group.user_set.add(user)
+        UnsubscribeCode.objects.create(user=user)
+
+        group_email = GroupEmail.objects.create(target_group=group)
+        for language, subject in [("en", "News"), ("de", "Neuigkeiten")]:
+            group_email.set_current_language(language)
+            group_email.subject = subject
+            group_email.message = "<p>Hi {{ first_name }}</p>"
+            group_email.save()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(send_group_email(group_email, chunk_size=3), 2)
+        self.assertTrue(group_email.is_sending())
+        self.assertFalse(group_email.is_sent())
+
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                group_email.refresh_from_db()
+                self.assertFalse(group_email.is_sent())
+                send_group_email_chunk(*callback.args)
+        group_email.refresh_from_db()
+        self.assertTrue(group_email.is_sent())
+        self.assertEqual(group_email.sending_progress(), "2/2")
+        emails = Email.objects.order_by("id")
+        self.assertEqual(
+            [(e.subject, e.html_message.split("<p><a")[0]) for e in emails[:2]],
+            [("News", "<p>Hi reader-0</p>"), ("Neuigkeiten", "<p>Hi reader-1</p>")],
+        )
+        self.assertEqual(GeneratedIndividualEmail.objects.count(), 4)
+        self.assertEqual(UnsubscribeCode.objects.count(), 4)
+        self.assertIn(
+            str(UnsubscribeCode.objects.get(user=user)),
+            emails[3].headers["List-unsubscribe"],
+        )
+        # the queries of a chunk do not depend on its number of recipients
+        self.assertLess(len(queries), 2 * 15)
+
+
+class GroupEmailProgressTest(TransactionTestCase):
+    def test_chunks_of_a_fast_worker_are_counted(self):
+        from importlib import import_module
+
+        from django.contrib.auth.models import Group
+        from email_system.models import GroupEmail
+        from email_system.services import send_group_email, send_group_email_chunk
+
+        group = Group.objects.create(name="Readers")
+        for i in range(3):
+            group.user_set.add(
+                User.objects.create_user(username=f"reader-{i}", email=f"{i}@tq.ch")
+            )
+        group_email = GroupEmail.objects.create(target_group=group)
+        group_email.set_current_language("en")
+        group_email.subject = "News"
+        group_email.message = "<p>Hi</p>"
+        group_email.save()
+
+        # without an enclosing transaction, a worker may run the chunks right away
+        module = import_module("email_system.services.send_group_email")
+        with patch.object(module, "_enqueue_group_email_chunk", send_group_email_chunk):
+            self.assertEqual(send_group_email(group_email, chunk_size=2), 2)
+
+        group_email.refresh_from_db()
+        self.assertTrue(group_email.is_sent())
+        self.assertEqual(group_email.sending_progress(), "2/2")
+        self.assertEqual(Email.objects.count(), 3)
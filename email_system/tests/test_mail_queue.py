@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from post_office.models import Email, Log, PRIORITY, STATUS
+
+
+@override_settings(
+    POST_OFFICE={
+        "BACKENDS": {"default": "django.core.mail.backends.locmem.EmailBackend"},
+        "MAX_RETRIES": 2,
+        "RETRY_INTERVAL": timedelta(minutes=1),
+    },
+    EMAIL_QUEUE={"SEND_RATE": 1000, "CONCURRENCY": 2, "BATCH_SIZE": 2},
+)
+class MailQueueTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _queue(self, subject, priority) -> Email:
+        return Email.objects.create(
+            from_email="tq@tq.ch",
+            to=["user@tq.ch"],
+            subject=subject,
+            priority=priority,
+            status=STATUS.queued,
+        )
+
+    def test_transactional_mails_preempt_bulk_mails(self):
+        from django.core import mail
+        from email_system.services import (
+            mail_queue_metrics,
+            queue_depth,
+            send_queued_emails,
+        )
+
+        for i in range(3):
+            self._queue(f"newsletter {i}", PRIORITY.low)
+        self._queue("confirmation", PRIORITY.high)
+        self.assertEqual(queue_depth(), dict(transactional=1, bulk=3))
+
+        metrics = send_queued_emails()
+
+        self.assertEqual(mail.outbox[0].subject, "confirmation")
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertEqual(metrics["sent"], 4)
+        self.assertEqual(metrics["latency"]["bulk"]["count"], 3)
+        self.assertEqual(queue_depth(), dict(transactional=0, bulk=0))
+        self.assertFalse(Email.objects.exclude(status=STATUS.sent).exists())
+        self.assertEqual(Log.objects.filter(status=STATUS.sent).count(), 4)
+        # the connection statistics of the worker are stored with the run
+        self.assertEqual(
+            mail_queue_metrics()["last_run"]["smtp_connections"],
+            metrics["smtp_connections"],
+        )
+
+    def test_failed_mails_back_off(self):
+        from email_system.services.mail_queue import RateLimiter, back_off
+
+        email = self._queue("confirmation", PRIORITY.high)
+        now = timezone.now()
+        back_off(email, now)
+        self.assertEqual(email.status, STATUS.requeued)
+        self.assertEqual(email.scheduled_time, now + timedelta(minutes=1))
+        back_off(email, now)
+        self.assertEqual(email.scheduled_time, now + timedelta(minutes=2))
+        back_off(email, now)
+        self.assertEqual(email.status, STATUS.failed)
+
+        clock, sleeps = [0.0], []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            clock[0] += seconds
+
+        limiter = RateLimiter(4, clock=lambda: clock[0], sleep=sleep)
+        for _ in range(5):
+            limiter.acquire()
+        self.assertEqual(sleeps, [0.25] * 4)
@@ -0,0 +1,32 @@
+from django.core.files.base import ContentFile
+from django.test import TestCase
+from post_office.models import Email, STATUS
+
+
+class SendEmailsTest(TestCase):
+    def test_emails_are_queued_in_bulk(self):
+        from email_system.services import send_emails
+
+        emails = send_emails(
+            [
+                dict(
+                    to="a@tq.ch",
+                    subject="Hi {{ name }}",
+                    message="Hi",
+                    context=dict(name="A"),
+                    attachments={"voucher.txt": ContentFile(b"voucher")},
+                ),
+                dict(to="not an address", subject="Hi", message="Hi"),
+                dict(to="b@tq.ch", template="missing"),
+            ]
+        )
+        self.assertEqual(emails[1:], [None, None])
+        self.assertEqual(emails[0].subject, "Hi A")
+        self.assertEqual(emails[0].attachments.get().name, "voucher.txt")
+        self.assertEqual(Email.objects.filter(status=STATUS.queued).count(), 1)
+
+        # rendered emails are queued as they are
+        (email,) = send_emails(
+            [dict(to="a@tq.ch", subject="{{ x }}", message="{% y %}")], render=False
+        )
+        self.assertEqual((email.subject, email.message), ("{{ x }}", "{% y %}"))
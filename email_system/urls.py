@@ -10,4 +10,9 @@ urlpatterns = [
         views.unsubscribe,
         name="unsubscribe",
     ),
+    path(
+        "admin/mail_queue/metrics/",
+        views.mail_queue_metrics,
+        name="mail_queue_metrics",
+    ),
 ]
@@ -1,3 +1,5 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpRequest, JsonResponse
 from django.shortcuts import render
 
 from email_system import services
@@ -8,3 +10,9 @@ def unsubscribe(request, context, user_id, code):
     success = services.unsubscribe(context, user_id, code)
     context = dict(success=success)
     return render(request, "email_system/unsubscribe.html", context)
+
+
+@staff_member_required
+def mail_queue_metrics(request: HttpRequest) -> JsonResponse:
+    """queue depth of every lane and send rate and latencies of the last run"""
+    return JsonResponse(services.mail_queue_metrics())
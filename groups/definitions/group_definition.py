@@ -1,10 +1,31 @@
+from typing import Callable, Optional
+
+from django.contrib.auth.models import User
+from django.db.models import Q
+
+
 class GroupDefinition:
-    def __init__(self, name: str, predicate=None) -> None:
+    def __init__(
+        self,
+        name: str,
+        predicate: Callable[[User], bool] = None,
+        members: Callable[[], Q] = None,
+        changes_over_time: bool = False,
+    ) -> None:
         self.name: str = name
         self.predicate = predicate
+        # returns the filter of the users in the group, evaluated when the group is updated
+        self.members = members
+        # membership also changes as days pass, which no signal reports
+        self.changes_over_time = changes_over_time
+
+    def members_filter(self) -> Optional[Q]:
+        return self.members() if self.members is not None else None
 
-    def matches(self, user) -> bool:
+    def matches(self, user: User) -> bool:
+        if self.members is not None:
+            return User.objects.filter(self.members(), pk=user.pk).exists()
         return self.predicate(user)
 
     def is_manual(self) -> bool:
-        return self.predicate is None
+        return self.predicate is None and self.members is None
@@ -1,15 +1,29 @@
+from . import members
 from .group_definition import GroupDefinition
 from .predicates import *
 
 
 class GroupDefinitions:
-    ALL_TEACHERS = GroupDefinition(name="All teachers", predicate=is_teacher)
+    ALL_TEACHERS = GroupDefinition(
+        name="All teachers", predicate=is_teacher, members=members.teachers
+    )
     CURRENT_TEACHERS = GroupDefinition(
-        name="Current teachers", predicate=is_current_teacher
+        name="Current teachers",
+        predicate=is_current_teacher,
+        members=members.current_teachers,
+        changes_over_time=True,
+    )
+    BOARD_MEMBERS = GroupDefinition(
+        name="Board members", predicate=is_board_member, members=members.board_members
+    )
+    NEWSLETTER = GroupDefinition(
+        name="Newsletter", predicate=newsletter, members=members.newsletter
+    )
+    GET_INVOLVED = GroupDefinition(
+        name="Want to get involved",
+        predicate=get_involved,
+        members=members.get_involved,
     )
-    BOARD_MEMBERS = GroupDefinition(name="Board members", predicate=is_board_member)
-    NEWSLETTER = GroupDefinition(name="Newsletter", predicate=newsletter)
-    GET_INVOLVED = GroupDefinition(name="Want to get involved", predicate=get_involved)
 
     TEST = GroupDefinition(name="Test")
 
@@ -0,0 +1,24 @@
+from datetime import date
+
+from django.db.models import Q
+
+
+def teachers() -> Q:
+    return Q(teaching_courses__isnull=False)
+
+
+def current_teachers() -> Q:
+    # at least one course ends in the future
+    return Q(teaching_courses__course__last_lesson_date__gte=date.today())
+
+
+def board_members() -> Q:
+    return Q(functions__isnull=False)
+
+
+def newsletter() -> Q:
+    return Q(profile__newsletter=True)
+
+
+def get_involved() -> Q:
+    return Q(profile__get_involved=True)
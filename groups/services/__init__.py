@@ -1 +1,2 @@
-from .update_groups import update_groups
+from .update_groups import update_groups, update_group, group_members
+from .update_user_groups import update_user_groups, schedule_user_groups_update
@@ -1,15 +1,26 @@
 import logging
 
-from django.contrib.auth.models import Group
+from django.contrib.auth.models import Group, User
+from django.db import transaction
 
 from courses.models import UserProfile
 from ..definitions import GroupDefinitions
+from ..definitions.group_definition import GroupDefinition
 
 log = logging.getLogger("update_groups")
 
+Membership = User.groups.through
 
-def update_groups(queryset=None):
+
+def update_groups(queryset=None) -> dict[str, dict[str, int]]:
+    """
+    Recomputes all automatic groups. Memberships are kept up to date by signals (see
+    update_user_groups), so this is a consistency sweep: it returns and logs the number of
+    users added to and removed from each group which drifted. Groups which change as time
+    passes are updated without being reported.
+    """
     log.info("Updating groups")
+    drift = {}
 
     # All groups
     if queryset is None:
@@ -21,20 +32,60 @@ def update_groups(queryset=None):
         if group_definition.is_manual():
             continue
 
-        group = queryset.filter(name=group_definition.name)
-        if not group.exists():
+        group = queryset.filter(name=group_definition.name).first()
+        if group is None:
             continue
 
         log.info("Updating group " + group_definition.name)
+        added, removed, count = update_group(group, group_definition)
+        log.info(
+            "Updating group finished. {} users added, {} users removed. "
+            "Number of users in group {}".format(added, removed, count)
+        )
+        if (added or removed) and not group_definition.changes_over_time:
+            drift[group_definition.name] = dict(added=added, removed=removed)
 
-        group = group.get()
-        group.user_set.clear()
-        for profile in UserProfile.objects.all():
-            user = profile.user
-            if group_definition.matches(user):
-                group.user_set.add(user)
+    if drift:
+        log.warning("Groups drifted from their definitions: {}".format(drift))
+    return drift
 
-        log.info(
-            "Updating group finished. Number of users in group "
-            + str(group.user_set.count())
+
+def group_members(group_definition: GroupDefinition) -> set[int]:
+    """ids of the active users with a profile which belong to the group"""
+    members = group_definition.members_filter()
+    if members is not None:
+        return set(
+            User.objects.filter(
+                members, is_active=True, profile__isnull=False
+            ).values_list("id", flat=True)
+        )
+
+    # fallback for groups defined by a predicate only
+    return {
+        profile.user_id
+        for profile in UserProfile.objects.select_related("user")
+        if group_definition.predicate(profile.user)
+    }
+
+
+@transaction.atomic
+def update_group(
+    group: Group, group_definition: GroupDefinition
+) -> tuple[int, int, int]:
+    """applies the difference between the current and the desired members in bulk"""
+    Group.objects.select_for_update().filter(pk=group.pk).first()
+
+    current = set(
+        Membership.objects.filter(group=group).values_list("user_id", flat=True)
+    )
+    desired = group_members(group_definition)
+    added, removed = desired - current, current - desired
+
+    if removed:
+        Membership.objects.filter(group=group, user_id__in=removed).delete()
+    if added:
+        Membership.objects.bulk_create(
+            [Membership(group=group, user_id=user_id) for user_id in added],
+            ignore_conflicts=True,
         )
+    return len(added), len(removed), len(desired)
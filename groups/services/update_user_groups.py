@@ -0,0 +1,93 @@
+import logging
+from functools import partial
+from typing import Iterable
+
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from ..definitions import GroupDefinitions
+from .update_groups import Membership
+
+log = logging.getLogger("update_groups")
+
+
+def _matching_definitions(user: User) -> set[str]:
+    """names of the automatic groups the user belongs to, with one query for all filters"""
+    definitions = [d for d in GroupDefinitions.DEFINITIONS if not d.is_manual()]
+    if not user.is_active or not hasattr(user, "profile"):
+        return set()
+
+    filtered = [d for d in definitions if d.members is not None]
+    flags = {}
+    if filtered:
+        flags = (
+            User.objects.filter(pk=user.pk)
+            .annotate(
+                **{
+                    "group_{}".format(i): Exists(
+                        User.objects.filter(d.members_filter(), pk=OuterRef("pk"))
+                    )
+                    for i, d in enumerate(filtered)
+                }
+            )
+            .values(*["group_{}".format(i) for i in range(len(filtered))])
+            .first()
+        )
+    names = {d.name for i, d in enumerate(filtered) if flags.get("group_{}".format(i))}
+
+    # fallback for groups defined by a predicate only
+    names.update(d.name for d in definitions if d.members is None and d.predicate(user))
+    return names
+
+
+@transaction.atomic
+def update_user_groups(user_id: int) -> tuple[set[str], set[str]]:
+    """
+    Re-evaluates a single user against all group definitions and applies the difference.
+    Returns the names of the groups the user was added to and removed from.
+    """
+    user = User.objects.select_related("profile").filter(pk=user_id).first()
+    groups = {
+        group.name: group
+        for group in Group.objects.filter(
+            name__in=[d.name for d in GroupDefinitions.DEFINITIONS if not d.is_manual()]
+        )
+    }
+    current = set(
+        Membership.objects.filter(
+            user_id=user_id, group__in=groups.values()
+        ).values_list("group__name", flat=True)
+    )
+    desired = _matching_definitions(user) & set(groups) if user else set()
+    added, removed = desired - current, current - desired
+
+    if removed:
+        Membership.objects.filter(
+            user_id=user_id, group__in=[groups[name] for name in removed]
+        ).delete()
+    if added:
+        Membership.objects.bulk_create(
+            [Membership(user_id=user_id, group=groups[name]) for name in added],
+            ignore_conflicts=True,
+        )
+    if added or removed:
+        log.info(
+            "Updated groups of user {}: added to {}, removed from {}".format(
+                user_id, sorted(added), sorted(removed)
+            )
+        )
+    return added, removed
+
+
+def schedule_user_groups_update(user_ids: Iterable[int]) -> None:
+    """re-evaluates the groups of the users in a celery worker once the transaction is committed"""
+    user_ids = sorted(set(user_ids))
+    if user_ids:
+        transaction.on_commit(partial(_enqueue_user_groups_update, user_ids))
+
+
+def _enqueue_user_groups_update(user_ids: list[int]) -> None:
+    from tq_website.tasks import task_update_user_groups
+
+    task_update_user_groups.delay(user_ids)
@@ -0,0 +1,107 @@
+from django.db.models import Q
+from django.db.models.signals import (
+    pre_save,
+    post_save,
+    post_delete,
+    pre_delete,
+    m2m_changed,
+)
+
+from courses.models import (
+    UserProfile,
+    Teach,
+    RegularLesson,
+    IrregularLesson,
+    Period,
+    Offering,
+)
+from groups.services import schedule_user_groups_update
+from organisation.models import Function
+
+# fields of the profile which the group definitions depend on
+USER_PROFILE_GROUP_FIELDS = {"newsletter", "get_involved"}
+
+
+def update_groups_of_profile(instance, raw=False, update_fields=None, **kwargs) -> None:
+    if raw or (update_fields and not USER_PROFILE_GROUP_FIELDS & set(update_fields)):
+        return
+    schedule_user_groups_update([instance.user_id])
+
+
+def remember_previous_teacher(instance, raw=False, **kwargs) -> None:
+    """remembers the stored teacher, who may lose the teacher groups when it changes"""
+    instance._previous_teacher_id = None
+    if not raw and instance.pk is not None:
+        instance._previous_teacher_id = (
+            Teach.objects.filter(pk=instance.pk)
+            .values_list("teacher_id", flat=True)
+            .first()
+        )
+
+
+def update_groups_of_teacher(instance, raw=False, **kwargs) -> None:
+    if raw:
+        return
+    previous_teacher_id = getattr(instance, "_previous_teacher_id", None)
+    schedule_user_groups_update(
+        [instance.teacher_id]
+        + ([previous_teacher_id] if previous_teacher_id is not None else [])
+    )
+
+
+def _update_groups_of_teachers(courses: Q) -> None:
+    """the current teachers depend on the last lesson date of the courses they teach"""
+    schedule_user_groups_update(
+        Teach.objects.filter(courses).values_list("teacher_id", flat=True)
+    )
+
+
+def update_groups_of_lesson_teachers(instance, raw=False, **kwargs) -> None:
+    if not raw:
+        _update_groups_of_teachers(Q(course_id=instance.course_id))
+
+
+def update_groups_of_period_teachers(instance, raw=False, **kwargs) -> None:
+    if not raw:
+        _update_groups_of_teachers(
+            Q(course__period=instance)
+            | Q(course__period__isnull=True, course__offering__period=instance)
+        )
+
+
+def update_groups_of_offering_teachers(instance, created, raw=False, **kwargs) -> None:
+    if not raw and not created:
+        _update_groups_of_teachers(
+            Q(course__offering=instance, course__period__isnull=True)
+        )
+
+
+def update_groups_of_function_users(
+    instance, action, reverse, pk_set, **kwargs
+) -> None:
+    if reverse:
+        # a user's functions were changed
+        if action in ("post_add", "post_remove", "post_clear"):
+            schedule_user_groups_update([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        schedule_user_groups_update(pk_set)
+    elif action == "pre_clear":
+        schedule_user_groups_update(instance.users.values_list("id", flat=True))
+
+
+def update_groups_of_deleted_function(instance, **kwargs) -> None:
+    schedule_user_groups_update(instance.users.values_list("id", flat=True))
+
+
+def connect_group_membership_updates() -> None:
+    post_save.connect(update_groups_of_profile, sender=UserProfile)
+    pre_save.connect(remember_previous_teacher, sender=Teach)
+    post_save.connect(update_groups_of_teacher, sender=Teach)
+    post_delete.connect(update_groups_of_teacher, sender=Teach)
+    for lesson_model in (RegularLesson, IrregularLesson):
+        post_save.connect(update_groups_of_lesson_teachers, sender=lesson_model)
+        post_delete.connect(update_groups_of_lesson_teachers, sender=lesson_model)
+    post_save.connect(update_groups_of_period_teachers, sender=Period)
+    post_save.connect(update_groups_of_offering_teachers, sender=Offering)
+    m2m_changed.connect(update_groups_of_function_users, sender=Function.users.through)
+    pre_delete.connect(update_groups_of_deleted_function, sender=Function)
@@ -0,0 +1,149 @@
+from datetime import date, time
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from courses.models import (
+    Course,
+    CourseType,
+    IrregularLesson,
+    Offering,
+    Period,
+    Teach,
+    UserProfile,
+)
+
+
+class GroupsTest(TestCase):
+    def setUp(self):
+        period = Period.objects.create(
+            date_from=date(2023, 9, 18), date_to=date(2023, 12, 22)
+        )
+        offering = Offering.objects.create(name="HS 2023", period=period)
+        self.course = Course.objects.create(
+            name="Salsa 1 (Mo)",
+            offering=offering,
+            type=CourseType.objects.create(title="Salsa 1"),
+        )
+
+    def _user(self, username, **profile) -> User:
+        user = User.objects.create_user(username=username, email=f"{username}@tq.ch")
+        UserProfile.objects.create(user=user, **profile)
+        return user
+
+    def test_update_applies_membership_difference(self):
+        from django.contrib.auth.models import Group
+        from groups.definitions import GroupDefinitions
+        from groups.services import group_members, update_groups, update_user_groups
+
+        reader = self._user("reader", newsletter=True)
+        inactive = self._user("inactive", newsletter=True)
+        inactive.is_active = False
+        inactive.save()
+        teacher = self._user("teacher", newsletter=False)
+        Teach.objects.create(teacher=teacher, course=self.course, hourly_wage=30)
+        IrregularLesson.objects.create(
+            course=self.course, date=date.today(), time_from=time(14), time_to=time(16)
+        )
+
+        newsletter = Group.objects.create(name=GroupDefinitions.NEWSLETTER.name)
+        newsletter.user_set.add(teacher)
+        update_groups()
+
+        self.assertEqual(list(newsletter.user_set.all()), [reader])
+        for definition, users in [
+            (GroupDefinitions.ALL_TEACHERS, [teacher]),
+            (GroupDefinitions.CURRENT_TEACHERS, [teacher]),
+            (GroupDefinitions.BOARD_MEMBERS, []),
+        ]:
+            self.assertEqual(
+                list(Group.objects.get(name=definition.name).user_set.all()), users
+            )
+            # the filters agree with the python predicates
+            self.assertEqual(
+                group_members(definition),
+                {
+                    p.user_id
+                    for p in UserProfile.objects.select_related("user")
+                    if definition.predicate(p.user)
+                },
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            update_groups()
+        self.assertEqual(reader.groups.count(), 1)
+        self.assertEqual(inactive.groups.count(), 0)
+        self.assertEqual(update_user_groups(inactive.id), (set(), set()))
+        # a constant number of queries for each automatic group, nothing to insert or delete
+        self.assertEqual(len(queries), 6 + 5 * 6)
+
+    def test_signals_update_groups_of_affected_user(self):
+        from django.contrib.auth.models import Group
+        from groups.definitions import GroupDefinitions
+        from groups.services import update_groups, update_user_groups
+        from organisation.models import Function
+
+        update_groups()
+        reader = self._user("reader")
+        with self.captureOnCommitCallbacks() as callbacks:
+            reader.profile.newsletter = True
+            reader.profile.save()
+            reader.profile.save(update_fields=["body_height"])
+            function = Function.objects.create(name="President")
+            function.users.add(reader)
+        self.assertEqual([c.args for c in callbacks], [([reader.id],), ([reader.id],)])
+
+        self.assertEqual(
+            update_user_groups(reader.id),
+            (
+                {GroupDefinitions.NEWSLETTER.name, GroupDefinitions.BOARD_MEMBERS.name},
+                set(),
+            ),
+        )
+        self.assertEqual(update_user_groups(reader.id), (set(), set()))
+        self.assertEqual(update_groups(), {})
+
+        # changes missed by the signals are reported by the full update
+        Group.objects.get(name=GroupDefinitions.NEWSLETTER.name).user_set.clear()
+        self.assertEqual(
+            update_groups(),
+            {GroupDefinitions.NEWSLETTER.name: dict(added=1, removed=0)},
+        )
+
+    def test_teacher_groups_follow_teachers_and_schedules(self):
+        from datetime import timedelta
+
+        from django.contrib.auth.models import Group
+        from groups.definitions import GroupDefinitions
+        from groups.services import update_groups
+
+        first, second = self._user("first"), self._user("second")
+        teach = Teach.objects.create(teacher=first, course=self.course, hourly_wage=30)
+        with self.captureOnCommitCallbacks() as callbacks:
+            teach.teacher = second
+            teach.save()
+        self.assertEqual([c.args for c in callbacks], [([first.id, second.id],)])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            lesson = IrregularLesson.objects.create(
+                course=self.course,
+                date=date.today() + timedelta(days=1),
+                time_from=time(14),
+                time_to=time(16),
+            )
+        self.assertEqual([c.args for c in callbacks], [([second.id],)])
+        update_groups()
+
+        # the course ended, which is no drift of the current teachers
+        current_teachers = Group.objects.get(
+            name=GroupDefinitions.CURRENT_TEACHERS.name
+        )
+        self.assertEqual(list(current_teachers.user_set.all()), [second])
+        IrregularLesson.objects.filter(pk=lesson.pk).update(
+            date=date.today() - timedelta(days=1)
+        )
+        self.course.update_lesson_schedule()
+        self.assertEqual(update_groups(), {})
+        self.assertEqual(list(current_teachers.user_set.all()), [])
@@ -27,7 +27,7 @@ class PaymentAdmin(admin.ModelAdmin):
         "subscription_payments_amount_sum",
         "list_subscriptions",
     ]
-    list_filter = ["state", "type", "credit_debit"]
+    list_filter = ["state", "type", "credit_debit", "needs_processing"]
     search_fields = [
         "id",
         "name",
@@ -63,15 +63,36 @@ class PaymentAdmin(admin.ModelAdmin):
         "file",
         "iban",
         "bic",
+        "needs_processing",
     )
 
+    def save_model(self, request, obj, form, change):
+        # a payment set back to new or matched by hand is processed on the next run
+        if change and {"state", "type"} & set(form.changed_data):
+            obj.needs_processing = True
+        super().save_model(request, obj, form, change)
+
 
 @admin.register(FinanceFile)
 class FinanceFileAdmin(admin.ModelAdmin):
-    list_display = ["name", "processed", "created_at"]
+    list_display = [
+        "name",
+        "processed",
+        "created_at",
+        "processed_at",
+        "parse_duration",
+        "entry_count",
+        "payment_count",
+    ]
     list_filter = ["processed"]
     search_fields = ["name"]
-    readonly_fields = ["created_at"]
+    readonly_fields = [
+        "created_at",
+        "processed_at",
+        "parse_duration",
+        "entry_count",
+        "payment_count",
+    ]
 
 
 @admin.register(SubscriptionPayment)
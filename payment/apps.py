@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+
+
+class PaymentConfig(AppConfig):
+    name = "payment"
+
+    def ready(self):
+        from payment.signals import (
+            connect_revenue_report_invalidation,
+            connect_payment_processing,
+            connect_usi_index,
+        )
+
+        connect_revenue_report_invalidation()
+        connect_payment_processing()
+        connect_usi_index()
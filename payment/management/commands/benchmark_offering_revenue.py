@@ -0,0 +1,63 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from courses.management.commands.benchmark_course_list import (
+    Command as CourseListBenchmark,
+)
+from courses.models import Offering, Subscribe, SubscribeState, Teach
+from payment.services import compute_offering_revenue_report, offering_revenue_report
+
+log = logging.getLogger("tq")
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures query count and wall time of the revenue report of an offering with "
+        "generated courses. All generated data is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=300)
+        parser.add_argument("--subscriptions", type=int, default=20)
+
+    def handle(self, *args, **options):
+        log.info("run management command: {}".format(__file__))
+
+        with transaction.atomic():
+            offering = self._generate_offering(
+                options["courses"], options["subscriptions"]
+            )
+            self._measure("uncached", compute_offering_revenue_report, offering)
+            self._measure("first request", offering_revenue_report, offering)
+            self._measure("cached", offering_revenue_report, offering)
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _generate_offering(courses_count: int, subscriptions_count: int) -> Offering:
+        CourseListBenchmark._generate_offering(courses_count, subscriptions_count)
+        offering = Offering.objects.get(name="Benchmark offering")
+        Subscribe.objects.filter(course__offering=offering).update(
+            state=SubscribeState.CONFIRMED
+        )
+        teacher = Subscribe.objects.filter(course__offering=offering).first().user
+        Teach.objects.bulk_create(
+            Teach(course=course, teacher=teacher, hourly_wage=40)
+            for course in offering.course_set.all()
+        )
+        return offering
+
+    def _measure(self, name: str, report, offering: Offering) -> None:
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            rows = report(offering)
+            duration = time.perf_counter() - start
+
+        self.stdout.write(
+            "{}: {} rows, {} queries, {:.3f}s".format(
+                name, len(rows), len(queries), duration
+            )
+        )
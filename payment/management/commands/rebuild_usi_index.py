@@ -0,0 +1,19 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from payment.models import UsiCandidate
+
+log = logging.getLogger("tq")
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the index of the USIs of open subscriptions used to correct misspelled USIs"
+
+    def handle(self, *args, **options):
+        log.info("run management command: {}".format(__file__))
+
+        count = UsiCandidate.objects.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS("Indexed the USIs of {} subscriptions".format(count))
+        )
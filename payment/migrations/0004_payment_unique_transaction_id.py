@@ -0,0 +1,44 @@
+# Generated by Django 4.2.8 on 2026-10-18 11:12
+
+from django.db import migrations, models
+
+
+def mark_duplicate_transaction_ids(apps, schema_editor):
+    """keeps the id of the first payment and suffixes the ids of its duplicates"""
+    Payment = apps.get_model("payment", "Payment")
+
+    duplicate_ids = (
+        Payment.objects.exclude(transaction_id="")
+        .order_by()
+        .values("transaction_id")
+        .annotate(count=models.Count("id"))
+        .filter(count__gt=1)
+        .values_list("transaction_id", flat=True)
+    )
+    duplicates = Payment.objects.filter(transaction_id__in=list(duplicate_ids))
+    first_ids = set()
+    for payment in duplicates.order_by("transaction_id", "id"):
+        if payment.transaction_id not in first_ids:
+            first_ids.add(payment.transaction_id)
+            continue
+        suffix = "-duplicate-{}".format(payment.id)
+        payment.transaction_id = payment.transaction_id[: 100 - len(suffix)] + suffix
+        payment.save(update_fields=["transaction_id"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0003_alter_financefile_type"),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_duplicate_transaction_ids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="payment",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("transaction_id", ""), _negated=True),
+                fields=("transaction_id",),
+                name="payment_unique_transaction_id",
+            ),
+        ),
+    ]
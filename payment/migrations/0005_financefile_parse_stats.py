@@ -0,0 +1,36 @@
+# Generated by Django 4.2.8 on 2026-10-18 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0004_payment_unique_transaction_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="financefile",
+            name="entry_count",
+            field=models.IntegerField(
+                default=0, help_text="Number of valid transactions in the file."
+            ),
+        ),
+        migrations.AddField(
+            model_name="financefile",
+            name="parse_duration",
+            field=models.DurationField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="financefile",
+            name="payment_count",
+            field=models.IntegerField(
+                default=0, help_text="Number of transactions which were new and saved."
+            ),
+        ),
+        migrations.AddField(
+            model_name="financefile",
+            name="processed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
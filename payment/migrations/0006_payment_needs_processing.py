@@ -0,0 +1,37 @@
+# Generated by Django 4.2.8 on 2026-10-18 11:17
+
+from django.db import migrations, models
+
+FINISHED_STATES = ["processed", "archive"]
+
+
+def clear_finished_payments(apps, schema_editor):
+    """payments which are processed or archived are left alone until they change"""
+    Payment = apps.get_model("payment", "Payment")
+    Payment.objects.filter(state__in=FINISHED_STATES).update(needs_processing=False)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0005_financefile_parse_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="needs_processing",
+            field=models.BooleanField(
+                default=True,
+                help_text="Set when the payment changes, cleared when the payment processor has run.",
+            ),
+        ),
+        migrations.RunPython(clear_finished_payments, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                condition=models.Q(("needs_processing", True)),
+                fields=["needs_processing"],
+                name="payment_needs_processing",
+            ),
+        ),
+    ]
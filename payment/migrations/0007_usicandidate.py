@@ -0,0 +1,62 @@
+# Generated by Django 4.2.8 on 2026-10-18 11:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from utils import CodeGenerator
+
+
+def populate_usi_candidates(apps, schema_editor):
+    Subscribe = apps.get_model("courses", "Subscribe")
+    UsiCandidate = apps.get_model("payment", "UsiCandidate")
+
+    candidates = []
+    for subscription_id, usi in Subscribe.objects.filter(state="confirmed").values_list(
+        "id", "usi"
+    ):
+        usi = CodeGenerator.normalize_ambiguous_characters(usi)
+        keys = {usi} | {usi[:i] + usi[i + 1 :] for i in range(len(usi))}
+        candidates += [
+            UsiCandidate(key=key, subscription_id=subscription_id) for key in keys
+        ]
+    UsiCandidate.objects.bulk_create(candidates, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("courses", "0019_subscribe_usi_upper_index"),
+        ("payment", "0006_payment_needs_processing"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UsiCandidate",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(db_index=True, max_length=6)),
+                (
+                    "subscription",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="usi_candidates",
+                        to="courses.subscribe",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="usicandidate",
+            constraint=models.UniqueConstraint(
+                fields=("key", "subscription"), name="usi_candidate_unique_key"
+            ),
+        ),
+        migrations.RunPython(populate_usi_candidates, migrations.RunPython.noop),
+    ]
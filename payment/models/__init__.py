@@ -3,3 +3,4 @@ from .payment import Payment
 from .subscription_payment import SubscriptionPayment
 from .course_payment import CoursePayment
 from .payment_reminder import PaymentReminder
+from .usi_candidate import UsiCandidate, MAX_USI_DISTANCE
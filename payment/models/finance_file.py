@@ -1,4 +1,12 @@
-from django.db.models import BooleanField, CharField, FileField, DateTimeField, Model
+from django.db.models import (
+    BooleanField,
+    CharField,
+    FileField,
+    DateTimeField,
+    DurationField,
+    IntegerField,
+    Model,
+)
 
 from payment.models.choices import FinanceFileType
 from tq_website.storages import FinanceStorage
@@ -14,6 +22,12 @@ class FinanceFile(Model):
     )
     processed = BooleanField(default=False)
     created_at = DateTimeField(auto_now_add=True)
+    processed_at = DateTimeField(blank=True, null=True)
+    parse_duration = DurationField(blank=True, null=True)
+    entry_count = IntegerField(default=0)
+    entry_count.help_text = "Number of valid transactions in the file."
+    payment_count = IntegerField(default=0)
+    payment_count.help_text = "Number of transactions which were new and saved."
 
     def save(
         self, force_insert=False, force_update=False, using=None, update_fields=None
@@ -6,6 +6,19 @@ from . import FinanceFile
 from courses.models import Subscribe
 
 
+class PaymentQuerySet(models.QuerySet):
+    def of_subscriptions(self, subscription_ids) -> "PaymentQuerySet":
+        return self.filter(
+            subscription_payments__subscription_id__in=subscription_ids
+        ).distinct()
+
+    def mark_for_processing(self) -> int:
+        """the payment processor looks at these payments again on its next run"""
+        return self.model.objects.filter(pk__in=self.values("pk")).update(
+            needs_processing=True
+        )
+
+
 class Payment(models.Model):
     """
     A Payment is a any registered payment on the account, regardless of its purpose.
@@ -50,6 +63,12 @@ class Payment(models.Model):
         on_delete=models.SET_NULL,
     )
     comment = models.TextField(blank=True, null=True)
+    needs_processing = models.BooleanField(default=True)
+    needs_processing.help_text = (
+        "Set when the payment changes, cleared when the payment processor has run."
+    )
+
+    objects = PaymentQuerySet.as_manager()
 
     def __str__(self):
         return "Payment ({}) of {} by {}".format(
@@ -77,3 +96,18 @@ class Payment(models.Model):
 
     class Meta:
         ordering = ["-date"]
+        indexes = [
+            models.Index(
+                fields=["needs_processing"],
+                condition=models.Q(needs_processing=True),
+                name="payment_needs_processing",
+            )
+        ]
+        constraints = [
+            # parsers skip transactions which already exist, manual payments have no id
+            models.UniqueConstraint(
+                fields=["transaction_id"],
+                condition=~models.Q(transaction_id=""),
+                name="payment_unique_transaction_id",
+            )
+        ]
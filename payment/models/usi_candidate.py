@@ -0,0 +1,116 @@
+from collections import defaultdict
+from typing import Iterable
+
+from django.db import models, transaction
+
+from courses.models import Subscribe, SubscribeState
+from utils import CodeGenerator
+
+# USIs typed with at most this many substituted, swapped or missing characters are found
+MAX_USI_DISTANCE = 1
+
+
+def normalize_usi(usi: str) -> str:
+    return CodeGenerator.normalize_ambiguous_characters(usi)
+
+
+def usi_keys(usi: str) -> set[str]:
+    """the normalized USI and all variants with one character deleted"""
+    usi = normalize_usi(usi)
+    return {usi} | {usi[:i] + usi[i + 1 :] for i in range(len(usi))}
+
+
+def usi_distance(a: str, b: str) -> int:
+    """edit distance of the normalized USIs, counting a swap of neighbours as one edit"""
+    a, b = normalize_usi(a), normalize_usi(b)
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (a[i - 1] != b[j - 1]),
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+    return current[-1]
+
+
+class UsiCandidateManager(models.Manager):
+    def index(self, subscriptions: Iterable[Subscribe]) -> None:
+        """adds the open subscriptions to the index and removes all others"""
+        subscriptions = list(subscriptions)
+        self.filter(
+            subscription_id__in=[
+                s.id for s in subscriptions if s.state != SubscribeState.CONFIRMED
+            ]
+        ).delete()
+        self.bulk_create(
+            [
+                self.model(key=key, subscription_id=s.id)
+                for s in subscriptions
+                if s.state == SubscribeState.CONFIRMED
+                for key in usi_keys(s.usi)
+            ],
+            ignore_conflicts=True,
+        )
+
+    @transaction.atomic
+    def rebuild(self) -> int:
+        """rebuilds the whole index, returns the number of indexed subscriptions"""
+        self.all().delete()
+        subscriptions = list(
+            Subscribe.objects.filter(state=SubscribeState.CONFIRMED).only(
+                "id", "usi", "state"
+            )
+        )
+        self.index(subscriptions)
+        return len(subscriptions)
+
+    def candidates(self, usis: Iterable[str]) -> dict[str, dict[int, int]]:
+        """
+        looks up the open subscriptions with a USI similar to each of the given USIs.
+        Returns the ids of the subscriptions and their distances by the given USI.
+        """
+        keys_by_usi = {usi: usi_keys(usi) for usi in usis}
+        rows = self.filter(key__in=set().union(*keys_by_usi.values())).values_list(
+            "key", "subscription_id", "subscription__usi"
+        )
+
+        usis_by_key = defaultdict(set)
+        for usi, keys in keys_by_usi.items():
+            for key in keys:
+                usis_by_key[key].add(usi)
+
+        candidates = defaultdict(dict)
+        for key, subscription_id, subscription_usi in rows:
+            for usi in usis_by_key[key]:
+                distance = usi_distance(usi, subscription_usi)
+                if distance <= MAX_USI_DISTANCE:
+                    candidates[usi][subscription_id] = distance
+        return candidates
+
+
+class UsiCandidate(models.Model):
+    """
+    Deletion neighbourhood index of the USIs of confirmed, unpaid subscriptions:
+    two USIs within edit distance one share at least one key.
+    """
+
+    key = models.CharField(max_length=6, db_index=True)
+    subscription = models.ForeignKey(
+        Subscribe, related_name="usi_candidates", on_delete=models.CASCADE
+    )
+
+    objects = UsiCandidateManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["key", "subscription"], name="usi_candidate_unique_key"
+            )
+        ]
+
+    def __str__(self) -> str:
+        return "{} ({})".format(self.key, self.subscription_id)
@@ -1,17 +1,37 @@
 import logging
 import re
-from datetime import datetime
+import time
+from collections import Counter
+from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Iterable
+from typing import IO, Iterable, Iterator, Optional
 from xml.etree import ElementTree as ET
 
-from django.db import DatabaseError
+from django.utils import timezone
 
 from payment.models import FinanceFile, Payment
 from payment.models.choices import CreditDebit, State, FinanceFileType
 
 log = logging.getLogger("payment")
 
+NS = {"pf": "urn:iso:std:iso:20022:tech:xsd:camt.053.001.04"}
+NTRY_TAG = "{{{}}}Ntry".format(NS["pf"])
+
+# number of transactions which are deduplicated and saved at once
+PARSE_CHUNK_SIZE = 1000
+
+RE_ONLY_ZERO = re.compile(r"^0*$")
+RE_POSTFINANCE = re.compile(
+    r"GIRO AUS KONTO (?P<account_nr>[\-0-9]*)\s((?P<name>.*)\s(?P<street>[\S+]*\s[0-9]*)\s(?P<plz>[0-9]{4})\s(?P<city>[\S+]*))\sMITTEILUNGEN:(?P<note>.*)"
+)
+RE_ABSENDER = re.compile(
+    r"ABSENDER:\s((?P<name>.*)\s(?P<plz>[0-9]{4})\s(?P<city>[\S+]*))"
+)
+RE_AUFTRAGGEBER = re.compile(
+    r"AUFTRAGGEBER:\s((?P<name>.*)\s(?P<street>[\S+]*\s[0-9]*)\s(?P<plz>[0-9]{4})\s(?P<city>[\S+]*))"
+)
+RE_MITTEILUNGEN = re.compile(r"MITTEILUNGEN:(?P<note>.*)")
+
 
 class ISO2022Parser:
     @staticmethod
@@ -20,12 +40,31 @@ class ISO2022Parser:
     ) -> int:
         count = 0
         for file in ISO2022Parser.find_fds_files(include_processed=reparse):
-            payments = ISO2022Parser.parse_file(file)
+            count += ISO2022Parser.parse_file_and_save_payments(file, dry_run)
+        return count
+
+    @staticmethod
+    def parse_file_and_save_payments(
+        db_file: FinanceFile, dry_run: bool = False
+    ) -> int:
+        """
+        saves the new payments of the file chunk by chunk and returns their number.
+        The parse duration and the numbers of entries and payments are stored on the file.
+        """
+        started = time.monotonic()
+        stats = Counter()
+        count = 0
+        for payments in ISO2022Parser.iter_new_payments(db_file, stats=stats):
             count += len(payments)
             if not dry_run:
                 ISO2022Parser.save_payments(payments)
-                file.processed = True
-                file.save()
+        if not dry_run:
+            db_file.processed = True
+            db_file.processed_at = timezone.now()
+            db_file.parse_duration = timedelta(seconds=time.monotonic() - started)
+            db_file.entry_count = stats["entries"]
+            db_file.payment_count = stats["payments"]
+            db_file.save()
         return count
 
     @staticmethod
@@ -47,10 +86,7 @@ class ISO2022Parser:
             "note": string,
         }
 
-        postfinance_regex = re.compile(
-            r"GIRO AUS KONTO (?P<account_nr>[\-0-9]*)\s((?P<name>.*)\s(?P<street>[\S+]*\s[0-9]*)\s(?P<plz>[0-9]{4})\s(?P<city>[\S+]*))\sMITTEILUNGEN:(?P<note>.*)"
-        )
-        postfinance_matches = postfinance_regex.search(string)
+        postfinance_matches = RE_POSTFINANCE.search(string)
         if postfinance_matches:
             data["account_nr"] = postfinance_matches.group("account_nr")
             data["name"] = postfinance_matches.group("name")
@@ -59,25 +95,20 @@ class ISO2022Parser:
             data["city"] = postfinance_matches.group("city")
             data["note"] = postfinance_matches.group("note")
 
-        absender_matches = re.compile(
-            r"ABSENDER:\s((?P<name>.*)\s(?P<plz>[0-9]{4})\s(?P<city>[\S+]*))"
-        ).search(string)
+        absender_matches = RE_ABSENDER.search(string)
         if absender_matches:
             data["name"] = absender_matches.group("name")
             data["plz"] = absender_matches.group("plz")
             data["city"] = absender_matches.group("city")
 
-        auftraggeber_regex = re.compile(
-            r"AUFTRAGGEBER:\s((?P<name>.*)\s(?P<street>[\S+]*\s[0-9]*)\s(?P<plz>[0-9]{4})\s(?P<city>[\S+]*))"
-        )
-        auftraggeber_matches = auftraggeber_regex.search(string)
+        auftraggeber_matches = RE_AUFTRAGGEBER.search(string)
         if auftraggeber_matches:
             data["name"] = auftraggeber_matches.group("name")
             data["street"] = auftraggeber_matches.group("street")
             data["plz"] = auftraggeber_matches.group("plz")
             data["city"] = auftraggeber_matches.group("city")
 
-        mitteilungen_matches = re.compile(r"MITTEILUNGEN:(?P<note>.*)").search(string)
+        mitteilungen_matches = RE_MITTEILUNGEN.search(string)
         if mitteilungen_matches:
             data["note"] = mitteilungen_matches.group("note")
 
@@ -85,92 +116,161 @@ class ISO2022Parser:
 
     @staticmethod
     def parse_file(db_file: FinanceFile) -> list[Payment]:
-        filename = db_file.name
-        log.info("parse file {}".format(filename))
+        return [
+            payment
+            for payments in ISO2022Parser.iter_new_payments(db_file)
+            for payment in payments
+        ]
+
+    @staticmethod
+    def iter_new_payments(
+        db_file: FinanceFile, chunk_size: int = PARSE_CHUNK_SIZE, stats: Counter = None
+    ) -> Iterator[list[Payment]]:
+        log.info("parse file {}".format(db_file.name))
         if db_file.processed:
             log.info("file has already been processed previously")
 
-        tree = ET.parse(db_file.file)
-        root = tree.getroot()
-        payments = []
+        with db_file.file.open("rb") as source:
+            yield from ISO2022Parser.parse_stream(source, db_file, chunk_size, stats)
 
-        ns = {"pf": "urn:iso:std:iso:20022:tech:xsd:camt.053.001.04"}
+    @staticmethod
+    def parse_stream(
+        source: IO[bytes],
+        db_file: FinanceFile,
+        chunk_size: int = PARSE_CHUNK_SIZE,
+        stats: Counter = None,
+    ) -> Iterator[list[Payment]]:
+        """
+        yields the payments of the statement which are not in the database yet, in chunks.
+        The numbers of parsed entries and new payments are added to stats.
+        """
+        stats = Counter() if stats is None else stats
+        seen_ids = set()
+        chunk = []
+        for payment in ISO2022Parser._iter_payments(source, db_file):
+            chunk.append(payment)
+            if len(chunk) == chunk_size:
+                yield ISO2022Parser._new_payments(chunk, seen_ids, db_file.name, stats)
+                chunk = []
+        if chunk:
+            yield ISO2022Parser._new_payments(chunk, seen_ids, db_file.name, stats)
 
-        def find_or_empty(transaction, name):
-            e = transaction.find(".//pf:{}".format(name), ns)
-            return e.text if e is not None else ""
+    @staticmethod
+    def _new_payments(
+        payments: list[Payment], seen_ids: set[str], filename: str, stats: Counter
+    ) -> list[Payment]:
+        existing_ids = set(
+            Payment.objects.filter(
+                transaction_id__in=[payment.transaction_id for payment in payments]
+            ).values_list("transaction_id", flat=True)
+        )
 
-        for transaction in root.findall(".//pf:Ntry", ns):
-            # check if transaction id is valid transaction exists already -> skip
-            transaction_id = find_or_empty(transaction, "AcctSvcrRef")
-            only_zero_regex = re.compile(r"^0*$")
-            if only_zero_regex.match(transaction_id):
+        new_payments = []
+        for payment in payments:
+            if payment.transaction_id in existing_ids:
                 log.warning(
-                    "A transaction of file {} has an invalid transaction ID: {}".format(
-                        filename, transaction_id
+                    "transaction {} in file {} already exists in database".format(
+                        payment.transaction_id, filename
                     )
                 )
                 continue
-            log.info("processing transaction {}".format(transaction_id))
-            payments_count = Payment.objects.filter(
-                transaction_id=transaction_id
-            ).count()
-            if payments_count > 0:
+            if payment.transaction_id in seen_ids:
                 log.warning(
-                    "transaction {} in file {} already exists in database".format(
-                        transaction_id, filename
+                    "transaction {} occurs more than once in file {}".format(
+                        payment.transaction_id, filename
                     )
                 )
                 continue
+            seen_ids.add(payment.transaction_id)
+            new_payments.append(payment)
+            log.info("Detected payment: {}".format(payment))
 
-            payment = Payment()
-
-            # for IBAN transactions
-            payment.bic = find_or_empty(transaction, "BICFI")
-            payment.iban = find_or_empty(transaction, "DbtrAcct")
-
-            # unique reference number by postfinance
-            payment.transaction_id = transaction_id
-            payment.amount = Decimal(find_or_empty(transaction, "Amt") or 0)
-            payment.currency_code = transaction.find(".//pf:Amt", ns).get("Ccy")
-
-            # Credit or Debit
-            credit_debit = find_or_empty(transaction, "CdtDbtInd")
-            if credit_debit == "CRDT":
-                payment.credit_debit = CreditDebit.CREDIT
-            elif credit_debit == "DBIT":
-                payment.credit_debit = CreditDebit.DEBIT
-            else:
-                payment.credit_debit = CreditDebit.UNKNOWN
-
-            # remittance user string
-            payment.remittance_user_string = find_or_empty(transaction, "AddtlNtryInf")
-
-            user_data = ISO2022Parser.parse_user_string(payment.remittance_user_string)
-            if user_data is not None:
-                payment.name = user_data["name"]
-                payment.address = "{}, {} {}".format(
-                    user_data["street"], user_data["plz"], user_data["city"]
+        stats.update(entries=len(payments), payments=len(new_payments))
+        return new_payments
+
+    @staticmethod
+    def _iter_payments(source: IO[bytes], db_file: FinanceFile) -> Iterator[Payment]:
+        # processed entries are removed from the tree, so memory does not grow with the file
+        parents = []
+        for event, element in ET.iterparse(source, events=("start", "end")):
+            if event == "start":
+                parents.append(element)
+                continue
+
+            parents.pop()
+            if element.tag != NTRY_TAG:
+                continue
+
+            payment = ISO2022Parser._parse_transaction(element, db_file)
+            element.clear()
+            if parents:
+                parents[-1].remove(element)
+            if payment is not None:
+                yield payment
+
+    @staticmethod
+    def _parse_transaction(
+        transaction: ET.Element, db_file: FinanceFile
+    ) -> Optional[Payment]:
+        def find_or_empty(name):
+            e = transaction.find(".//pf:{}".format(name), NS)
+            return e.text if e is not None else ""
+
+        # check if transaction id is valid
+        transaction_id = find_or_empty("AcctSvcrRef")
+        if RE_ONLY_ZERO.match(transaction_id):
+            log.warning(
+                "A transaction of file {} has an invalid transaction ID: {}".format(
+                    db_file.name, transaction_id
                 )
-                payment.remittance_user_string = user_data["note"]
-
-            payment.state = State.NEW
-            # postal_address = debitor.find(".//pf:PstlAdr",ns)
-            # if postal_address:
-            #    addresses = debitor.findall(".//pf:AdrLine", ns)
-            #    payment.address = ", ".join([adr.text for adr in addresses])
-            payment.date = datetime.today()  # not exactly elegant
-            payment.filename = filename
-            payment.file = db_file
-            payments.append(payment)
-            log.info("Detected payment: {}".format(payment))
+            )
+            return None
+        log.info("processing transaction {}".format(transaction_id))
+
+        payment = Payment()
+
+        # for IBAN transactions
+        payment.bic = find_or_empty("BICFI")
+        payment.iban = find_or_empty("DbtrAcct")
+
+        # unique reference number by postfinance
+        payment.transaction_id = transaction_id
+        payment.amount = Decimal(find_or_empty("Amt") or 0)
+        payment.currency_code = transaction.find(".//pf:Amt", NS).get("Ccy")
+
+        # Credit or Debit
+        credit_debit = find_or_empty("CdtDbtInd")
+        if credit_debit == "CRDT":
+            payment.credit_debit = CreditDebit.CREDIT
+        elif credit_debit == "DBIT":
+            payment.credit_debit = CreditDebit.DEBIT
+        else:
+            payment.credit_debit = CreditDebit.UNKNOWN
 
-        return payments
+        # remittance user string
+        payment.remittance_user_string = find_or_empty("AddtlNtryInf")
+
+        user_data = ISO2022Parser.parse_user_string(payment.remittance_user_string)
+        if user_data is not None:
+            payment.name = user_data["name"]
+            payment.address = "{}, {} {}".format(
+                user_data["street"], user_data["plz"], user_data["city"]
+            )
+            payment.remittance_user_string = user_data["note"]
+
+        payment.state = State.NEW
+        # postal_address = debitor.find(".//pf:PstlAdr",ns)
+        # if postal_address:
+        #    addresses = debitor.findall(".//pf:AdrLine", ns)
+        #    payment.address = ", ".join([adr.text for adr in addresses])
+        payment.date = datetime.today()  # not exactly elegant
+        payment.filename = db_file.name
+        payment.file = db_file
+        return payment
 
     @staticmethod
     def save_payments(payments: Iterable[Payment]) -> None:
-        for payment in payments:
-            try:
-                payment.save()
-            except DatabaseError as e:
-                log.error(str(e))
+        # transactions saved concurrently by another run are skipped by the unique constraint
+        Payment.objects.bulk_create(
+            payments, batch_size=PARSE_CHUNK_SIZE, ignore_conflicts=True
+        )
@@ -1,12 +1,17 @@
 import logging
 import re
+from collections import defaultdict
+from decimal import Decimal
 from typing import Optional
 
-from django.db.models import QuerySet
+from django.db import transaction
+from django.db.models import QuerySet, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce, Upper
 
 from courses.models import Subscribe, PaymentMethod, SubscribeState
-from payment.models import Payment, SubscriptionPayment
+from payment.models import Payment, SubscriptionPayment, UsiCandidate
 from payment.models.choices import State, CreditDebit, Type
+from payment.services import invalidate_offering_revenue_report
 
 log = logging.getLogger("payment")
 
@@ -14,6 +19,9 @@ USI_PREFIX = "USI-"
 # also accept USL since I is often typed as L
 RE_USI_STRICT = re.compile(r"[USILusil]{3}[\- _]*(?P<usi>[a-zA-Z0-9]{6})")
 
+# number of payments whose USIs are resolved and written at once
+MATCHING_BATCH_SIZE = 500
+
 
 class PaymentProcessor:
     @staticmethod
@@ -24,71 +32,113 @@ class PaymentProcessor:
         - Matches payments
         - Mark subscriptions as paid
         - Finalizes payments
+
+        Without a queryset, only the payments which changed since the last run are processed.
         """
-        queryset = queryset or Payment.objects
-        PaymentProcessor._detect_irrelevant_payments(queryset)
-        PaymentProcessor.match_payments(queryset)
-        PaymentProcessor.mark_subscriptions_as_paid(queryset)
-        PaymentProcessor.finalize_payments(queryset)
+        if queryset is None:
+            queryset = Payment.objects.filter(needs_processing=True)
+        payment_ids = list(queryset.order_by().values_list("pk", flat=True))
+        log.info("process {} payments".format(len(payment_ids)))
+
+        # the flag is cleared first, so payments changing during the run are processed again
+        queryset = Payment.objects.filter(pk__in=payment_ids)
+        queryset.update(needs_processing=False)
+        try:
+            PaymentProcessor._detect_irrelevant_payments(queryset)
+            PaymentProcessor.match_payments(queryset)
+            PaymentProcessor.mark_subscriptions_as_paid(queryset)
+            PaymentProcessor.finalize_payments(queryset)
+        except Exception:
+            queryset.update(needs_processing=True)
+            raise
 
     @staticmethod
     def _detect_irrelevant_payments(queryset=Payment.objects) -> None:
         """Sets all new DEBIT transactions as irrelevant payments"""
-        new_payments = queryset.filter(
-            state=State.NEW, credit_debit=CreditDebit.DEBIT
-        ).all()
+        new_payments = queryset.filter(state=State.NEW, credit_debit=CreditDebit.DEBIT)
 
-        for payment in new_payments:
-            payment.type = Type.IRRELEVANT
-            payment.save()
+        new_payments.update(type=Type.IRRELEVANT)
 
     @staticmethod
     def match_payments(queryset=Payment.objects) -> None:
         """Tries to match payments to Subscriptions and creates a SubscriptionPayment for each"""
-        new_payments = queryset.filter(
-            state=State.NEW, credit_debit=CreditDebit.CREDIT
-        ).all()
+        payment_ids = list(
+            queryset.filter(
+                state=State.NEW, credit_debit=CreditDebit.CREDIT
+            ).values_list("pk", flat=True)
+        )
 
-        for payment in new_payments:
-            subscription_ids = (
-                PaymentProcessor.try_to_get_unique_subscription_identifiers(payment)
+        for i in range(0, len(payment_ids), MATCHING_BATCH_SIZE):
+            payments = Payment.objects.filter(
+                pk__in=payment_ids[i : i + MATCHING_BATCH_SIZE]
+            ).annotate(
+                matched_amount=Coalesce(
+                    Sum("subscription_payments__amount"),
+                    Value(0),
+                    output_field=DecimalField(),
+                )
             )
+            PaymentProcessor._match_payment_batch(list(payments))
+
+    @staticmethod
+    @transaction.atomic
+    def _match_payment_batch(payments: list[Payment]) -> None:
+        """
+        Matches the payments with one query for all their USIs and bulk writes the results.
+        The payments must be annotated with the sum of their existing subscription payments.
+        """
+        usis_by_payment = {
+            payment.pk: PaymentProcessor.try_to_get_unique_subscription_identifiers(
+                payment
+            )
+            for payment in payments
+        }
+        usis = {usi for usis in usis_by_payment.values() if usis for usi in usis}
+        subscriptions_by_usi = PaymentProcessor._subscriptions_by_usi(usis)
+        candidates_by_usi = PaymentProcessor._candidates_by_usi(
+            {usi for usi in usis if usi.upper() not in subscriptions_by_usi}
+        )
+
+        subscription_payments = []
+        for payment in payments:
+            subscription_ids = usis_by_payment[payment.pk]
             if not subscription_ids:
                 payment.state = State.MANUAL
-                payment.save()
                 continue
 
             # We found subscription ids, so it must be a subscription payment
             payment.type = Type.SUBSCRIPTION_PAYMENT
-            payment.save()
 
             remaining_amount = payment.amount
 
             # Try to create a subscription payment for each subscription_id
             for subscription_id in subscription_ids:
-                subscription_query = Subscribe.objects.filter(
-                    usi__iexact=subscription_id
-                )
+                subscriptions = subscriptions_by_usi.get(subscription_id.upper(), [])
 
-                num_subscriptions = subscription_query.count()
-                if num_subscriptions > 1:
+                if len(subscriptions) > 1:
                     # should never happen since USI is unique
                     log.error(
                         f"Implementation Error: Payment {payment} is not related to a unique Subscription"
                     )
                     continue
 
-                if num_subscriptions == 0:
+                if not subscriptions:
                     # USI was probably misspelled by user
                     log.warning(
                         "USI {0} was not found for payment {1}.".format(
                             subscription_id, payment
                         )
                     )
-                    continue
+                    subscriptions = PaymentProcessor._confident_candidates(
+                        payment,
+                        subscription_id,
+                        remaining_amount,
+                        candidates_by_usi.get(subscription_id, []),
+                    )
+                    if not subscriptions:
+                        continue
 
-                # Now we know there is exactly one subscription
-                matched_subscription: Subscribe = subscription_query.get()
+                matched_subscription: Subscribe = subscriptions[0]
 
                 # Only confirmed subscriptions should be paid
                 if matched_subscription.state != SubscribeState.CONFIRMED:
@@ -97,26 +147,125 @@ class PaymentProcessor:
                         f"Got: {matched_subscription.state}"
                     )
                     payment.state = State.MANUAL
-                    payment.save()
                     continue
 
-                to_pay = matched_subscription.price_after_reductions()
+                to_pay = matched_subscription.financial_price_after_reductions
 
                 # Amount credited to subscription can be at most as much as the remaining amount.
-                # Whether the paid amount is sufficient is checked during PaymentProcessor._check_balance(payment)
+                # Whether the paid amount is sufficient is checked by PaymentProcessor._update_balance
                 amount = min(to_pay, remaining_amount)
                 remaining_amount -= amount
-                SubscriptionPayment.objects.create(
-                    payment=payment, subscription=matched_subscription, amount=amount
+                payment.matched_amount += amount
+                subscription_payments.append(
+                    SubscriptionPayment(
+                        payment=payment,
+                        subscription=matched_subscription,
+                        amount=amount,
+                    )
                 )
                 log.info(
                     "Matched payment {0} to subscription {1}".format(
-                        payment, subscription_query
+                        payment, matched_subscription
                     )
                 )
 
-            # Check balance -> this sets state of subscription payment (MATCHED, REIMBURSE, MANUAL)
-            PaymentProcessor._check_balance(payment)
+            # sets the state of the payment (MATCHED, REIMBURSE, MANUAL)
+            PaymentProcessor._update_balance(payment, payment.matched_amount)
+
+        SubscriptionPayment.objects.bulk_create(subscription_payments)
+        Payment.objects.bulk_update(
+            payments, ["state", "type", "amount_to_reimburse", "comment"]
+        )
+
+        # bulk_create does not send the signals which invalidate the revenue reports
+        for offering_id in {
+            sp.subscription.course.offering_id for sp in subscription_payments
+        }:
+            invalidate_offering_revenue_report(offering_id)
+
+    @staticmethod
+    def _subscriptions_by_usi(usis: set[str]) -> dict[str, list[Subscribe]]:
+        """resolves the USIs case insensitively with a single query"""
+        subscriptions_by_usi = defaultdict(list)
+        subscriptions = (
+            Subscribe.objects.annotate(usi_upper=Upper("usi"))
+            .filter(usi_upper__in={usi.upper() for usi in usis})
+            .select_related("user", "course__offering")
+            .with_financials()
+        )
+        for subscription in subscriptions:
+            subscriptions_by_usi[subscription.usi_upper].append(subscription)
+        return subscriptions_by_usi
+
+    @staticmethod
+    def _candidates_by_usi(usis: set[str]) -> dict[str, list[tuple[Subscribe, int]]]:
+        """the open subscriptions with a similar USI and their distance, closest first"""
+        if not usis:
+            return {}
+        candidate_ids = UsiCandidate.objects.candidates(usis)
+        subscriptions = (
+            Subscribe.objects.filter(
+                id__in={
+                    subscription_id
+                    for ids in candidate_ids.values()
+                    for subscription_id in ids
+                }
+            )
+            .select_related("user", "course__offering")
+            .with_financials()
+            .in_bulk()
+        )
+        return {
+            usi: sorted(
+                (
+                    (subscriptions[subscription_id], distance)
+                    for subscription_id, distance in ids.items()
+                    if subscription_id in subscriptions
+                ),
+                key=lambda candidate: candidate[1],
+            )
+            for usi, ids in candidate_ids.items()
+        }
+
+    @staticmethod
+    def _confident_candidates(
+        payment: Payment,
+        usi: str,
+        amount: Decimal,
+        candidates: list[tuple[Subscribe, int]],
+    ) -> list[Subscribe]:
+        """
+        Returns the subscription a misspelled USI refers to if it is the only closest candidate,
+        its open amount is paid and the payer has the name of the subscriber (unless the USIs only
+        differ by similar looking characters). Otherwise, the candidates are noted on the payment.
+        """
+        if not candidates:
+            return []
+
+        subscription, distance = candidates[0]
+        if (
+            (len(candidates) == 1 or candidates[1][1] > distance)
+            and subscription.financial_open_amount == amount
+            and (distance == 0 or PaymentProcessor._is_payer(payment, subscription))
+        ):
+            log.info(
+                "USI {0} of payment {1} was read as {2}".format(
+                    usi, payment, subscription.usi
+                )
+            )
+            return [subscription]
+
+        note = "USI {} might be {}".format(
+            usi, ", ".join(subscription.usi for subscription, _ in candidates)
+        )
+        log.warning("{} for payment {}".format(note, payment))
+        payment.comment = "\n".join(filter(None, [payment.comment, note]))
+        return []
+
+    @staticmethod
+    def _is_payer(payment: Payment, subscription: Subscribe) -> bool:
+        last_name = subscription.user.last_name.strip().upper()
+        return bool(last_name) and last_name in (payment.name or "").upper()
 
     @staticmethod
     def try_to_get_unique_subscription_identifiers(
@@ -153,19 +302,24 @@ class PaymentProcessor:
 
     @staticmethod
     def mark_subscriptions_as_paid(queryset=Payment.objects) -> None:
-        for payment in queryset.all():
-            for s in payment.subscriptions.all():
-                if s.open_amount().is_zero():
-                    s.mark_as_paid(PaymentMethod.ONLINE)
+        # only confirmed subscriptions can be marked as paid
+        subscriptions = (
+            Subscribe.objects.filter(
+                subscription_payments__payment__in=queryset.all(),
+                state=SubscribeState.CONFIRMED,
+            )
+            .distinct()
+            .with_financials()
+            .filter(financial_open_amount=0)
+            .select_related("user", "course")
+        )
+        for s in subscriptions:
+            s.mark_as_paid(PaymentMethod.ONLINE)
 
     @staticmethod
     def finalize_payments(queryset=Payment.objects) -> None:
         """Mark matched payments as PROCESSED and sets ONLINE as payment method"""
-        matched_payments = queryset.filter(state=State.MATCHED).all()
-
-        for payment in matched_payments:
-            payment.state = State.PROCESSED
-            payment.save()
+        queryset.filter(state=State.MATCHED).update(state=State.PROCESSED)
 
     @staticmethod
     def check_balance(payments: QuerySet) -> None:
@@ -191,21 +345,23 @@ class PaymentProcessor:
             payment.state in [State.NEW, State.MANUAL]
             and payment.type == Type.SUBSCRIPTION_PAYMENT
         ):
-            remaining_amount = (
-                payment.amount - payment.subscription_payments_amount_sum()
+            PaymentProcessor._update_balance(
+                payment, payment.subscription_payments_amount_sum()
             )
+            payment.save()
+            return payment.state == State.MATCHED
+        return False
 
-            if remaining_amount.is_zero():
-                payment.state = State.MATCHED
-                payment.amount_to_reimburse = 0
-                payment.save()
-                return True
-            elif remaining_amount > 0:
-                payment.amount_to_reimburse = remaining_amount
-                payment.state = State.MANUAL
-                payment.save()
-                return False
-            else:
-                payment.state = State.MANUAL
-                payment.save()
-                return False
+    @staticmethod
+    def _update_balance(payment: Payment, matched_amount: Decimal) -> None:
+        """sets the state of the payment according to the amount matched to subscriptions"""
+        remaining_amount = payment.amount - matched_amount
+
+        if remaining_amount.is_zero():
+            payment.state = State.MATCHED
+            payment.amount_to_reimburse = 0
+        elif remaining_amount > 0:
+            payment.amount_to_reimburse = remaining_amount
+            payment.state = State.MANUAL
+        else:
+            payment.state = State.MANUAL
@@ -1,2 +1,9 @@
 from .offering_finance_teachers import offering_finance_teachers
 from .payment_reminders import remind_of_payment, remind_of_payments
+from .offering_revenue_report import (
+    offering_revenue_report,
+    compute_offering_revenue_report,
+    invalidate_offering_revenue_report,
+    export_offering_revenue_report,
+)
+from .finance_file_ingestion import ingest_iso_20022_files, ingest_finance_file
@@ -0,0 +1,66 @@
+import logging
+from functools import partial
+
+from django.db import transaction
+
+from payment.models import FinanceFile, Payment
+from payment.models.choices import FinanceFileType, State
+from payment.parser import ISO2022Parser
+
+log = logging.getLogger("payment")
+
+
+def ingest_iso_20022_files() -> list[int]:
+    """hands every unprocessed ISO 20022 file to its own celery task"""
+    file_ids = list(
+        ISO2022Parser.find_fds_files().values_list("id", flat=True).order_by("id")
+    )
+    for file_id in file_ids:
+        transaction.on_commit(partial(_enqueue_file_ingestion, file_id))
+    return file_ids
+
+
+def _enqueue_file_ingestion(file_id: int) -> None:
+    from tq_website.tasks import payment_ingest_finance_file
+
+    payment_ingest_finance_file.delay(file_id)
+
+
+def ingest_finance_file(file_id: int) -> list[int]:
+    """
+    parses the file unless another worker holds it or has already processed it.
+    Returns the ids of the payments of the file which still have to be processed.
+    """
+    with transaction.atomic():
+        db_file = (
+            FinanceFile.objects.select_for_update(skip_locked=True)
+            .filter(pk=file_id, type=FinanceFileType.POSTFINANCE_XML, processed=False)
+            .first()
+        )
+        if db_file is None:
+            log.info("finance file {} is locked or already processed".format(file_id))
+            return []
+
+        ISO2022Parser.parse_file_and_save_payments(db_file)
+        payment_ids = list(
+            Payment.objects.filter(file=db_file, state=State.NEW).values_list(
+                "id", flat=True
+            )
+        )
+        log.info(
+            "ingested finance file {} in {}: {} entries, {} new payments".format(
+                db_file,
+                db_file.parse_duration,
+                db_file.entry_count,
+                db_file.payment_count,
+            )
+        )
+        if payment_ids:
+            transaction.on_commit(partial(_enqueue_payment_processing, payment_ids))
+    return payment_ids
+
+
+def _enqueue_payment_processing(payment_ids: list[int]) -> None:
+    from tq_website.tasks import payment_process_payments
+
+    payment_process_payments.delay(payment_ids)
@@ -0,0 +1,147 @@
+from django.core.cache import cache
+from django.http.response import HttpResponseBase
+from django.utils.translation import gettext_lazy as _
+
+from courses.models import Offering, Subscribe, CourseSubscriptionType
+from courses.services import get_cache_version, bump_cache_version
+from utils import export
+
+REVENUE_REPORT_VERSION_KEY = "payment:offering_revenue:version"
+REVENUE_REPORT_TIMEOUT = 24 * 60 * 60
+
+REVENUE_REPORT_HEADER = [
+    "Course",
+    "Profit Margin",
+    "Wages",
+    "Fully booked legi Profit",
+    "Profit",
+    "Actual Profit",
+    "Total Revenue after Reductions",
+    "Actually paid",
+    "Percent not paid",
+]
+
+
+def _offering_version_key(offering_id: int) -> str:
+    return "{}:{}".format(REVENUE_REPORT_VERSION_KEY, offering_id)
+
+
+def invalidate_offering_revenue_report(offering_id: int = None) -> None:
+    """invalidates the report of the given offering, or of all offerings if None"""
+    if offering_id is None:
+        bump_cache_version(REVENUE_REPORT_VERSION_KEY)
+    else:
+        bump_cache_version(_offering_version_key(offering_id))
+
+
+def offering_revenue_report(offering: Offering) -> list[list]:
+    """the rows of the revenue report of the offering, computed only if not cached yet"""
+    key = "payment:offering_revenue:{}:{}:{}".format(
+        offering.id,
+        get_cache_version(REVENUE_REPORT_VERSION_KEY),
+        get_cache_version(_offering_version_key(offering.id)),
+    )
+    rows = cache.get(key)
+    if rows is None:
+        rows = compute_offering_revenue_report(offering)
+        cache.set(key, rows, REVENUE_REPORT_TIMEOUT)
+    return rows
+
+
+def export_offering_revenue_report(
+    offering_id: int, export_format: str = "csv"
+) -> HttpResponseBase:
+    offering = Offering.objects.get(pk=offering_id)
+    return export(
+        export_format,
+        title=_("Revenue overview"),
+        data=offering_revenue_report(offering),
+    )
+
+
+def compute_offering_revenue_report(offering: Offering) -> list[list]:
+    """
+    Computes the report with a constant number of queries: the payment totals of all courses
+    are aggregated by the database and the hours are computed from prefetched lessons.
+    """
+    rows = [REVENUE_REPORT_HEADER]
+    rows_total = [0] * len(REVENUE_REPORT_HEADER)
+    rows_total[0] = "TOTAL"
+
+    totals_by_course = (
+        Subscribe.objects.filter(course__offering=offering)
+        .accepted()
+        .financial_totals_by_course()
+    )
+    courses = (
+        offering.course_set.exclude(subscription_type=CourseSubscriptionType.EXTERNAL)
+        .select_related("period", "offering__period")
+        .prefetch_related(
+            "regular_lessons__exceptions",
+            "irregular_lessons",
+            "period__cancellations",
+            "offering__period__cancellations",
+            "teaching",
+        )
+    )
+
+    for course in courses:
+        hours = course.get_total_hours() if not course.cancelled else 0
+
+        wages = sum(teaching.hourly_wage * hours for teaching in course.teaching.all())
+
+        totals = totals_by_course.get(course.id, {})
+        paid = totals.get("paid", 0)
+        to_pay_after_reductions = totals.get("to_pay_after_reductions", 0)
+
+        max_revenue = (course.price_with_legi or 0) * (course.max_subscribers or 0)
+
+        profit = to_pay_after_reductions - wages
+        actual_profit = paid - wages
+
+        # Calculate profit margin
+        if to_pay_after_reductions != 0:
+            profit_margin = (profit / to_pay_after_reductions) * 100
+            percent_not_paid = (1 - (paid / to_pay_after_reductions)) * 100
+        else:
+            profit_margin = 0
+            percent_not_paid = 0
+
+        row = [
+            course.name,
+            profit_margin,
+            wages,
+            max_revenue - wages,
+            profit,
+            actual_profit,
+            to_pay_after_reductions,
+            paid,
+            percent_not_paid,
+        ]
+
+        rows_total[1:] = [
+            total + value for total, value in zip(rows_total[1:], row[1:])
+        ]
+
+        row = (
+            [row[0]]
+            + [f"{row[1]:.0f} %"]
+            + [f"{value:.0f}" for value in row[2:-1]]
+            + [f"{row[-1]:.0f} %"]
+        )
+
+        rows.append(row)
+
+    total_profit = (100 * rows_total[4] / rows_total[6]) if rows_total[6] > 0 else 0
+    total_percent_not_paid = (
+        (100 * (1 - (rows_total[7] / rows_total[6]))) if rows_total[6] > 0 else 0
+    )
+
+    rows_total = (
+        [rows_total[0]]
+        + [f"{total_profit:.0f} %"]
+        + [f"{value:.0f}" for value in rows_total[2:-1]]
+        + [f"{total_percent_not_paid:.0f} %"]
+    )
+    rows.append(rows_total)
+    return rows
@@ -0,0 +1,137 @@
+from typing import Optional
+
+from django.db.models.signals import post_save, post_delete
+
+from courses.models import (
+    Course,
+    Subscribe,
+    PriceReduction,
+    Teach,
+    RegularLesson,
+    IrregularLesson,
+    RegularLessonException,
+    Period,
+    PeriodCancellation,
+    SubscribeState,
+)
+from payment import services
+from payment.models import Payment, SubscriptionPayment, UsiCandidate
+
+
+# the relation from each model to the course it belongs to
+COURSE_PATHS = {
+    Subscribe: "course",
+    Teach: "course",
+    RegularLesson: "course",
+    IrregularLesson: "course",
+    RegularLessonException: "regular_lesson__course",
+    SubscriptionPayment: "subscription__course",
+    PriceReduction: "subscription__course",
+}
+
+
+def _offering_id(instance) -> Optional[int]:
+    """
+    The offering whose revenue report includes the instance. Relations which are already
+    cached on the instance are followed, the rest of the path is read with a single query.
+    """
+    if isinstance(instance, Course):
+        return instance.offering_id
+    related = instance
+    names = COURSE_PATHS[type(instance)].split("__")
+    while names:
+        field = related._meta.get_field(names.pop(0))
+        if not field.is_cached(related):
+            return (
+                field.related_model.objects.filter(pk=getattr(related, field.attname))
+                .values_list("__".join(names + ["offering_id"]), flat=True)
+                .first()
+            )
+        related = getattr(related, field.name)
+        if related is None:
+            return None
+    return related.offering_id
+
+
+# Models which change the figures of a single offering
+OFFERING_REVENUE_MODELS = [
+    Course,
+    Subscribe,
+    SubscriptionPayment,
+    PriceReduction,
+    Teach,
+    RegularLesson,
+    IrregularLesson,
+    RegularLessonException,
+]
+
+# Models which may change the figures of any offering
+REVENUE_MODELS = [Period, PeriodCancellation]
+
+
+def invalidate_offering_revenue_report(instance, raw=False, **kwargs) -> None:
+    if raw:
+        return
+    offering_id = _offering_id(instance)
+    if offering_id is not None:
+        services.invalidate_offering_revenue_report(offering_id)
+
+
+def invalidate_revenue_reports(raw=False, **kwargs) -> None:
+    if not raw:
+        services.invalidate_offering_revenue_report()
+
+
+def connect_revenue_report_invalidation() -> None:
+    for model in OFFERING_REVENUE_MODELS:
+        post_save.connect(invalidate_offering_revenue_report, sender=model)
+        post_delete.connect(invalidate_offering_revenue_report, sender=model)
+    for model in REVENUE_MODELS:
+        post_save.connect(invalidate_revenue_reports, sender=model)
+        post_delete.connect(invalidate_revenue_reports, sender=model)
+
+
+def mark_payment_for_processing(instance, raw=False, **kwargs) -> None:
+    """a changed subscription payment may settle the subscription, see PaymentProcessor"""
+    if not raw:
+        Payment.objects.filter(pk=instance.payment_id).mark_for_processing()
+
+
+def mark_reduced_payments_for_processing(instance, raw=False, **kwargs) -> None:
+    """a price reduction may settle a subscription which was paid too little"""
+    if not raw:
+        Payment.objects.of_subscriptions(
+            [instance.subscription_id]
+        ).mark_for_processing()
+
+
+def mark_subscription_payments_for_processing(
+    instance, raw=False, update_fields=None, **kwargs
+) -> None:
+    """
+    Only confirmed subscriptions are marked as paid, so the payments of a subscription which
+    is confirmed or whose price changes after it was paid are processed again. Subscriptions
+    with payments cannot be deleted.
+    """
+    if raw or instance.state != SubscribeState.CONFIRMED:
+        return
+    if update_fields is None or {"state", "price_to_pay"} & set(update_fields):
+        Payment.objects.of_subscriptions([instance.pk]).mark_for_processing()
+
+
+def connect_payment_processing() -> None:
+    post_save.connect(mark_payment_for_processing, sender=SubscriptionPayment)
+    post_delete.connect(mark_payment_for_processing, sender=SubscriptionPayment)
+    post_save.connect(mark_reduced_payments_for_processing, sender=PriceReduction)
+    post_delete.connect(mark_reduced_payments_for_processing, sender=PriceReduction)
+    post_save.connect(mark_subscription_payments_for_processing, sender=Subscribe)
+
+
+def index_usi_candidates(instance, raw=False, **kwargs) -> None:
+    """keeps the fuzzy USI index in sync when subscriptions are confirmed or paid"""
+    if not raw:
+        UsiCandidate.objects.index([instance])
+
+
+def connect_usi_index() -> None:
+    post_save.connect(index_usi_candidates, sender=Subscribe)
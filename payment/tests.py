@@ -0,0 +1,327 @@
+from datetime import date
+from io import BytesIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import InMemoryStorage
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from django.utils import timezone
+
+from courses.models import *
+from payment import services
+from payment.management.commands.benchmark_offering_revenue import (
+    Command as BenchmarkOfferingRevenue,
+)
+from payment.models import FinanceFile, Payment, SubscriptionPayment
+
+
+class RevenueReportTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.offering = BenchmarkOfferingRevenue._generate_offering(3, 4)
+
+    def _report_queries(self) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            services.compute_offering_revenue_report(self.offering)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_courses(self):
+        queries = self._report_queries()
+        course = self.offering.course_set.first()
+        for i in range(10):
+            course.copy()
+        self.assertEqual(self.offering.course_set.count(), 13)
+        self.assertEqual(self._report_queries(), queries)
+
+    def test_cached_report_follows_payments(self):
+        report = services.offering_revenue_report(self.offering)
+        with self.assertNumQueries(0):
+            services.offering_revenue_report(self.offering)
+
+        subscription = Subscribe.objects.filter(course__offering=self.offering).first()
+        PriceReduction.objects.create(subscription=subscription, amount=10)
+        updated = services.offering_revenue_report(self.offering)
+        self.assertNotEqual(updated, report)
+        self.assertEqual(
+            updated, services.compute_offering_revenue_report(self.offering)
+        )
+
+    def test_offering_of_changes_follows_cached_relations(self):
+        from payment.signals import _offering_id
+
+        subscription = Subscribe.objects.select_related("course").filter(
+            course__offering=self.offering
+        )[0]
+        with self.assertNumQueries(0):
+            self.assertEqual(_offering_id(subscription), self.offering.id)
+            self.assertEqual(
+                _offering_id(PriceReduction(subscription=subscription)),
+                self.offering.id,
+            )
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                _offering_id(PriceReduction(subscription_id=subscription.id)),
+                self.offering.id,
+            )
+
+
+class PaymentMatchingTest(TestCase):
+    def setUp(self):
+        period = Period.objects.create(
+            date_from=date(2023, 9, 18), date_to=date(2023, 12, 22)
+        )
+        offering = Offering.objects.create(name="HS 2023", period=period)
+        self.course = Course.objects.create(
+            name="Salsa 1 (Mo)",
+            offering=offering,
+            type=CourseType.objects.create(title="Salsa 1"),
+            max_subscribers=10,
+        )
+
+    def _subscribe(self, username, lead_follow) -> Subscribe:
+        user = User.objects.create_user(username=username, email=f"{username}@tq.ch")
+        UserProfile.objects.create(user=user)
+        return Subscribe.objects.create(
+            user=user, course=self.course, lead_follow=lead_follow
+        )
+
+    def test_payment_matching_corrects_misspelled_usis(self):
+        from payment.models import UsiCandidate
+        from payment.models.choices import CreditDebit, State
+        from payment.payment_processor import PaymentProcessor
+
+        subscriptions = []
+        for name in ["muster", "meier"]:
+            subscription = self._subscribe(name, LeadFollow.LEAD)
+            User.objects.filter(id=subscription.user_id).update(last_name=name)
+            subscription.usi = "ABCD" + name[1].upper() + "7"
+            subscription.price_to_pay = 50
+            subscription.state = SubscribeState.CONFIRMED
+            subscription.save()
+            subscriptions.append(subscription)
+        muster, meier = subscriptions
+        self.assertEqual(UsiCandidate.objects.count(), 14)
+
+        def pay(transaction_id, remittance, name="", amount=50):
+            return Payment.objects.create(
+                date=timezone.now(),
+                amount=amount,
+                currency_code="CHF",
+                transaction_id=transaction_id,
+                credit_debit=CreditDebit.CREDIT,
+                remittance_user_string=remittance,
+                name=name,
+            )
+
+        swapped = pay("1", "USI-ABCD7U", "Max Muster")
+        wrong_amount = pay("2", "USI-ABCD7U", "Max Muster", amount=40)
+        ambiguous = pay("3", "USI-ABCDX7", "Max Muster")
+        PaymentProcessor.process_payments()
+
+        for payment in [swapped, wrong_amount, ambiguous]:
+            payment.refresh_from_db()
+        self.assertEqual(swapped.state, State.PROCESSED)
+        self.assertEqual(list(swapped.subscriptions.all()), [muster])
+        self.assertEqual(wrong_amount.state, State.MANUAL)
+        self.assertEqual(wrong_amount.comment, "USI ABCD7U might be ABCDU7")
+        self.assertEqual(ambiguous.state, State.MANUAL)
+        self.assertIn("ABCDE7", ambiguous.comment)
+
+        # paid subscriptions leave the index
+        self.assertEqual(
+            set(UsiCandidate.objects.values_list("subscription_id", flat=True)),
+            {meier.id},
+        )
+
+    def test_payment_matching_resolves_usis_in_bulk(self):
+        from payment.models.choices import CreditDebit, State, Type
+        from payment.payment_processor import PaymentProcessor
+
+        first = self._subscribe("first", LeadFollow.LEAD)
+        second = self._subscribe("second", LeadFollow.FOLLOW)
+        unconfirmed = self._subscribe("unconfirmed", LeadFollow.FOLLOW)
+        Subscribe.objects.update(price_to_pay=50)
+        Subscribe.objects.exclude(id=unconfirmed.id).update(
+            state=SubscribeState.CONFIRMED
+        )
+
+        def pay(transaction_id, amount, remittance, credit_debit=CreditDebit.CREDIT):
+            return Payment.objects.create(
+                date=timezone.now(),
+                amount=amount,
+                currency_code="CHF",
+                transaction_id=transaction_id,
+                credit_debit=credit_debit,
+                remittance_user_string=remittance,
+            )
+
+        both = pay("1", 100, f"usi-{first.usi.lower()} USI {second.usi}")
+        too_much = pay("2", 80, f"USL{first.usi}")
+        not_confirmed = pay("3", 50, f"USI-{unconfirmed.usi}")
+        unknown = pay("4", 50, "no identifier")
+        debit = pay("5", 50, "", CreditDebit.DEBIT)
+
+        with CaptureQueriesContext(connection) as queries:
+            PaymentProcessor.match_payments()
+        self.assertLess(len(queries), 8)
+
+        PaymentProcessor.process_payments()
+        for payment in [both, too_much, not_confirmed, unknown, debit]:
+            payment.refresh_from_db()
+        self.assertEqual(both.state, State.PROCESSED)
+        self.assertEqual(both.subscription_payments_amount_sum(), 100)
+        self.assertEqual(too_much.state, State.MANUAL)
+        self.assertEqual(too_much.amount_to_reimburse, 30)
+        self.assertEqual(not_confirmed.state, State.MANUAL)
+        self.assertFalse(not_confirmed.subscription_payments.exists())
+        self.assertEqual(unknown.state, State.MANUAL)
+        self.assertEqual(debit.type, Type.IRRELEVANT)
+        self.assertEqual(
+            set(Subscribe.objects.paid().values_list("id", flat=True)),
+            {first.id, second.id},
+        )
+
+        # later runs only look at payments which changed since
+        self.assertFalse(Payment.objects.filter(needs_processing=True).exists())
+        with self.assertNumQueries(1):
+            PaymentProcessor.process_payments()
+        SubscriptionPayment.objects.create(
+            payment=unknown, subscription=unconfirmed, amount=50
+        )
+        self.assertEqual(list(Payment.objects.filter(needs_processing=True)), [unknown])
+
+    def test_price_reductions_settle_underpaid_subscriptions(self):
+        from payment.models.choices import CreditDebit, State
+        from payment.payment_processor import PaymentProcessor
+
+        subscription = self._subscribe("reduced", LeadFollow.LEAD)
+        subscription.price_to_pay = 50
+        subscription.state = SubscribeState.CONFIRMED
+        subscription.save()
+        payment = Payment.objects.create(
+            date=timezone.now(),
+            amount=40,
+            currency_code="CHF",
+            transaction_id="1",
+            credit_debit=CreditDebit.CREDIT,
+            remittance_user_string=f"USI-{subscription.usi}",
+        )
+        PaymentProcessor.process_payments()
+        payment.refresh_from_db()
+        self.assertEqual(payment.state, State.PROCESSED)
+        self.assertFalse(Subscribe.objects.paid().exists())
+
+        # saving a payment does not queue it again, only changes of its subscriptions do
+        payment.comment = "checked"
+        payment.save(update_fields=["comment"])
+        self.assertFalse(Payment.objects.filter(needs_processing=True).exists())
+
+        reduction = PriceReduction.objects.create(subscription=subscription, amount=10)
+        self.assertEqual(list(Payment.objects.filter(needs_processing=True)), [payment])
+        PaymentProcessor.process_payments()
+        self.assertEqual(list(Subscribe.objects.paid()), [subscription])
+
+        reduction.delete()
+        self.assertEqual(list(Payment.objects.filter(needs_processing=True)), [payment])
+
+
+class ISO2022ParserTest(TestCase):
+    ENTRY = """
+        <Ntry>
+            <Amt Ccy="CHF">{amount}</Amt>
+            <CdtDbtInd>CRDT</CdtDbtInd>
+            <NtryDtls><TxDtls><Refs><AcctSvcrRef>{transaction_id}</AcctSvcrRef></Refs></TxDtls></NtryDtls>
+            <AddtlNtryInf>GIRO AUS KONTO 80-2-2 MAX MUSTER MUSTERSTRASSE 1 8000 ZUERICH MITTEILUNGEN:USI-ABCDEF</AddtlNtryInf>
+        </Ntry>"""
+
+    def _statement(self, *transaction_ids) -> BytesIO:
+        entries = "".join(
+            self.ENTRY.format(amount=10 + i, transaction_id=transaction_id)
+            for i, transaction_id in enumerate(transaction_ids)
+        )
+        return BytesIO(
+            '<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.053.001.04">'
+            "<BkToCstmrStmt><Stmt>{}</Stmt></BkToCstmrStmt></Document>".format(
+                entries
+            ).encode()
+        )
+
+    def test_streaming_parser_skips_known_transactions(self):
+        from payment.models.choices import FinanceFileType
+        from payment.parser import ISO2022Parser
+
+        db_file = FinanceFile.objects.create(
+            name="statement.xml", type=FinanceFileType.POSTFINANCE_XML
+        )
+        Payment.objects.create(
+            date=timezone.now(), amount=1, currency_code="CHF", transaction_id="known"
+        )
+
+        statement = self._statement("a", "known", "000", "b", "a", "c")
+        chunks = list(ISO2022Parser.parse_stream(statement, db_file, chunk_size=2))
+        self.assertEqual(
+            [[payment.transaction_id for payment in chunk] for chunk in chunks],
+            [["a"], ["b"], ["c"]],
+        )
+        payment = chunks[0][0]
+        self.assertEqual(payment.amount, 10)
+        self.assertEqual(payment.name, "MAX MUSTER")
+        self.assertEqual(payment.remittance_user_string, "USI-ABCDEF")
+
+        # payments saved concurrently are skipped by the unique transaction id
+        ISO2022Parser.save_payments(chunks[1])
+        ISO2022Parser.save_payments([p for chunk in chunks for p in chunk])
+        self.assertEqual(Payment.objects.filter(file=db_file).count(), 3)
+
+
+class FinanceFileIngestionTest(TestCase):
+    ENTRY = ISO2022ParserTest.ENTRY
+    _statement = ISO2022ParserTest._statement
+
+    def test_ingestion_skips_processed_files(self):
+        from payment.models.choices import FinanceFileType
+
+        new = FinanceFile.objects.create(
+            name="new.xml", type=FinanceFileType.POSTFINANCE_XML
+        )
+        done = FinanceFile.objects.create(
+            name="done.xml", type=FinanceFileType.POSTFINANCE_XML, processed=True
+        )
+        self.assertEqual(services.ingest_iso_20022_files(), [new.id])
+        self.assertEqual(services.ingest_finance_file(done.id), [])
+
+    def test_ingestion_stores_statistics_and_queues_new_payments(self):
+        from payment.models.choices import FinanceFileType
+
+        Payment.objects.create(
+            date=timezone.now(), amount=1, currency_code="CHF", transaction_id="known"
+        )
+        with patch.object(
+            FinanceFile._meta.get_field("file"), "storage", InMemoryStorage()
+        ):
+            db_file = FinanceFile(
+                name="statement.xml", type=FinanceFileType.POSTFINANCE_XML
+            )
+            statement = self._statement("a", "known", "b", "a")
+            db_file.file.save("statement.xml", ContentFile(statement.read()))
+
+            with self.captureOnCommitCallbacks() as callbacks:
+                payment_ids = services.ingest_finance_file(db_file.id)
+
+        new_payments = Payment.objects.filter(file=db_file)
+        self.assertEqual(
+            sorted(new_payments.values_list("transaction_id", flat=True)), ["a", "b"]
+        )
+        self.assertEqual(sorted(payment_ids), sorted(p.id for p in new_payments))
+        self.assertEqual([c.args for c in callbacks], [(payment_ids,)])
+
+        db_file.refresh_from_db()
+        self.assertTrue(db_file.processed)
+        self.assertIsNotNone(db_file.processed_at)
+        self.assertIsNotNone(db_file.parse_duration)
+        self.assertEqual((db_file.entry_count, db_file.payment_count), (4, 2))
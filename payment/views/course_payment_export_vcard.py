@@ -5,4 +5,9 @@ class CoursePaymentExportVCard(TeacherOfCourseOnly):
     def get(self, request, *args, **kwargs):
         from courses import services
 
-        return services.export_subscriptions([kwargs.get("course", None)], "vcard")
+        return services.start_export(
+            request,
+            "subscriptions",
+            course_ids=[kwargs.get("course", None)],
+            export_format="vcard",
+        )
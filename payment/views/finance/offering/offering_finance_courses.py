@@ -13,4 +13,5 @@ class OfferingFinanceCourses(PermissionRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         context["active"] = "courses"
         context["offering"] = get_object_or_404(Offering, id=kwargs["offering"])
+        context["courses"] = context["offering"].courses_with_payment_totals()
         return context
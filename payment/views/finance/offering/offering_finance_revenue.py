@@ -4,88 +4,9 @@ from django.http import HttpResponse, HttpRequest
 from django.shortcuts import get_object_or_404, render
 from django.utils.translation import gettext_lazy as _
 
-from courses.models import Offering, CourseSubscriptionType
-from utils import export
-
-
-def get_data(offering: Offering):
-    header = [
-        "Course",
-        "Profit Margin",
-        "Wages",
-        "Fully booked legi Profit",
-        "Profit",
-        "Actual Profit",
-        "Total Revenue after Reductions",
-        "Actually paid",
-        "Percent not paid",
-    ]
-    rows = [header]
-    rows_total = [0] * len(header)
-    rows_total[0] = "TOTAL"
-
-    for course in offering.course_set.exclude(
-        subscription_type=CourseSubscriptionType.EXTERNAL
-    ).all():
-        hours = course.get_total_hours() if not course.cancelled else 0
-
-        wages = sum(teaching.hourly_wage * hours for teaching in course.teaching.all())
-
-        totals = course.payment_totals()
-        paid = totals["paid"]
-        to_pay_after_reductions = totals["to_pay_after_reductions"]
-
-        max_revenue = (course.price_with_legi or 0) * (course.max_subscribers or 0)
-
-        profit = to_pay_after_reductions - wages
-        actual_profit = paid - wages
-
-        # Calculate profit margin
-        if to_pay_after_reductions != 0:
-            profit_margin = (profit / to_pay_after_reductions) * 100
-            percent_not_paid = (1 - (paid / to_pay_after_reductions)) * 100
-        else:
-            profit_margin = 0
-            percent_not_paid = 0
-
-        row = [
-            course.name,
-            profit_margin,
-            wages,
-            max_revenue - wages,
-            profit,
-            actual_profit,
-            to_pay_after_reductions,
-            paid,
-            percent_not_paid,
-        ]
-
-        rows_total[1:] = [
-            total + value for total, value in zip(rows_total[1:], row[1:])
-        ]
-
-        row = (
-            [row[0]]
-            + [f"{row[1]:.0f} %"]
-            + [f"{value:.0f}" for value in row[2:-1]]
-            + [f"{row[-1]:.0f} %"]
-        )
-
-        rows.append(row)
-
-    total_profit = (100 * rows_total[4] / rows_total[6]) if rows_total[6] > 0 else 0
-    total_percent_not_paid = (
-        (100 * (1 - (rows_total[7] / rows_total[6]))) if rows_total[6] > 0 else 0
-    )
-
-    rows_total = (
-        [rows_total[0]]
-        + [f"{total_profit:.0f} %"]
-        + [f"{value:.0f}" for value in rows_total[2:-1]]
-        + [f"{total_percent_not_paid:.0f} %"]
-    )
-    rows.append(rows_total)
-    return rows
+from courses.models import Offering
+from courses.services import start_export
+from payment.services import offering_revenue_report
 
 
 @staff_member_required
@@ -94,8 +15,11 @@ def offering_finance_revenue(request: HttpRequest, offering_id: int) -> HttpResp
 
     export_format = request.GET.get("format", None)
     if export_format in ["excel", "csv"]:
-        return export(
-            export_format, title=_("Revenue overview"), data=get_data(offering)
+        return start_export(
+            request,
+            "offering_revenue",
+            offering_id=offering.id,
+            export_format=export_format,
         )
 
     return render(
@@ -105,7 +29,7 @@ def offering_finance_revenue(request: HttpRequest, offering_id: int) -> HttpResp
             title=_("Revenue overview"),
             active="revenue",
             url_key="payment:offering_revenue",
-            data=get_data(offering),
+            data=offering_revenue_report(offering),
             offering=offering,
         ),
     )
@@ -1,26 +1,16 @@
 from django.contrib.admin.views.decorators import staff_member_required
 from django.http import HttpRequest, HttpResponse
 
-from courses.models import Offering
-from utils import export
+from courses.services import start_export
 
 
 @staff_member_required
 def offering_finance_teachers_export(
     request: HttpRequest, offering: int
 ) -> HttpResponse:
-    export_format = request.GET.get("format", "csv")
-    from payment import services
-
-    export_name, personal_data, courses = services.offering_finance_teachers(
-        Offering.objects.filter(id=offering).all()
-    )
-    return export(
-        export_format,
-        title=export_name,
-        multiple=True,
-        data=[
-            dict(data=courses, name="Courses"),
-            dict(data=personal_data, name="Personal Data"),
-        ],
+    return start_export(
+        request,
+        "teacher_payment_information",
+        export_format=request.GET.get("format", "csv"),
+        offering_ids=[offering],
     )
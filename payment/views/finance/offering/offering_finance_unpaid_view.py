@@ -26,6 +26,7 @@ class OfferingFinanceUnpaidView(
             )
             .select_related("user", "user__profile", "course", "course__offering")
             .prefetch_related("payment_reminders")
+            .with_financials()
             .order_by("user__first_name")
             .all()
         )
@@ -38,7 +39,7 @@ class OfferingFinanceUnpaidView(
             {subscription.course_id for subscription in subscriptions}
         )
         context["open_total"] = sum(
-            [subscription.open_amount() for subscription in subscriptions]
+            subscription.financial_open_amount for subscription in subscriptions
         )
         return context
 
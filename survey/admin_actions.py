@@ -3,12 +3,15 @@ from django.http import HttpResponse
 
 from django.utils import timezone
 
+from courses.services import start_export
 from . import services
 
 
 @admin.action(description="Export Excel")
 def export_surveys_xlsx(modeladmin, request, queryset) -> HttpResponse:
-    return services.export_surveys(queryset.all())
+    return start_export(
+        request, "surveys", survey_ids=list(queryset.values_list("id", flat=True))
+    )
 
 
 @admin.action(description="Let selected survey instances expire now")
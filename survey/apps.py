@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class SurveyConfig(AppConfig):
+    name = "survey"
+
+    def ready(self):
+        from survey.models.public_review import connect_public_review_index
+
+        connect_public_review_index()
@@ -0,0 +1,97 @@
+from collections import defaultdict
+from typing import Iterable
+
+from django.apps import apps
+from django.db import models
+from django.db.models import Q, QuerySet
+
+from survey.models.types import QuestionType
+
+PUBLIC_ANSWER = Q(
+    question__type=QuestionType.FREE_FORM,
+    question__public_review=True,
+    hide_from_public_reviews=False,
+    survey_instance__course__isnull=False,
+)
+
+
+class PublicReviewManager(models.Manager):
+    def index_answers(self, answers: QuerySet) -> None:
+        """adds the public ones of the given answers to the index and removes the others"""
+        answers = list(
+            answers.annotate(
+                is_public=models.ExpressionWrapper(
+                    PUBLIC_ANSWER, output_field=models.BooleanField()
+                )
+            ).select_related("survey_instance__course")
+        )
+        self.filter(answer__in=[a for a in answers if not a.is_public]).delete()
+
+        reviews = [
+            self.model(
+                answer=answer,
+                course=answer.survey_instance.course,
+                course_type_id=answer.survey_instance.course.type_id,
+                text=answer.value,
+                date=answer.survey_instance.last_update,
+            )
+            for answer in answers
+            if answer.is_public
+        ]
+        self.bulk_create(
+            reviews,
+            update_conflicts=True,
+            unique_fields=["answer"],
+            update_fields=["course", "course_type", "text", "date"],
+        )
+        self.update_teachers({review.course_id for review in reviews})
+
+    def update_teachers(self, course_ids: Iterable[int]) -> None:
+        """copies the current teachers of the given courses to their reviews"""
+        Teach = apps.get_model("courses", "Teach")
+        ReviewTeacher = self.model.teachers.through
+
+        teachers = defaultdict(set)
+        for course_id, teacher_id in Teach.objects.filter(
+            course_id__in=course_ids
+        ).values_list("course_id", "teacher_id"):
+            teachers[course_id].add(teacher_id)
+
+        reviews = self.filter(course_id__in=course_ids).values_list("pk", "course_id")
+        ReviewTeacher.objects.filter(publicreview__course_id__in=course_ids).delete()
+        ReviewTeacher.objects.bulk_create(
+            ReviewTeacher(publicreview_id=review_id, user_id=teacher_id)
+            for review_id, course_id in reviews
+            for teacher_id in teachers[course_id]
+        )
+
+    def rebuild(self) -> int:
+        Answer = apps.get_model("survey", "Answer")
+        self.all().delete()
+        self.index_answers(Answer.objects.filter(PUBLIC_ANSWER))
+        return self.count()
+
+    def newest(self, reviews: QuerySet, page: int = 1) -> tuple[list, bool]:
+        """the given page of the reviews, newest first, and whether older reviews follow"""
+        offset = (max(page, 1) - 1) * self.model.PAGE_SIZE
+        newest = list(
+            reviews.select_related("course__room", "course__type")
+            .prefetch_related("course__type__translations", "course__teaching__teacher")
+            .order_by("-date", "-pk")[offset : offset + self.model.PAGE_SIZE + 1]
+        )
+        return newest[: self.model.PAGE_SIZE], len(newest) > self.model.PAGE_SIZE
+
+    def latest_for_course_type(
+        self, course_type_id: int, page: int = 1
+    ) -> tuple[list, bool]:
+        return self.newest(self.filter(course_type_id=course_type_id), page)
+
+    def latest_for_teachers(
+        self, teacher_ids: Iterable[int], exclude_course_type_id: int, page: int = 1
+    ) -> tuple[list, bool]:
+        reviews = (
+            self.filter(teachers__in=teacher_ids)
+            .exclude(course_type_id=exclude_course_type_id)
+            .distinct()
+        )
+        return self.newest(reviews, page)
@@ -0,0 +1,100 @@
+# Generated by Django 4.2.8 on 2026-10-18 10:37
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+FREE_FORM = "f"
+
+
+def populate_public_reviews(apps, schema_editor):
+    Answer = apps.get_model("survey", "Answer")
+    PublicReview = apps.get_model("survey", "PublicReview")
+    Teach = apps.get_model("courses", "Teach")
+
+    answers = Answer.objects.filter(
+        question__type=FREE_FORM,
+        question__public_review=True,
+        hide_from_public_reviews=False,
+        survey_instance__course__isnull=False,
+    ).select_related("survey_instance__course")
+    reviews = PublicReview.objects.bulk_create(
+        PublicReview(
+            answer=answer,
+            course=answer.survey_instance.course,
+            course_type_id=answer.survey_instance.course.type_id,
+            text=answer.value,
+            date=answer.survey_instance.last_update,
+        )
+        for answer in answers
+    )
+
+    teachers = {}
+    for teach in Teach.objects.all():
+        teachers.setdefault(teach.course_id, set()).add(teach.teacher_id)
+    PublicReview.teachers.through.objects.bulk_create(
+        PublicReview.teachers.through(publicreview_id=review.pk, user_id=teacher_id)
+        for review in reviews
+        for teacher_id in teachers.get(review.course_id, [])
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("courses", "0017_course_lesson_schedule"),
+        ("survey", "0003_answer_hide_from_public_reviews_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PublicReview",
+            fields=[
+                (
+                    "answer",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="public_review",
+                        serialize=False,
+                        to="survey.answer",
+                    ),
+                ),
+                ("text", models.TextField(blank=True, null=True)),
+                ("date", models.DateTimeField(blank=True, null=True)),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="public_reviews",
+                        to="courses.course",
+                    ),
+                ),
+                (
+                    "course_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="public_reviews",
+                        to="courses.coursetype",
+                    ),
+                ),
+                (
+                    "teachers",
+                    models.ManyToManyField(
+                        blank=True,
+                        related_name="public_reviews",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["course_type", "-date"],
+                        name="survey_publ_course__7fb43f_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_public_reviews, migrations.RunPython.noop),
+    ]
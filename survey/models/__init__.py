@@ -5,3 +5,4 @@ from .scale import Scale
 from .survey import Survey
 from .question_group import QuestionGroup
 from .survey_instance import SurveyInstance
+from .public_review import PublicReview
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from django.contrib.auth.models import User
+from django.db.models import (
+    Model,
+    OneToOneField,
+    ForeignKey,
+    ManyToManyField,
+    TextField,
+    DateTimeField,
+    Index,
+    CASCADE,
+)
+from django.db.models.signals import post_save, post_delete
+
+from survey.managers import PublicReviewManager
+from . import Answer, Question, SurveyInstance
+
+
+class PublicReview(Model):
+    """Index of the public free form answers, by course type and by teacher"""
+
+    answer = OneToOneField(
+        Answer, primary_key=True, related_name="public_review", on_delete=CASCADE
+    )
+    course = ForeignKey(
+        "courses.Course", related_name="public_reviews", on_delete=CASCADE
+    )
+    course_type = ForeignKey(
+        "courses.CourseType", related_name="public_reviews", on_delete=CASCADE
+    )
+    teachers = ManyToManyField(User, related_name="public_reviews", blank=True)
+    text = TextField(blank=True, null=True)
+    date = DateTimeField(blank=True, null=True)
+
+    # the reviews of a course type and of its teachers are shown in pages of this size,
+    # the course page shows the first one and links to the older ones
+    PAGE_SIZE = 20
+
+    objects = PublicReviewManager()
+
+    class Meta:
+        indexes = [Index(fields=["course_type", "-date"])]
+
+    def __str__(self) -> str:
+        return self.text or "<not answered>"
+
+
+def index_answer(instance: Answer, raw=False, **kwargs) -> None:
+    if not raw:
+        PublicReview.objects.index_answers(Answer.objects.filter(pk=instance.pk))
+
+
+def index_survey_instance_answers(
+    instance: SurveyInstance, raw=False, **kwargs
+) -> None:
+    # answers are bulk created before the survey instance is saved as completed
+    if not raw:
+        PublicReview.objects.index_answers(instance.answers.all())
+
+
+def index_question_answers(instance: Question, raw=False, **kwargs) -> None:
+    if not raw:
+        PublicReview.objects.index_answers(instance.answers.all())
+
+
+def update_review_course_type(instance, raw=False, **kwargs) -> None:
+    if not raw:
+        PublicReview.objects.filter(course=instance).exclude(
+            course_type_id=instance.type_id
+        ).update(course_type_id=instance.type_id)
+
+
+def update_review_teachers(instance, raw=False, **kwargs) -> None:
+    if not raw:
+        PublicReview.objects.update_teachers([instance.course_id])
+
+
+def connect_public_review_index() -> None:
+    post_save.connect(index_answer, sender=Answer)
+    post_save.connect(index_survey_instance_answers, sender=SurveyInstance)
+    post_save.connect(index_question_answers, sender=Question)
+    post_save.connect(update_review_course_type, sender="courses.Course")
+    post_save.connect(update_review_teachers, sender="courses.Teach")
+    post_delete.connect(update_review_teachers, sender="courses.Teach")
@@ -1,7 +1,7 @@
 from typing import Iterable, Optional
 
 from django.contrib.auth.models import User
-from django.http import HttpResponse
+from django.http.response import HttpResponseBase
 
 from courses.models import Course, Offering
 from utils import export
@@ -13,7 +13,7 @@ def export_surveys(
     offering: Optional[Offering] = None,
     course: Optional[Course] = None,
     export_format: str = None,
-) -> HttpResponse:
+) -> HttpResponseBase:
     export_data = {}
     export_format = export_format or "excel"
 
@@ -83,6 +83,20 @@ def export_surveys(
     )
 
 
+def export_surveys_by_ids(
+    survey_ids: list[int],
+    offering_id: Optional[int] = None,
+    course_id: Optional[int] = None,
+    export_format: str = None,
+) -> HttpResponseBase:
+    return export_surveys(
+        Survey.objects.filter(pk__in=survey_ids).order_by("pk"),
+        Offering.objects.get(pk=offering_id) if offering_id else None,
+        Course.objects.get(pk=course_id) if course_id else None,
+        export_format,
+    )
+
+
 def get_or_create_survey_instance(survey: Survey, user: User) -> SurveyInstance:
     instances_query = SurveyInstance.objects.filter(user=user, survey=survey)
     if instances_query.exists():
@@ -0,0 +1,106 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.template.loader import render_to_string
+from django.test import TestCase
+from django.urls import reverse
+
+from courses.templatetags.courses_tags import course_reviews
+from courses.models import Course, CourseType, Offering, Period, Teach, UserProfile
+from survey.models import Answer, PublicReview, Question, Survey, SurveyInstance
+from survey.models.types import QuestionType
+
+
+class PublicReviewTest(TestCase):
+    def setUp(self):
+        period = Period.objects.create(
+            date_from=date(2023, 9, 18), date_to=date(2023, 12, 22)
+        )
+        offering = Offering.objects.create(name="HS 2023", period=period)
+        self.course = Course.objects.create(
+            name="Salsa 1 (Mo)",
+            offering=offering,
+            type=CourseType.objects.create(title="Salsa 1"),
+        )
+        self.other_course = Course.objects.create(
+            name="Salsa 2 (Mo)",
+            offering=offering,
+            type=CourseType.objects.create(title="Salsa 2"),
+        )
+        self.teacher = User.objects.create_user(
+            username="teacher", email="teacher@tq.ch"
+        )
+        UserProfile.objects.create(user=self.teacher)
+        Teach.objects.create(course=self.course, teacher=self.teacher)
+
+        self.question = Question.objects.create(
+            name="Comment", type=QuestionType.FREE_FORM, public_review=True
+        )
+        survey = Survey.objects.create(name="Course survey")
+        self.survey_instance = SurveyInstance.objects.create(
+            survey=survey,
+            user=User.objects.create_user(
+                username="participant", email="participant@tq.ch"
+            ),
+            course=self.other_course,
+        )
+
+    def test_index_follows_answers_and_teachers(self):
+        answer = Answer.objects.create(
+            survey_instance=self.survey_instance, question=self.question, value="Great"
+        )
+        self.assertEqual(
+            PublicReview.objects.latest_for_course_type(self.other_course.type_id),
+            ([answer.public_review], False),
+        )
+        self.assertEqual(
+            PublicReview.objects.latest_for_teachers(
+                [self.teacher.id], exclude_course_type_id=self.course.type_id
+            ),
+            ([], False),
+        )
+
+        Teach.objects.create(course=self.other_course, teacher=self.teacher)
+        self.assertEqual(
+            PublicReview.objects.latest_for_teachers(
+                [self.teacher.id], exclude_course_type_id=self.course.type_id
+            ),
+            ([answer.public_review], False),
+        )
+
+        # the reviews are shown in pages, the oldest one is on the second page
+        for i in range(PublicReview.PAGE_SIZE):
+            Answer.objects.create(
+                survey_instance=self.survey_instance,
+                question=self.question,
+                value=f"Good {i}",
+            )
+        reviews, more = PublicReview.objects.latest_for_course_type(
+            self.other_course.type_id
+        )
+        self.assertEqual((len(reviews), more), (PublicReview.PAGE_SIZE, True))
+        self.assertEqual(
+            PublicReview.objects.latest_for_course_type(
+                self.other_course.type_id, page=2
+            ),
+            ([answer.public_review], False),
+        )
+        # the older reviews the teacher got are reachable from the page of their course
+        html = render_to_string(
+            "courses/snippets/course_reviews.html",
+            course_reviews(self.course, page=2),
+        )
+        self.assertIn("Great", html)
+        self.assertIn(
+            "{}?page=1".format(
+                reverse("courses:course_reviews", args=[self.course.id])
+            ),
+            html,
+        )
+        self.assertNotIn("?page=3", html)
+        # the manager keeps the latest() of django
+        self.assertEqual(PublicReview.objects.latest("pk").text, "Good 19")
+
+        answer.hide_from_public_reviews = True
+        answer.save()
+        self.assertFalse(PublicReview.objects.filter(answer=answer).exists())
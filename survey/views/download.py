@@ -1,12 +1,10 @@
-from typing import Optional
-
 from django.contrib.admin.views.decorators import staff_member_required
 from django.http import HttpResponse, HttpRequest
-from django.shortcuts import render, get_object_or_404
+from django.shortcuts import get_object_or_404
 
 from courses.models import Offering, Course
+from courses.services import start_export
 from ..models import Survey
-from ..services import export_surveys
 
 
 @staff_member_required
@@ -24,4 +22,11 @@ def download(request: HttpRequest, survey_id: int) -> HttpResponse:
     if "format" in request.GET and request.GET["format"]:
         export_format = request.GET["format"]
 
-    return export_surveys([survey], offering, course, export_format)
+    return start_export(
+        request,
+        "surveys",
+        survey_ids=[survey.id],
+        offering_id=offering.id if offering else None,
+        course_id=course.id if course else None,
+        export_format=export_format,
+    )
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/1.6/ref/settings/
 """
 
 import os
+from datetime import timedelta
 from os import environ
 
 import sentry_sdk
@@ -54,7 +55,6 @@ INSTALLED_APPS = [
     "reversion",
     "django_celery_beat",
     "django_celery_results",
-    "djcelery_email",
     "post_office",
     "allauth",
     "allauth.account",
@@ -409,12 +409,35 @@ if DEBUG:
 
 POST_OFFICE = {
     "BACKENDS": {
-        # using djcelery's email backend as a backend for post office
+        # the queued emails are sent by the celery task of email_system's mail queue
         "default": EMAIL_BACKEND
         if DEBUG
-        else "djcelery_email.backends.CeleryEmailBackend",
+        else "email_system.backends.PooledSMTPEmailBackend",
     },
-    "DEFAULT_PRIORITY": "now",
+    # transactional emails are queued with high priority and preempt bulk emails
+    "DEFAULT_PRIORITY": "high",
+    # failed emails are retried after 1, 2, 4 and 8 minutes
+    "MAX_RETRIES": 4,
+    "RETRY_INTERVAL": timedelta(minutes=1),
+}
+
+# sending of the queued emails, see email_system/services/mail_queue.py
+EMAIL_QUEUE = {
+    "SEND_RATE": float(environ.get("TQ_EMAIL_SEND_RATE", 10)),
+    "CONCURRENCY": int(environ.get("TQ_EMAIL_CONCURRENCY", 4)),
+    "BATCH_SIZE": 50,
+}
+
+# authenticated SMTP connections kept open by each worker, see email_system/backends.py
+EMAIL_SMTP_POOL = {
+    # every sending thread of the mail queue holds one connection
+    "SIZE": EMAIL_QUEUE["CONCURRENCY"],
+    # seconds to wait for a free connection
+    "WAIT": 60,
+    # seconds after which an idle connection is checked with NOOP before it is reused
+    "MAX_IDLE": 10,
+    # seconds after which a connection is closed instead of being reused
+    "MAX_AGE": 5 * 60,
 }
 
 ###########
@@ -1,25 +1,47 @@
 from celery import shared_task
-from django.conf import settings
-from post_office.mail import send_queued
 
-from groups.services import update_groups
+from courses.services import (
+    run_subscription_job,
+    run_export_job,
+    delete_expired_export_jobs,
+)
+from email_system.services import (
+    send_group_email_chunk,
+    send_queued_emails as send_mail_queue,
+)
+from groups.services import update_groups, update_user_groups
+from payment.models import Payment
 from payment.payment_processor import PaymentProcessor
-from payment.parser import ISO2022Parser, ZkbCsvParser
+from payment.parser import ZkbCsvParser
+from payment.services import ingest_iso_20022_files, ingest_finance_file
 
 
-@shared_task(
-    name="post_office_send_queued_emails",
-    ignore_result=True,
-    **settings.CELERY_EMAIL_TASK_CONFIG
-)
+# the send rate and concurrency are configured by settings.EMAIL_QUEUE
+@shared_task(name="post_office_send_queued_emails", ignore_result=True)
 def send_queued_emails() -> None:
-    send_queued()
+    send_mail_queue()
+
 
 @shared_task(name="payment_parse_zkb_csv_files", ignore_result=True)
 def payment_parse_zkb_csv_files() -> None:
     ZkbCsvParser.parse_files_and_save_payments()
 
 
+@shared_task(name="payment_ingest_iso_20022_files", ignore_result=True)
+def payment_ingest_iso_20022_files() -> None:
+    ingest_iso_20022_files()
+
+
+@shared_task(name="payment_ingest_finance_file", ignore_result=True)
+def payment_ingest_finance_file(file_id: int) -> None:
+    ingest_finance_file(file_id)
+
+
+@shared_task(name="payment_process_payments", ignore_result=True)
+def payment_process_payments(payment_ids: list[int]) -> None:
+    PaymentProcessor.process_payments(Payment.objects.filter(pk__in=payment_ids))
+
+
 @shared_task(name="payment_match", ignore_result=True)
 def match_payments() -> None:
     PaymentProcessor().process_payments()
@@ -28,3 +50,29 @@ def match_payments() -> None:
 @shared_task(name="update_groups", ignore_result=True)
 def task_update_groups() -> None:
     update_groups()
+
+
+@shared_task(name="update_user_groups", ignore_result=True)
+def task_update_user_groups(user_ids: list[int]) -> None:
+    for user_id in user_ids:
+        update_user_groups(user_id)
+
+
+@shared_task(name="courses_run_subscription_job", ignore_result=True)
+def task_run_subscription_job(job_id: int) -> None:
+    run_subscription_job(job_id)
+
+
+@shared_task(name="courses_run_export_job", ignore_result=True)
+def task_run_export_job(job_id: int) -> None:
+    run_export_job(job_id)
+
+
+@shared_task(name="courses_delete_expired_export_jobs", ignore_result=True)
+def task_delete_expired_export_jobs() -> None:
+    delete_expired_export_jobs()
+
+
+@shared_task(name="email_system_send_group_email_chunk", ignore_result=True)
+def task_send_group_email_chunk(group_email_id: int, user_ids: list[int]) -> None:
+    send_group_email_chunk(group_email_id, user_ids)
@@ -21,9 +21,10 @@ def table(data: list):
 
 
 @register.inclusion_tag(filename="snippets/collapsible_list.html")
-def collapsible_list(items: list, limit: int, item_template: str):
+def collapsible_list(items: list, limit: int, item_template: str, **item_context):
     limit = limit or len(items)
     return dict(
+        **item_context,
         id=f"collapse_{shortuuid.uuid()}",
         has_items=(len(items) > 0),
         can_expand=(len(items) > limit),
@@ -8,6 +8,15 @@ class CodeGenerator:
     # 2 Z
     # 5 S
     non_ambiguous_alphabet_for_humans = "ABCDEFGHJKMNPQRTUVWXY346789"
+    # Each similar looking character is mapped to a representative of its group
+    ambiguous_characters = str.maketrans(
+        {"O": "0", "I": "1", "L": "1", "Z": "2", "S": "5"}
+    )
+
+    @staticmethod
+    def normalize_ambiguous_characters(code: str) -> str:
+        """makes codes typed by humans comparable regardless of similar looking characters"""
+        return code.upper().translate(CodeGenerator.ambiguous_characters)
 
     @staticmethod
     def short_uuid() -> str:
@@ -1,9 +1,13 @@
-from django.http import HttpResponse
+from django.http.response import HttpResponseBase
 
 from . import export_excel, export_csv, export_vcard
 
 
-def export(export_format, title, data, multiple=False) -> HttpResponse:
+def export(export_format, title, data, multiple=False) -> HttpResponseBase:
+    """
+    data is an iterable of rows, or of dicts with a name and such data if multiple.
+    Rows are consumed one by one and the response is streamed where the format allows it.
+    """
     if export_format in ["xlsx", "excel"]:
         return export_excel(title=title, multiple=multiple, data=data)
     if export_format in ["vcf", "vcard"]:
@@ -1,11 +1,24 @@
 import csv
-from io import StringIO
+from typing import Iterable, Iterator
 
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 
 from . import export_zip, clean_filename
 
 
+class Echo:
+    """file which returns what is written to it instead of storing it"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def csv_lines(data: Iterable) -> Iterator[str]:
+    writer = csv.writer(Echo())
+    for row in data:
+        yield writer.writerow(row)
+
+
 def write_csv(data, file):
     writer = csv.writer(file)
     for row in data:
@@ -14,20 +27,18 @@ def write_csv(data, file):
 
 def export_csv(title, data, multiple=False):
     if multiple:
-        files = dict()
-        for count, item in enumerate(data):
-            file = StringIO()
-            write_csv(item["data"], file)
-            files["{}_{}.csv".format(count + 1, item["name"])] = file.getvalue().encode(
-                "utf-8"
+        files = (
+            (
+                "{}_{}.csv".format(count + 1, item["name"]),
+                (line.encode("utf-8") for line in csv_lines(item["data"])),
             )
-
+            for count, item in enumerate(data)
+        )
         return export_zip(title, files)
 
     else:
-        response = HttpResponse(content_type="text/csv")
+        response = StreamingHttpResponse(csv_lines(data), content_type="text/csv")
         response["Content-Disposition"] = 'attachment; filename="{}.csv"'.format(
             clean_filename(title)
         )
-        write_csv(data, response)
         return response
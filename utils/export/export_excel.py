@@ -1,59 +1,92 @@
 from collections import defaultdict
+from itertools import chain, islice
+from tempfile import TemporaryFile
+from typing import Iterable
 
-from django.http import HttpResponse
+from django.http import FileResponse
 from openpyxl import Workbook
-from openpyxl.styles import Alignment
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import KNOWN_TYPES
+from openpyxl.styles import Alignment, Font
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
 
 from . import clean_filename
 
+# the column widths are computed from the first rows, since the sheet is written row by row
+COLUMN_WIDTH_SAMPLE_ROWS = 200
+
+ALIGNMENT = Alignment(wrapText=True, vertical="center")
+HEADING_FONT = Font(bold=True)
+
+
+def _column_widths(rows: list[Iterable]) -> dict[int, int]:
+    column_widths = defaultdict(int)
+    for row in rows:
+        for col_number, value in enumerate(row, 1):  # ,1 to start at 1
+            column_widths[col_number] = max(
+                max([len(v) for v in str(value).split("\n")]),
+                column_widths[col_number],
+            )
+    return column_widths
+
+
+def _cell(sheet: WriteOnlyWorksheet, value, heading: bool) -> WriteOnlyCell:
+    cell = WriteOnlyCell(sheet, value=value)
+    cell.alignment = ALIGNMENT
+    if heading:
+        cell.font = HEADING_FONT
+    return cell
+
+
+def _needs_wrapping(row: Iterable, column_widths: dict[int, float]) -> bool:
+    return any(
+        isinstance(value, str)
+        and ("\n" in value or len(value) > column_widths.get(col_number, 0))
+        for col_number, value in enumerate(row, 1)
+    )
+
+
+def write_sheet(sheet: WriteOnlyWorksheet, values: Iterable, has_column_headings=True):
+    values = iter(values)
+    sample = list(islice(values, COLUMN_WIDTH_SAMPLE_ROWS))
+    column_widths = {
+        col_number: column_width * 1.25
+        for col_number, column_width in _column_widths(sample).items()
+    }
+    for col_number, column_width in column_widths.items():
+        sheet.column_dimensions[get_column_letter(col_number)].width = column_width
+
+    for row_number, row in enumerate(chain(sample, values), 1):  # ,1 to start at 1
+        heading = has_column_headings and row_number == 1
+        row = [value if isinstance(value, KNOWN_TYPES) else str(value) for value in row]
+        # styling cells is expensive, rows fitting on one line look the same without
+        if heading or _needs_wrapping(row, column_widths):
+            row = [_cell(sheet, value, heading) for value in row]
+        sheet.append(row)
+
 
 def export_excel(title, data, has_column_headings=True, multiple=False):
-    workbook = Workbook()
+    # rows are written to temporary files as they come and the sheet is never kept in memory
+    workbook = Workbook(write_only=True)
 
     if multiple:
-        sheets = dict()
-        workbook.remove_sheet(workbook.active)
-        for item in data:
-            sheet_title = clean_filename(item["name"])[:30]
-            sheets[workbook.create_sheet(title=sheet_title)] = item["data"]
+        sheets = ((clean_filename(item["name"])[:30], item["data"]) for item in data)
     else:
-        sheets = {workbook.active: data}
-
-    for sheet, values in sheets.items():
-        column_widths = defaultdict(int)
-        for row_number, row in enumerate(values, 1):  # ,1 to start at 1
-            for col_number, value in enumerate(row, 1):
-                try:
-                    cell = sheet.cell(row=row_number, column=col_number, value=value)
-                except ValueError:
-                    cell = sheet.cell(
-                        row=row_number, column=col_number, value=str(value)
-                    )
-
-                cell.alignment = Alignment(wrapText=True, vertical="center")
-
-                column_widths[col_number] = max(
-                    max([len(v) for v in str(value).split("\n")]),
-                    column_widths[col_number],
-                )
-
-                if has_column_headings and row_number == 1:
-                    font = cell.font.copy()
-                    font.bold = True
-                    cell.font = font
-
-        for col_number, column_width in column_widths.items():
-            sheet.column_dimensions[get_column_letter(col_number)].width = (
-                column_width * 1.25
-            )
+        sheets = [(None, data)]
 
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = "attachment; filename={}.xlsx".format(
-        clean_filename(title)
-    )
+    for sheet_title, values in sheets:
+        write_sheet(
+            workbook.create_sheet(title=sheet_title), values, has_column_headings
+        )
 
-    workbook.save(response)
-    return response
+    file = TemporaryFile()
+    workbook.save(file)
+    file.seek(0)
+
+    return FileResponse(
+        file,
+        as_attachment=True,
+        filename="{}.xlsx".format(clean_filename(title)),
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
@@ -1,11 +1,11 @@
-from io import StringIO
+from typing import Iterable, Iterator
 
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 
 from . import export_zip, clean_filename
 
 
-def write_vcard(data, file):
+def vcards(data: Iterable) -> Iterator[str]:
     for user in data:
         card = "BEGIN:VCARD\n"
         card += "VERSION:3.0\n"
@@ -20,23 +20,28 @@ def write_vcard(data, file):
             card += "TEL:{}\n".format(tel)
         card += "END:VCARD\n"
 
+        yield card
+
+
+def write_vcard(data, file):
+    for card in vcards(data):
         file.write(card)
 
 
 def export_vcard(title, data, multiple=False):
     if multiple:
-        files = dict()
-        for count, item in enumerate(data):
-            file = StringIO()
-            write_vcard(item["data"], file)
-            files["{}_{}.vcf".format(count + 1, item["name"])] = file.getvalue()
-
+        files = (
+            (
+                "{}_{}.vcf".format(count + 1, item["name"]),
+                (card.encode("utf-8") for card in vcards(item["data"])),
+            )
+            for count, item in enumerate(data)
+        )
         return export_zip(title, files)
 
     else:
-        response = HttpResponse(content_type="text/vcard")
+        response = StreamingHttpResponse(vcards(data), content_type="text/vcard")
         response["Content-Disposition"] = 'attachment; filename="{}.vcf"'.format(
             clean_filename(title)
         )
-        write_vcard(data, response)
         return response
@@ -1,24 +1,66 @@
-from io import BytesIO
+from typing import Iterable, Iterator, Union
 from zipfile import ZipFile
 
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 
 from . import clean_filename
 
+# the content of a file is either complete or an iterable of chunks
+FileContent = Union[bytes, str, Iterable[bytes]]
 
-def export_zip(title, files):
-    zipped_file = BytesIO()
-    with ZipFile(zipped_file, "w") as folder:
-        for name, file_bytes in files.items():
-            folder.writestr(
-                "{}/{}".format(clean_filename(title), clean_filename(name)), file_bytes
-            )
-    length = len(zipped_file.getvalue())
-    zipped_file.seek(0)
 
-    response = HttpResponse(zipped_file, content_type="application/zip")
+class StreamBuffer:
+    """unseekable file which hands out everything written to it since the last call of pop"""
+
+    def __init__(self) -> None:
+        self.chunks = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def pop(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _chunks(content: FileContent) -> Iterable[bytes]:
+    if isinstance(content, str):
+        return [content.encode("utf-8")]
+    if isinstance(content, bytes):
+        return [content]
+    return content
+
+
+def zip_stream(title: str, files: Iterable[tuple[str, FileContent]]) -> Iterator[bytes]:
+    """zips the files while they are produced, so neither the files nor the zip are kept in memory"""
+    buffer = StreamBuffer()
+    with ZipFile(buffer, "w") as folder:
+        for name, content in files:
+            path = "{}/{}".format(clean_filename(title), clean_filename(name))
+            with folder.open(path, "w") as file:
+                for chunk in _chunks(content):
+                    file.write(chunk)
+                    yield buffer.pop()
+            yield buffer.pop()
+    yield buffer.pop()
+
+
+def export_zip(
+    title: str,
+    files: Union[dict[str, FileContent], Iterable[tuple[str, FileContent]]],
+) -> StreamingHttpResponse:
+    if isinstance(files, dict):
+        files = files.items()
+
+    response = StreamingHttpResponse(
+        zip_stream(title, files), content_type="application/zip"
+    )
     response["Content-Disposition"] = "attachment; filename={}.zip".format(
         clean_filename(title)
     )
-    response["Content-Length"] = length
     return response
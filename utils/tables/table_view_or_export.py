@@ -1,4 +1,5 @@
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest
+from django.http.response import HttpResponseBase
 from django.shortcuts import render
 
 from utils import export
@@ -6,7 +7,7 @@ from utils import export
 
 def table_view_or_export(
     request: HttpRequest, title: str, url_key: str, data: list, template: str = None
-) -> HttpResponse:
+) -> HttpResponseBase:
     export_format = request.GET.get("format", None)
     if export_format in ["excel", "csv"]:
         return export(export_format, title=title, data=data)